@@ -1,10 +1,75 @@
-from fastapi import Header, HTTPException, status
-from core.config import API_KEY_SECRET
+import time
+from typing import Optional
+from fastapi import Header, HTTPException, Query, Request, status
+from core.config import DEFAULT_DEADLINE_MS, EXPLANATION_MODE
+from core.classifier import classifier
+from core.deadline import Deadline
+from core.explanations import EXPLANATION_MODES, is_local_callback
+from core.metrics import record_error
+from core.tenants import RateLimited, Tenant, tenants
+
+def is_valid_api_key(x_api_key: str) -> bool:
+    # API_KEY_SECRET plus the keys configured in TENANTS
+    return tenants.get(x_api_key) is not None
 
 async def get_api_key(x_api_key: str = Header(..., description="API Key for authentication")):
-    if x_api_key != API_KEY_SECRET:
+    if not is_valid_api_key(x_api_key):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or missing API Key",
         )
     return x_api_key
+
+async def get_tenant(x_api_key: str = Header(..., description="API Key for authentication")) -> Tenant:
+    """The caller's tenant, with this analysis request counted against its rate limit and audio quota."""
+    tenant = tenants.get(x_api_key)
+    if tenant is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing API Key",
+        )
+    try:
+        tenants.admit(tenant)
+    except RateLimited as e:
+        record_error(e.reason)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    return tenant
+
+async def require_ready():
+    """Rejects analysis requests until the model is loaded and warmed up."""
+    if not classifier.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Model is not ready yet ({classifier.phase})",
+            headers={"Retry-After": "5"},
+        )
+
+async def get_deadline(
+    request: Request,
+    x_deadline_ms: Optional[float] = Header(None, gt=0, description="Time budget for the answer in milliseconds"),
+) -> Optional[Deadline]:
+    """The request's deadline from X-Deadline-Ms or DEFAULT_DEADLINE_MS, counted from arrival."""
+    budget_ms = x_deadline_ms or DEFAULT_DEADLINE_MS
+    if not budget_ms:
+        return None
+    # Stamped by MetricsMiddleware, so body upload and parsing count against the budget
+    received_at = getattr(request.state, "received_at", None) or time.monotonic()
+    return Deadline(budget_ms / 1000, started_at=received_at)
+
+async def get_explanation_mode(
+    explanation: str = Query(EXPLANATION_MODE, description="sync, none or async"),
+    callback_url: Optional[str] = Query(None, alias="callbackUrl", description="Loopback URL the async explanation is POSTed to"),
+):
+    """Returns (mode, callback_url) for the request's explanation."""
+    if explanation not in EXPLANATION_MODES:
+        raise HTTPException(status_code=422, detail=f"explanation must be one of {', '.join(EXPLANATION_MODES)}")
+    if callback_url is not None:
+        if explanation != "async":
+            raise HTTPException(status_code=422, detail="callbackUrl requires explanation=async")
+        if not is_local_callback(callback_url):
+            raise HTTPException(status_code=422, detail="callbackUrl must be an http(s) URL on a loopback address")
+    return explanation, callback_url
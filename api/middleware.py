@@ -0,0 +1,56 @@
+import time
+from urllib.parse import parse_qs
+
+from core.config import SERVER_TIMING
+from core.metrics import REQUEST_SECONDS, start_request_timings, server_timing_header
+
+def _timing_requested(scope) -> bool:
+    """Per-request opt-in: an X-Debug-Timing: 1 header or a ?timing=1 query parameter."""
+    for name, value in scope.get("headers", []):
+        if name == b"x-debug-timing":
+            return value.strip().lower() in (b"1", b"true", b"yes")
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("timing", [""])[-1].lower() in ("1", "true", "yes")
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: records request latency by route and returns the
+    request's stage timings in a Server-Timing header when the client asks
+    for them (or always / never, see SERVER_TIMING). Also stamps the arrival
+    time deadlines count from.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        # Arrival time for request deadlines (see api.dependencies.get_deadline)
+        scope.setdefault("state", {})["received_at"] = time.monotonic()
+        # Stages that run in this request's context (including pool workers) add to it
+        timings = start_request_timings()
+        show_timings = SERVER_TIMING == "always" or (SERVER_TIMING == "request" and _timing_requested(scope))
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if show_timings:
+                    header = server_timing_header(timings, time.perf_counter() - started)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", header.encode("latin-1"))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Templated route path keeps label cardinality bounded
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"], route=getattr(route, "path", "unmatched"), status=status,
+            )
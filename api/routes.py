@@ -1,8 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
-from api.schemas import VoiceAnalysisRequest, VoiceAnalysisResponse
-from api.dependencies import get_api_key
-from core.audio import decode_audio
-from core.classifier import classifier
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from typing import Optional, get_args
+from api.schemas import (
+    VoiceAnalysisRequest, VoiceAnalysisResponse, SUPPORTED_LANGUAGES,
+    VoiceBatchRequest, VoiceBatchResponse, VoiceBatchItemResult, ExplanationJobResponse,
+)
+from api.dependencies import get_api_key, get_tenant, require_ready, get_deadline, get_explanation_mode
+from core.audio import AudioDecodeError
+from core.classifier import classifier, Prediction
+from core.config import (
+    MAX_UPLOAD_BYTES, MAX_BATCH_ITEMS, MAX_BATCH_BYTES,
+    STREAM_WINDOW_S, STREAM_HOP_S, STREAM_MIN_WINDOW_S, STREAM_MAX_MESSAGE_BYTES, STREAM_QUERY_API_KEY,
+)
+from core.executor import inference_pool, QueueFullError
+from core.cache import result_cache
+from core.deadline import Deadline, DeadlineExceeded, cost_model
+from core.explanations import explanation_jobs
+from core.metrics import record_error, PAYLOAD_BYTES, DEGRADATIONS
+from core.pipeline import run_analysis, score_window, analyze_batch
+from core.streaming import StreamBuffer, STREAM_FORMATS, frame_to_pcm, stream_rate
+from core.tenants import RateLimited, Tenant, tenants
+from dataclasses import asdict
+import asyncio
+import base64
+import binascii
+import json
 import logging
 
 # Configure logging
@@ -11,38 +36,495 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.post("/voice-detection", response_model=VoiceAnalysisResponse, dependencies=[Depends(get_api_key)])
-async def analyze_voice(request: VoiceAnalysisRequest):
+# Slack for multipart boundaries and headers on top of the audio itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+async def _analyze(audio_bytes: bytes, deadline: Optional[Deadline] = None, explanation: str = "sync",
+                   tenant: Optional[Tenant] = None):
+    """
+    Decode + Analyze Voice, mapping pipeline failures to HTTP errors.
+    Served from the result cache when possible, otherwise run on the bounded
+    inference pool (in the tenant's queue) so librosa/torch never block the
+    event loop. The clip's duration is charged to the tenant's audio quota.
+    """
+    try:
+        prediction = await run_analysis(audio_bytes, deadline, explain=explanation == "sync", tenant=tenant)
+        if tenant is not None:
+            tenants.charge_audio(tenant, prediction.audio_seconds)
+        return prediction
+    except DeadlineExceeded as e:
+        logger.warning(f"Shedding request: {e}")
+        DEGRADATIONS.inc(kind="shed")
+        record_error("deadline_exceeded")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except QueueFullError as e:
+        logger.warning(f"Rejecting request: {e}")
+        record_error("queue_full")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry later.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except AudioDecodeError as e:
+        logger.error(f"Audio decoding failed: {e}")
+        record_error("decode_error")
+        raise HTTPException(status_code=400, detail=f"Invalid Audio Data: {str(e)}")
+
+def _build_response(language, prediction, job=None) -> VoiceAnalysisResponse:
+    response = VoiceAnalysisResponse(
+        status="success",
+        language=language, # Pass language through if needed for logging/response
+        classification=prediction.classification,
+        confidenceScore=prediction.confidence,
+        explanation=prediction.explanation,
+        segments=prediction.segments,
+        trimmedSeconds=prediction.trimmed_seconds,
+        degradations=prediction.degradations,
+        decidedBy=prediction.decided_by,
+    )
+    if job is not None:
+        response.explanationJobId = job["id"]
+        response.explanationStatus = job["status"]
+        response.explanation = job.get("explanation")
+    return response
+
+def _explain_later(audio_bytes: bytes, prediction, callback_url=None):
+    """
+    explanation=async: queues the explanation for a verdict. Returns the job, or a
+    "rejected" stand-in when the explanation queue is full.
+    """
+    if prediction.explanation is not None:
+        return None  # Already known (e.g. a silent clip)
+    job = explanation_jobs.submit(audio_bytes, prediction.classification, prediction.confidence, callback_url)
+    if job is None:
+        record_error("explanation_queue_full")
+        return {"id": None, "status": "rejected"}
+    return job
+
+async def _read_limited(chunks, limit: int) -> bytes:
+    """Collects an async iterator of byte chunks, failing with 413 past `limit` bytes."""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        if len(buffer) > limit:
+            raise HTTPException(status_code=413, detail=f"Audio exceeds the {limit} byte upload limit")
+    return bytes(buffer)
+
+async def _read_multipart(request: Request, limit: int):
+    """
+    Streams a multipart/form-data body through python-multipart, keeping the
+    `file` part and the `language` field. Fails with 413 as soon as the file
+    passes `limit` bytes (or the body passes it plus MULTIPART_OVERHEAD_BYTES),
+    without reading the rest. Returns (audio bytes or None, language or None).
+    """
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise HTTPException(status_code=400, detail="Missing multipart boundary")
+
+    parts = {}  # kept part name -> bytearray
+    part = {"field": b"", "value": b"", "name": None}
+
+    def on_header_field(data, start, end):
+        part["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        if part["field"].lower() == b"content-disposition":
+            name = parse_options_header(part["value"])[1].get(b"name", b"").decode("latin-1")
+            if name in parts:
+                raise HTTPException(status_code=400, detail=f"Duplicate '{name}' part in multipart upload")
+            if name in ("file", "language"):
+                part["name"] = name
+                parts[name] = bytearray()
+        part["field"] = part["value"] = b""
+
+    def on_part_begin():
+        part["name"] = None
+
+    def on_part_data(data, start, end):
+        if part["name"] is None:
+            return
+        buffer = parts[part["name"]]
+        buffer.extend(data[start:end])
+        if part["name"] == "file" and len(buffer) > limit:
+            raise HTTPException(status_code=413, detail=f"Audio exceeds the {limit} byte upload limit")
+        if part["name"] == "language" and len(buffer) > 64:
+            raise HTTPException(status_code=422, detail="Unsupported language")
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin, "on_part_data": on_part_data, "on_header_field": on_header_field,
+        "on_header_value": on_header_value, "on_header_end": on_header_end,
+    })
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > limit + MULTIPART_OVERHEAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"Audio exceeds the {limit} byte upload limit")
+            parser.write(chunk)
+        parser.finalize()
+    except MultipartParseError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed multipart upload: {e}")
+
+    audio = parts.get("file")
+    language = parts.get("language")
+    return (bytes(audio) if audio is not None else None,
+            language.decode("utf-8", errors="replace") if language else None)
+
+@router.post("/voice-detection", response_model=VoiceAnalysisResponse, dependencies=[Depends(get_api_key), Depends(require_ready)])
+async def analyze_voice(request: VoiceAnalysisRequest, deadline: Optional[Deadline] = Depends(get_deadline),
+                        explanation: tuple = Depends(get_explanation_mode), tenant: Tenant = Depends(get_tenant)):
     logger.info(f"Received voice analysis request for language: {request.language}")
-    
+    mode, callback_url = explanation
+
     try:
-        # 1. Decode Audio
-        try:
-            # ensure decode_audio returns the array AND the sample rate
-            audio_array, sr = decode_audio(request.audioBase64)
-        except ValueError as e:
-            logger.error(f"Audio decoding failed: {e}")
-            raise HTTPException(status_code=400, detail=f"Invalid Audio Data: {str(e)}")
-            
-        # 2. Analyze Voice
-        # CRITICAL FIX: Pass 'sr' (int), not 'request.language' (str)
-        # The classifier needs 'sr' to check if resampling is needed.
-        classification, confidence, explanation = classifier.predict(audio_array, source_sr=sr)
-        
+        # 1. Decode + Analyze Voice
+        prediction = await _analyze(request.audio_bytes, deadline, mode, tenant)
+
+        # 2. Explanation in the background, if asked for
+        job = _explain_later(request.audio_bytes, prediction, callback_url) if mode == "async" else None
+
         # 3. Construct Response
-        return VoiceAnalysisResponse(
-            status="success",
-            language=request.language, # Pass language through if needed for logging/response
-            classification=classification,
-            confidenceScore=confidence,
-            explanation=explanation
-        )
+        return _build_response(request.language, prediction, job)
 
     except HTTPException:
         raise # Re-raise HTTP exceptions so FastAPI handles them correctly
         
     except Exception as e:
         logger.error(f"Internal server error: {e}")
+        record_error(type(e).__name__)
         # CRITICAL FIX: Do not return a partial VoiceAnalysisResponse here.
         # It will fail Pydantic validation if 'classification' is a required field.
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/voice-detection/upload", response_model=VoiceAnalysisResponse, dependencies=[Depends(get_api_key), Depends(require_ready)])
+async def analyze_voice_upload(request: Request, language: str = Query("English"),
+                               deadline: Optional[Deadline] = Depends(get_deadline),
+                               explanation: tuple = Depends(get_explanation_mode),
+                               tenant: Tenant = Depends(get_tenant)):
+    """
+    Raw audio upload, no base64. Accepts either
+    - multipart/form-data with a `file` part (and optional `language` field), or
+    - application/octet-stream with the audio as the body and `?language=`.
+    """
+    content_type = request.headers.get("content-type", "")
+    mode, callback_url = explanation
+
+    # Reject oversized bodies up front when the client tells us the size
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Audio exceeds the {MAX_UPLOAD_BYTES} byte upload limit")
+
+    try:
+        # 1. Read body in chunks, enforcing the size limit
+        if content_type.startswith("multipart/form-data"):
+            audio_bytes, form_language = await _read_multipart(request, MAX_UPLOAD_BYTES)
+            if audio_bytes is None:
+                raise HTTPException(status_code=400, detail="Missing 'file' part in multipart upload")
+            language = form_language or language
+        elif content_type.startswith(("application/octet-stream", "audio/")):
+            audio_bytes = await _read_limited(request.stream(), MAX_UPLOAD_BYTES)
+        else:
+            raise HTTPException(
+                status_code=415,
+                detail="Use multipart/form-data or application/octet-stream for raw uploads",
+            )
+
+        if language not in get_args(SUPPORTED_LANGUAGES):
+            raise HTTPException(status_code=422, detail=f"Unsupported language: {language}")
+        if not audio_bytes:
+            raise HTTPException(status_code=400, detail="Empty audio upload")
+
+        logger.info(f"Received raw upload ({len(audio_bytes)} bytes) for language: {language}")
+
+        # 2. Decode + Analyze Voice (same pipeline as the JSON endpoint)
+        prediction = await _analyze(audio_bytes, deadline, mode, tenant)
+        job = _explain_later(audio_bytes, prediction, callback_url) if mode == "async" else None
+
+        # 3. Construct Response
+        return _build_response(language, prediction, job)
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.error(f"Internal server error: {e}")
+        record_error(type(e).__name__)
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _batch_result(index, item, prediction=None, error=None) -> VoiceBatchItemResult:
+    if error is not None:
+        return VoiceBatchItemResult(index=index, id=item.id, status="error", language=item.language, message=error)
+    return VoiceBatchItemResult(index=index, id=item.id, **_build_response(item.language, prediction).model_dump())
+
+@router.post("/voice-detection/batch", response_model=VoiceBatchResponse, dependencies=[Depends(get_api_key), Depends(require_ready)])
+async def analyze_voice_batch(batch: VoiceBatchRequest, request: Request, stream: bool = Query(False),
+                              tenant: Tenant = Depends(get_tenant)):
+    """
+    Many clips per request. Items are decoded in parallel and run through the model
+    in padded batches; a failing item is reported without failing the others.
+    With `?stream=true` (or `Accept: application/x-ndjson`) results are streamed
+    back as NDJSON lines as items finish, in completion order.
+    A batch is one request for the tenant's rate limit; every clip counts against its audio quota.
+    """
+    logger.info(f"Received batch analysis request with {len(batch.items)} items")
+
+    # 1. Limits
+    if len(batch.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_ITEMS} items")
+    total_bytes = sum(len(item.audioBase64) * 3 // 4 for item in batch.items)
+    if total_bytes > MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"Batch audio exceeds the {MAX_BATCH_BYTES} byte limit")
+
+    # 2. Per-item base64 decode and cache lookup
+    ready = []    # results known up front (cache hits, invalid items)
+    pending = []  # (index, audio_bytes, cache_key)
+    for i, item in enumerate(batch.items):
+        try:
+            audio_bytes = base64.b64decode(item.audioBase64, validate=True)
+        except binascii.Error:
+            record_error("invalid_base64")
+            ready.append(_batch_result(i, item, error="Invalid Base64 string"))
+            continue
+        PAYLOAD_BYTES.observe(len(audio_bytes))
+        # Single-clip answers are reused here, but batch answers are kept apart from them
+        key = result_cache.make_key(audio_bytes, classifier.identity + "|batch")
+        cached = result_cache.lookup(result_cache.make_key(audio_bytes, classifier.identity), key)
+        if cached is not None:
+            prediction = Prediction(**cached)
+            tenants.charge_audio(tenant, prediction.audio_seconds)
+            ready.append(_batch_result(i, item, prediction))
+        else:
+            pending.append((i, audio_bytes, key))
+
+    # 3. One pool job decodes and classifies every remaining clip
+    loop = asyncio.get_running_loop()
+    completed = asyncio.Queue()
+    # Per-item callbacks only work with threads; process workers return everything at the end
+    on_result = None
+    if inference_pool.mode == "thread":
+        on_result = lambda j, result: loop.call_soon_threadsafe(completed.put_nowait, (j, result))
+
+    job = None
+    if pending:
+        try:
+            job = inference_pool.submit(analyze_batch, [b for _, b, _ in pending], on_result, tenant=tenant)
+        except QueueFullError as e:
+            logger.warning(f"Rejecting batch: {e}")
+            record_error("queue_full")
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry later.",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+    def to_item_result(j, result):
+        i, _, key = pending[j]
+        item = batch.items[i]
+        if isinstance(result, AudioDecodeError):
+            record_error("decode_error")
+            return _batch_result(i, item, error=f"Invalid Audio Data: {str(result)}")
+        if isinstance(result, Exception):
+            record_error(type(result).__name__)
+            return _batch_result(i, item, error=str(result))
+        result_cache.put(key, asdict(result))
+        tenants.charge_audio(tenant, result.audio_seconds)
+        return _batch_result(i, item, result)
+
+    async def completions():
+        """Item results for the pending clips, as they finish."""
+        if job is None:
+            return
+        job_done = asyncio.wrap_future(job)
+        seen = set()
+        while on_result is not None and len(seen) < len(pending):
+            getter = asyncio.ensure_future(completed.get())
+            await asyncio.wait({getter, job_done}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                break
+            j, result = getter.result()
+            seen.add(j)
+            yield to_item_result(j, result)
+
+        # Anything not delivered through the callback (process mode, or the job failed)
+        try:
+            final = await job_done
+        except Exception as e:
+            logger.error(f"Batch job failed: {e}")
+            final = [e] * len(pending)
+        for j, result in enumerate(final):
+            if j not in seen:
+                yield to_item_result(j, result)
+
+    # 4. Respond
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        async def ndjson():
+            for result in ready:
+                yield result.model_dump_json() + "\n"
+            async for result in completions():
+                yield result.model_dump_json() + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    results = ready + [result async for result in completions()]
+    results.sort(key=lambda r: r.index)
+    return VoiceBatchResponse(status="success", results=results)
+
+@router.websocket("/voice-detection/stream")
+async def analyze_voice_stream(websocket: WebSocket):
+    """
+    Live analysis over a WebSocket. Authenticate with the `x-api-key` header
+    (or `?api_key=` for browser clients, if STREAM_QUERY_API_KEY is on), then:
+    1. Optionally send a JSON config (the sample rate is fixed once audio has arrived):
+       {"language": "English", "format": "pcm_s16le" | "pcm_f32le" | "encoded", "sampleRate": 16000}
+    2. Send binary audio frames. Each time a window fills, the server pushes
+       {"event": "update", "classification", "confidence", "segment"} with the running verdict.
+    3. Send {"event": "end"}. The server pushes {"event": "final", ...} and closes.
+    """
+    api_key = websocket.headers.get("x-api-key")
+    if api_key is None and STREAM_QUERY_API_KEY:
+        api_key = websocket.query_params.get("api_key")
+    tenant = tenants.get(api_key)
+    if tenant is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not classifier.ready:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Model is not ready yet")
+        return
+    # A stream is one request for the tenant's rate limit; its audio is charged as it arrives
+    try:
+        tenants.admit(tenant)
+    except RateLimited as e:
+        record_error(e.reason)
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=str(e))
+        return
+    await websocket.accept()
+
+    language, fmt, sample_rate = "English", "pcm_s16le", classifier.target_sr
+    # Holds audio at the stream's own rate; created with the first frame, once the format is known
+    buffer, rate = None, None
+    seg_probs, segments = [], []
+
+    def verdict():
+        if not seg_probs:
+            return "HUMAN", 0.0
+        aggregated = classifier.aggregate(seg_probs)
+        class_id = int(aggregated.argmax())
+        return classifier.label_for(class_id), round(float(aggregated[class_id]), 2)
+
+    async def score(window, start, end):
+        try:
+            probs = await inference_pool.run(score_window, window, rate, tenant=tenant)
+        except QueueFullError as e:
+            record_error("queue_full")
+            await websocket.send_json({"event": "busy", "retryAfter": e.retry_after,
+                                       "detail": "Window skipped, server is busy"})
+            return
+        if probs is None:
+            return  # Silent window, nothing to add
+        seg_probs.append(probs)
+        segment = classifier.segment_score(probs, start / rate, end / rate)
+        segments.append(segment)
+        classification, confidence = verdict()
+        await websocket.send_json({"event": "update", "classification": classification,
+                                   "confidence": confidence, "segment": segment})
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+            data = message.get("bytes")
+            if data is not None:
+                # Audio frame
+                if len(data) > STREAM_MAX_MESSAGE_BYTES:
+                    await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG)
+                    return
+                try:
+                    # Decoding an "encoded" frame is real work; keep it off the event loop
+                    samples = await run_in_threadpool(frame_to_pcm, data, fmt)
+                except AudioDecodeError as e:
+                    record_error("decode_error")
+                    await websocket.send_json({"event": "error", "detail": f"Invalid Audio Data: {str(e)}"})
+                    continue
+                if buffer is None:
+                    rate = stream_rate(fmt, sample_rate)
+                    buffer = StreamBuffer(STREAM_WINDOW_S * rate, STREAM_HOP_S * rate)
+                tenants.charge_audio(tenant, len(samples) / rate)
+                for window, start, end in buffer.feed(samples):
+                    await score(window, start, end)
+                continue
+
+            # Control message
+            try:
+                control = json.loads(message.get("text") or "{}")
+            except ValueError:
+                await websocket.send_json({"event": "error", "detail": "Control messages must be JSON"})
+                continue
+
+            if control.get("event") == "end":
+                tail = buffer.flush(int(STREAM_MIN_WINDOW_S * rate)) if buffer is not None else None
+                if tail is not None:
+                    await score(*tail)
+                classification, confidence = verdict()
+                await websocket.send_json({
+                    "event": "final", "status": "success", "language": language,
+                    "classification": classification, "confidence": confidence,
+                    "analysedSeconds": round(buffer.total_samples / rate, 2) if buffer is not None else 0.0,
+                    "segments": segments,
+                })
+                await websocket.close()
+                return
+
+            language = control.get("language", language)
+            fmt = control.get("format", fmt)
+            try:
+                sample_rate = int(control.get("sampleRate", sample_rate))
+            except (TypeError, ValueError):
+                sample_rate = 0  # Rejected below like any other bad config
+            if language not in get_args(SUPPORTED_LANGUAGES) or fmt not in STREAM_FORMATS or sample_rate <= 0:
+                await websocket.send_json({"event": "error", "detail": f"Invalid stream config: {control}"})
+                await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+                return
+            if buffer is not None and stream_rate(fmt, sample_rate) != rate:
+                await websocket.send_json({"event": "error", "detail": "Sample rate cannot change mid-stream"})
+                await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+                return
+
+    except Exception as e:
+        logger.error(f"Streaming analysis failed: {e}")
+        record_error(type(e).__name__)
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+
+@router.get("/explanations/{job_id}", response_model=ExplanationJobResponse, response_model_exclude_none=True,
+            dependencies=[Depends(get_api_key)])
+def get_explanation(job_id: str):
+    """Result of an explanation=async job; 404 once it has expired (EXPLANATION_JOB_TTL_S)."""
+    job = explanation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired explanation job")
+    return ExplanationJobResponse(
+        jobId=job["id"], status=job["status"], explanation=job.get("explanation"), error=job.get("error"),
+    )
+
+@router.get("/stats", dependencies=[Depends(get_api_key)])
+def get_stats():
+    """Runtime stats used to tune the inference path."""
+    return {
+        # With an inference server, batching happens there (see "inference_server")
+        "batching": classifier.batcher.stats() if classifier.batcher is not None and classifier.remote is None else None,
+        # Includes per-tenant queue wait, completed and rejected jobs under "tenants"
+        "queue": inference_pool.stats(),
+        # Priority and bucket levels per tenant
+        "tenants": tenants.stats(),
+        "cache": result_cache.stats(),
+        # Seconds of work per second of audio, used to plan deadline degradations
+        "cost_model": cost_model.stats(),
+        "explanations": {"pending": explanation_jobs.pending()},
+        # Shared-memory transfer overhead per request and the server's own counters
+        "inference_server": classifier.remote.stats() if classifier.remote is not None else None,
+    }
@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import Literal, Optional
+from pydantic import BaseModel, Field, PrivateAttr, field_validator, model_validator
+from typing import List, Literal, Optional
 import base64
 import binascii
 
+from core.metrics import stage
+
 # Use standard python Literal
 SUPPORTED_LANGUAGES = Literal["Tamil", "English", "Hindi", "Malayalam", "Telugu"]
 
@@ -25,14 +27,32 @@ class VoiceAnalysisRequest(BaseModel):
         if len(v) < 100:
             raise ValueError("Audio string too short to be valid")
         
-        # 2. Structure Check: Validate it's actually Base64
+        return v
+
+    # Raw audio bytes, decoded exactly once during validation
+    _audio_bytes: bytes = PrivateAttr(default=b"")
+
+    @model_validator(mode='after')
+    def decode_base64(self):
+        # 2. Structure Check: Validate it's actually Base64, keeping the result
         try:
-            # Check if it can be decoded (fast check)
-            base64.b64decode(v, validate=True)
+            with stage("base64"):
+                self._audio_bytes = base64.b64decode(self.audioBase64, validate=True)
         except binascii.Error:
             raise ValueError("Invalid Base64 string")
-            
-        return v
+        return self
+
+    @property
+    def audio_bytes(self) -> bytes:
+        return self._audio_bytes
+
+class SegmentScore(BaseModel):
+    # Window position in seconds from the start of the clip
+    start: float
+    end: float
+    classification: Literal["AI_GENERATED", "HUMAN"]
+    confidence: float
+    aiProbability: float
 
 class VoiceAnalysisResponse(BaseModel):
     status: Literal["success", "error"]
@@ -42,4 +62,39 @@ class VoiceAnalysisResponse(BaseModel):
     classification: Optional[Literal["AI_GENERATED", "HUMAN"]] = None
     confidenceScore: Optional[float] = None
     explanation: Optional[str] = None
-    message: Optional[str] = None
\ No newline at end of file
+    message: Optional[str] = None
+    # Only present for long clips analysed in sliding windows
+    segments: Optional[List[SegmentScore]] = None
+    # Seconds of silence removed before analysis
+    trimmedSeconds: Optional[float] = None
+    # Stage that decided: "cascade" (signal-feature pre-classifier) or "model"
+    decidedBy: Optional[Literal["cascade", "model"]] = None
+    # Steps taken to meet the request deadline: "skip_explainer", "cap_duration"
+    degradations: Optional[List[str]] = None
+    # explanation=async: fetch the explanation from GET /api/explanations/{explanationJobId}
+    explanationJobId: Optional[str] = None
+    explanationStatus: Optional[Literal["pending", "done", "rejected"]] = None
+
+class ExplanationJobResponse(BaseModel):
+    jobId: str
+    status: Literal["pending", "done", "failed"]
+    explanation: Optional[str] = None
+    error: Optional[str] = None
+
+class VoiceBatchItem(BaseModel):
+    # Optional client reference echoed back in the result
+    id: Optional[str] = None
+    language: SUPPORTED_LANGUAGES = "English"
+    # Validated per item by the endpoint, so one bad clip doesn't reject the batch
+    audioBase64: str = Field(..., description="Base64 encoded audio")
+
+class VoiceBatchRequest(BaseModel):
+    items: List[VoiceBatchItem] = Field(..., min_length=1)
+
+class VoiceBatchItemResult(VoiceAnalysisResponse):
+    index: int
+    id: Optional[str] = None
+
+class VoiceBatchResponse(BaseModel):
+    status: Literal["success", "error"]
+    results: List[VoiceBatchItemResult]
@@ -0,0 +1,81 @@
+"""
+Compares the legacy ingest path (base64 decoded twice, temp file, librosa.load)
+with the in-memory single-pass path in core/audio.py.
+
+Usage: python benchmarks/bench_ingest.py [clip ...] [--runs N]
+"""
+import argparse
+import base64
+import binascii
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import librosa
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.audio import decode_audio_bytes
+
+def legacy_ingest(audio_b64: str):
+    # What schemas.validate_base64 + the old decode_audio did per request
+    try:
+        base64.b64decode(audio_b64, validate=True)
+    except binascii.Error:
+        raise ValueError("Invalid Base64 string")
+    audio_bytes = base64.b64decode(audio_b64)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_audio:
+        temp_audio.write(audio_bytes)
+        temp_path = temp_audio.name
+    try:
+        return librosa.load(temp_path, sr=16000)
+    finally:
+        os.remove(temp_path)
+
+def inmemory_ingest(audio_b64: str):
+    return decode_audio_bytes(base64.b64decode(audio_b64, validate=True))
+
+def measure(fn, audio_b64, runs):
+    fn(audio_b64)  # warm-up (codec init, resampler tables)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(audio_b64)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    y, _ = fn(audio_b64)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings_ms = np.array(timings) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(timings_ms, 50)),
+        "p95_ms": float(np.percentile(timings_ms, 95)),
+        "peak_mb": peak / 1e6,
+        "samples": len(y),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("clips", nargs="*", default=["clip1.mp3", "clip2.mp3"])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'clip':<14}{'path':<11}{'p50 ms':>10}{'p95 ms':>10}{'peak MB':>10}")
+    for clip in args.clips:
+        with open(clip, "rb") as f:
+            audio_b64 = base64.b64encode(f.read()).decode("utf-8")
+
+        legacy = measure(legacy_ingest, audio_b64, args.runs)
+        fast = measure(inmemory_ingest, audio_b64, args.runs)
+        for name, r in (("legacy", legacy), ("in-memory", fast)):
+            print(f"{os.path.basename(clip):<14}{name:<11}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['peak_mb']:>10.1f}")
+        print(f"{'':<14}speed-up x{legacy['p50_ms'] / fast['p50_ms']:.2f}, samples {legacy['samples']} vs {fast['samples']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Compares the lean preprocessing path (core/preprocess.py) with the Hugging Face
+feature extractor it replaces, per clip duration: peak memory allocated while
+preparing one batch, median time, and the largest difference in the tensors
+handed to the model.
+
+Peak memory is measured with tracemalloc (numpy registers its buffers with it),
+so it covers the arrays each path allocates. For the lean path "steady" is a
+call with warm, already-sized buffers; "cold" includes allocating them, and
+"retained" is what the buffers keep between calls.
+
+Usage:
+    python benchmarks/bench_preprocess.py
+    python benchmarks/bench_preprocess.py --durations 1,10,60,300 --batch 8 --runs 5
+    python benchmarks/bench_preprocess.py --stub  # default extractor config, no model files
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import torch
+
+# Add project root to path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+SR = 16000
+
+def load_extractor(stub: bool):
+    from transformers import AutoFeatureExtractor, Wav2Vec2FeatureExtractor
+    from core.config import MODEL_NAME, MODEL_LOCAL_DIR
+
+    if stub:
+        return Wav2Vec2FeatureExtractor(feature_size=1, sampling_rate=SR, padding_value=0.0, do_normalize=True)
+    return AutoFeatureExtractor.from_pretrained(MODEL_LOCAL_DIR or MODEL_NAME, local_files_only=bool(MODEL_LOCAL_DIR))
+
+def extractor_path(extractor):
+    """What VoiceClassifier.forward_batch did before: extractor to numpy, then torch.from_numpy."""
+    def run(clips):
+        inputs = extractor(clips, sampling_rate=SR, return_tensors="np", padding=True, return_attention_mask=True)
+        mask = inputs["attention_mask"] if extractor.return_attention_mask else None
+        return torch.from_numpy(inputs["input_values"]), None if mask is None else torch.from_numpy(mask)
+    return run
+
+def lean_path(preprocessor):
+    def run(clips):
+        values, mask = preprocessor(clips)
+        return torch.from_numpy(values), None if mask is None else torch.from_numpy(mask)
+    return run
+
+def peak_bytes(fn, clips) -> int:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        outputs = fn(clips)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del outputs
+    return peak
+
+def median_ms(fn, clips, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(clips)
+        times.append((time.perf_counter() - started) * 1000)
+    return float(np.median(times))
+
+def make_batch(seconds: float, batch: int, seed: int = 0):
+    """`batch` float32 clips of slightly different lengths (so padding is exercised)."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SR)
+    return [(0.1 * rng.standard_normal(n - i * (n // 50))).astype(np.float32) for i in range(batch)]
+
+def mb(n_bytes) -> float:
+    return round(n_bytes / 2**20, 2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", type=lambda s: [float(d) for d in s.split(",") if d],
+                        default=[1.0, 10.0, 60.0, 300.0], help="Clip durations in seconds")
+    parser.add_argument("--batch", type=int, default=1, help="Clips per batch")
+    parser.add_argument("--runs", type=int, default=5, help="Timed calls per path and duration")
+    parser.add_argument("--stub", action="store_true", help="Use a default Wav2Vec2 extractor config instead of the model's")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    from core.preprocess import Preprocessor
+
+    extractor = load_extractor(args.stub)
+    baseline = extractor_path(extractor)
+
+    results = []
+    print(f"{'clip':>7} {'batch':>5} | {'extractor MB':>12} {'ms':>8} | {'lean cold MB':>12} {'steady MB':>9} "
+          f"{'retained MB':>11} {'ms':>8} | {'max |diff|':>10}")
+    for seconds in args.durations:
+        clips = make_batch(seconds, args.batch)
+        # Fresh preprocessor per duration so "cold" includes sizing the buffers
+        preprocessor = Preprocessor.from_feature_extractor(extractor)
+        lean = lean_path(preprocessor)
+
+        lean_cold = peak_bytes(lean, clips)
+        lean_steady = peak_bytes(lean, clips)
+        retained = preprocessor._local.values.nbytes + getattr(preprocessor._local, "mask", np.empty(0)).nbytes
+        baseline_peak = peak_bytes(baseline, clips)
+
+        expected, _ = baseline(clips)
+        actual, _ = lean(clips)
+        max_diff = float((expected - actual).abs().max())
+
+        row = {
+            "seconds": seconds,
+            "batch": args.batch,
+            "input_mb": mb(sum(c.nbytes for c in clips)),
+            "extractor_peak_mb": mb(baseline_peak),
+            "extractor_ms": round(median_ms(baseline, clips, args.runs), 3),
+            "lean_cold_peak_mb": mb(lean_cold),
+            "lean_steady_peak_mb": mb(lean_steady),
+            "lean_retained_mb": mb(retained),
+            "lean_ms": round(median_ms(lean, clips, args.runs), 3),
+            "max_abs_diff": max_diff,
+        }
+        results.append(row)
+        print(f"{seconds:>6g}s {args.batch:>5} | {row['extractor_peak_mb']:>12} {row['extractor_ms']:>8.2f} | "
+              f"{row['lean_cold_peak_mb']:>12} {row['lean_steady_peak_mb']:>9} {row['lean_retained_mb']:>11} "
+              f"{row['lean_ms']:>8.2f} | {max_diff:>10.2e}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
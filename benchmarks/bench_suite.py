@@ -0,0 +1,299 @@
+"""
+Offline, in-process benchmark of the whole API. The FastAPI app runs through an
+ASGI transport (no server, no network) against the repo clips and synthetic
+clips of 1 s to 10 min. Reports per-stage and end-to-end latency percentiles,
+throughput at several concurrency levels and peak RSS.
+
+Results are written as JSON; pass a previous run with --compare to fail
+(exit code 1) when anything regressed by more than --threshold.
+
+Usage:
+    python benchmarks/bench_suite.py --stub-model --output bench.json
+    python benchmarks/bench_suite.py --stub-model --compare bench.json --threshold 0.2
+    python benchmarks/bench_suite.py --durations 1,10 --concurrency 1,8 --runs 3
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+# Add project root to path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+SR = 16000
+
+def build_stub_model(path: str):
+    """Saves a tiny randomly initialised Wav2Vec2 classifier (same interface as the real one)."""
+    import torch
+    from transformers import Wav2Vec2Config, Wav2Vec2ForSequenceClassification, Wav2Vec2FeatureExtractor
+
+    torch.manual_seed(0)
+    config = Wav2Vec2Config(
+        hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=64,
+        conv_dim=(32,) * 7, conv_stride=(5, 2, 2, 2, 2, 2, 2), conv_kernel=(10, 3, 3, 3, 3, 2, 2),
+        num_conv_pos_embeddings=16, num_conv_pos_embedding_groups=2, classifier_proj_size=16,
+        feat_extract_norm="group", id2label={0: "fake", 1: "real"}, label2id={"fake": 0, "real": 1},
+    )
+    Wav2Vec2ForSequenceClassification(config).save_pretrained(path)
+    Wav2Vec2FeatureExtractor(
+        feature_size=1, sampling_rate=SR, padding_value=0.0, do_normalize=True, return_attention_mask=False
+    ).save_pretrained(path)
+
+def synthetic_clip(seconds: float, seed: int = 0) -> bytes:
+    """Voice-like WAV: a vibrato harmonic tone with syllable-rate amplitude modulation plus noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SR)) / SR
+    f0 = 140 + 20 * np.sin(2 * np.pi * 5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SR
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2
+    y = 0.2 * voice * envelope + 0.01 * rng.standard_normal(len(t))
+    buffer = io.BytesIO()
+    sf.write(buffer, y.astype(np.float32), SR, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+def percentiles(values_ms) -> dict:
+    v = np.asarray(values_ms, dtype=np.float64)
+    if v.size == 0:
+        return {}
+    return {
+        "p50_ms": round(float(np.percentile(v, 50)), 3),
+        "p95_ms": round(float(np.percentile(v, 95)), 3),
+        "p99_ms": round(float(np.percentile(v, 99)), 3),
+        "mean_ms": round(float(v.mean()), 3),
+    }
+
+def parse_server_timing(header: str) -> dict:
+    stages = {}
+    for part in filter(None, (p.strip() for p in (header or "").split(","))):
+        name, _, dur = part.partition(";dur=")
+        if dur:
+            stages[name] = float(dur)
+    return stages
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0), 1)
+
+async def post_clip(client, body):
+    # The deployment's key; core.config is only imported once main() has set up the environment
+    from core.config import API_KEY_SECRET
+
+    start = time.perf_counter()
+    r = await client.post("/api/voice-detection", json=body, headers={"x-api-key": API_KEY_SECRET})
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    return r.status_code, elapsed_ms, parse_server_timing(r.headers.get("server-timing"))
+
+async def bench_clip(client, body, runs):
+    """Sequential requests for one clip: end-to-end and per-stage latency."""
+    await post_clip(client, body)  # warm-up
+    e2e, stages, errors = [], {}, 0
+    for _ in range(runs):
+        status, elapsed_ms, timings = await post_clip(client, body)
+        if status != 200:
+            errors += 1
+            continue
+        e2e.append(elapsed_ms)
+        for name, ms in timings.items():
+            if name != "total":
+                stages.setdefault(name, []).append(ms)
+    return {
+        "e2e": percentiles(e2e),
+        "stages": {name: percentiles(v) for name, v in sorted(stages.items())},
+        "errors": errors,
+    }
+
+async def bench_concurrency(client, body, concurrency, total_requests):
+    """`concurrency` clients sending `total_requests` requests in all; throughput and latency."""
+    latencies, errors = [], 0
+    remaining = total_requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            status, elapsed_ms, _ = await post_clip(client, body)
+            if status == 200:
+                latencies.append(elapsed_ms)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {
+        "throughput_rps": round(len(latencies) / wall, 3),
+        "latency": percentiles(latencies),
+        "errors": errors,
+    }
+
+async def run_suite(args, app):
+    import httpx
+
+    clips = {}
+    for path in args.clips:
+        with open(os.path.join(ROOT, path) if not os.path.isabs(path) else path, "rb") as f:
+            clips[os.path.basename(path)] = f.read()
+    for seconds in args.durations:
+        clips[f"synthetic_{seconds:g}s"] = synthetic_clip(seconds)
+
+    results = {"clips": {}, "load_clip": None, "concurrency": {}}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"\n{'clip':<20}{'MB':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  slowest stages (p50 ms)")
+        for name, audio_bytes in clips.items():
+            body = {"language": "English", "audioFormat": "mp3",
+                    "audioBase64": base64.b64encode(audio_bytes).decode("ascii")}
+            r = await bench_clip(client, body, args.runs)
+            r["payload_bytes"] = len(audio_bytes)
+            results["clips"][name] = r
+            slowest = sorted(r["stages"].items(), key=lambda kv: -kv[1].get("p50_ms", 0))[:3]
+            e2e = r["e2e"] or {"p50_ms": float("nan"), "p95_ms": float("nan"), "p99_ms": float("nan")}
+            print(f"{name:<20}{len(audio_bytes) / 1e6:>7.1f}{e2e['p50_ms']:>10.1f}{e2e['p95_ms']:>10.1f}"
+                  f"{e2e['p99_ms']:>10.1f}  " + ", ".join(f"{s} {v['p50_ms']:.1f}" for s, v in slowest)
+                  + (f"  [{r['errors']} errors]" if r["errors"] else ""))
+
+        load_name = args.load_clip if args.load_clip in clips else next(iter(clips))
+        results["load_clip"] = load_name
+        body = {"language": "English", "audioFormat": "mp3",
+                "audioBase64": base64.b64encode(clips[load_name]).decode("ascii")}
+        print(f"\nConcurrency sweep on {load_name} ({args.requests} requests per level)")
+        print(f"{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for level in args.concurrency:
+            r = await bench_concurrency(client, body, level, args.requests)
+            results["concurrency"][str(level)] = r
+            lat = r["latency"] or {"p50_ms": float("nan"), "p95_ms": float("nan"), "p99_ms": float("nan")}
+            print(f"{level:>8}{r['throughput_rps']:>10.2f}{lat['p50_ms']:>10.1f}{lat['p95_ms']:>10.1f}"
+                  f"{lat['p99_ms']:>10.1f}{r['errors']:>8}")
+    return results
+
+# --- Regression check ---
+
+def flatten(results: dict) -> dict:
+    """Comparable numbers keyed by path; lower is better except throughput."""
+    flat = {}
+    for clip, r in results.get("clips", {}).items():
+        for k in ("p50_ms", "p95_ms"):
+            if k in r.get("e2e", {}):
+                flat[f"clips/{clip}/e2e/{k}"] = r["e2e"][k]
+        for stage, p in r.get("stages", {}).items():
+            if "p50_ms" in p:
+                flat[f"clips/{clip}/stages/{stage}/p50_ms"] = p["p50_ms"]
+    # Keyed by the load clip so sweeps over different clips are never compared
+    load_clip = results.get("load_clip")
+    for level, r in results.get("concurrency", {}).items():
+        flat[f"concurrency/{load_clip}/{level}/throughput_rps"] = r["throughput_rps"]
+        if "p95_ms" in r.get("latency", {}):
+            flat[f"concurrency/{load_clip}/{level}/p95_ms"] = r["latency"]["p95_ms"]
+    if "peak_rss_mb" in results:
+        flat["peak_rss_mb"] = results["peak_rss_mb"]
+    return flat
+
+def compare(baseline: dict, current: dict, threshold: float, min_ms: float):
+    """Returns a list of (key, old, new, change) entries that regressed past the threshold."""
+    old, new = flatten(baseline), flatten(current)
+    regressions = []
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        if not a:
+            continue
+        if key.endswith("throughput_rps"):
+            change = (a - b) / a
+        else:
+            # Sub-millisecond stages are mostly timer noise
+            if key.endswith("_ms") and max(a, b) < min_ms:
+                continue
+            change = (b - a) / a
+        if change > threshold:
+            regressions.append((key, a, b, change))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", nargs="*", default=["clip1.mp3", "clip2.mp3"])
+    parser.add_argument("--durations", type=lambda s: [float(d) for d in s.split(",") if d],
+                        default=[1, 10, 60, 600], help="Synthetic clip durations in seconds (comma-separated)")
+    parser.add_argument("--runs", type=int, default=5, help="Sequential requests per clip")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",") if c],
+                        default=[1, 4, 16], help="Concurrency levels for the throughput sweep")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--load-clip", default="synthetic_10s", help="Clip used for the concurrency sweep")
+    parser.add_argument("--stub-model", action="store_true",
+                        help="Use a tiny random local model instead of the real checkpoint (no network)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Ignore latencies below this in comparisons")
+    args = parser.parse_args()
+
+    # Configure the app before it is imported: per-request stage timings on,
+    # no result cache (repeated clips would otherwise be cache hits)
+    os.environ["SERVER_TIMING"] = "1"
+    os.environ["CACHE_ENABLED"] = "0"
+    os.environ.setdefault("INFERENCE_QUEUE_SIZE", str(max(32, max(args.concurrency) * 2)))
+    stub_dir = None
+    if args.stub_model:
+        stub_dir = tempfile.mkdtemp(prefix="stub_model_")
+        build_stub_model(stub_dir)
+        os.environ["MODEL_LOCAL_DIR"] = stub_dir
+
+    import torch
+    from main import app
+    from core.classifier import classifier
+    from core.config import INFERENCE_BACKEND, INFERENCE_EXECUTOR, BATCH_ENABLED
+
+    classifier.start()
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+            "model": "stub" if args.stub_model else classifier.model_name,
+            "backend": INFERENCE_BACKEND,
+            "executor": INFERENCE_EXECUTOR,
+            "batching": BATCH_ENABLED,
+            "runs": args.runs,
+            "requests_per_level": args.requests,
+        },
+        "startup": dict(classifier.startup_timings),
+        "rss_after_startup_mb": peak_rss_mb(),
+    }
+    print(f"Model ready ({results['meta']['model']}, {INFERENCE_BACKEND}): {results['startup']}")
+
+    results.update(asyncio.run(run_suite(args, app)))
+    results["peak_rss_mb"] = peak_rss_mb()
+    print(f"\nPeak RSS: {results['peak_rss_mb']:.0f} MB (after startup {results['rss_after_startup_mb']:.0f} MB)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold, args.min_ms)
+        print(f"\n=== REGRESSION CHECK vs {args.compare} (threshold {args.threshold:.0%}) ===")
+        if not regressions:
+            print("   [OK] No regressions.")
+            return
+        for key, old, new, change in regressions:
+            print(f"   [REGRESSION] {key}: {old:g} -> {new:g} ({change:+.0%})")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+"""
+Closed-loop (fixed concurrency) or open-loop (fixed QPS) load generator for a
+running API. Replays a corpus of clips mixed by duration and encoding, ramps
+the load through --levels and reports, per level: throughput, latency
+percentiles, error and timeout rates and server memory; plus the saturation
+point (the last level where throughput still grew and errors stayed low).
+
+Server memory is sampled from /proc for the server process and all its
+children (serve.py workers): RSS, and PSS where available (RSS counts pages
+shared by the pre-forked workers once per worker, PSS splits them).
+
+With --start the server is launched locally (serve.py, result cache off so
+repeated clips are not cache hits) and stopped afterwards; otherwise point
+--url at a running server started with CACHE_ENABLED=0 and pass --server-pid
+for memory sampling.
+
+Usage:
+    python benchmarks/loadtest.py --start --stub-model --workers 2 --output load.json --report load.txt
+    python benchmarks/loadtest.py --start --mode qps --levels 1,2,4,8,16 --step-s 30
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --server-pid 1234 --corpus clips/
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import numpy as np
+import soundfile as sf
+
+# Add project root to path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from bench_suite import SR, build_stub_model, percentiles
+# Same environment as the server it loads (or starts), so the same key
+from core.config import API_KEY_SECRET
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".ogg")
+# soundfile (format, subtype) per encoding of the synthetic clips
+ENCODINGS = {
+    "wav": ("WAV", "PCM_16"),
+    "flac": ("FLAC", "PCM_16"),
+    "ogg": ("OGG", "VORBIS"),
+    "mp3": ("MP3", "MPEG_LAYER_III"),
+}
+
+# --- Corpus ---
+
+def synthetic_audio(seconds: float, seed: int) -> np.ndarray:
+    """Voice-like signal (see bench_suite.synthetic_clip), with a per-clip seed."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SR)) / SR
+    f0 = 110 + 60 * rng.random() + 20 * np.sin(2 * np.pi * 5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SR
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2
+    return (0.2 * voice * envelope + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+def encode(y: np.ndarray, encoding: str) -> bytes:
+    file_format, subtype = ENCODINGS[encoding]
+    buffer = io.BytesIO()
+    sf.write(buffer, y, SR, format=file_format, subtype=subtype)
+    return buffer.getvalue()
+
+def clip_entry(name: str, audio_bytes: bytes, seconds: float, encoding: str) -> dict:
+    return {
+        "name": name,
+        "seconds": round(seconds, 2),
+        "encoding": encoding,
+        "bytes": len(audio_bytes),
+        "body": json.dumps({
+            "language": "English", "audioFormat": encoding,
+            "audioBase64": base64.b64encode(audio_bytes).decode("ascii"),
+        }).encode("utf-8"),
+    }
+
+def build_corpus(args) -> list:
+    """Clips from --corpus (files or directories) plus synthetic ones for each --durations x --encodings."""
+    clips = []
+    paths = []
+    for path in args.corpus:
+        if os.path.isdir(path):
+            paths += sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            paths.append(path)
+    for path in paths:
+        with open(path, "rb") as f:
+            audio_bytes = f.read()
+        try:
+            seconds = sf.info(io.BytesIO(audio_bytes)).duration
+        except Exception:
+            seconds = 0.0  # Format soundfile cannot probe; duration unknown
+        clips.append(clip_entry(os.path.basename(path), audio_bytes, seconds, os.path.splitext(path)[1][1:].lower()))
+
+    available = sf.available_formats()
+    for i, seconds in enumerate(args.durations):
+        y = synthetic_audio(seconds, seed=i)
+        for encoding in args.encodings:
+            if ENCODINGS[encoding][0] not in available:
+                print(f"Skipping {encoding}: not supported by this libsndfile")
+                continue
+            clips.append(clip_entry(f"synthetic_{seconds:g}s.{encoding}", encode(y, encoding), seconds, encoding))
+    if not clips:
+        raise SystemExit("Empty corpus: pass --corpus and/or --durations")
+    return clips
+
+# --- Server memory ---
+
+def _descendants(pid: int) -> list:
+    pids, stack = [], [pid]
+    while stack:
+        p = stack.pop()
+        pids.append(p)
+        try:
+            for task in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{task}/children") as f:
+                    stack += [int(c) for c in f.read().split()]
+        except OSError:
+            pass
+    return pids
+
+def _proc_kb(path: str, field: str) -> int:
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+class MemorySampler:
+    """Samples RSS / PSS (MB) of a process tree every `interval_s` on a background thread."""
+    def __init__(self, pid: int, interval_s: float):
+        self.pid = pid
+        self.interval_s = interval_s
+        self.samples = []  # [seconds since start, level, rss_mb, pss_mb, processes]
+        self.level = None
+        self._stop = threading.Event()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def sample(self):
+        pids = _descendants(self.pid)
+        rss = sum(_proc_kb(f"/proc/{p}/status", "VmRSS:") for p in pids)
+        pss = sum(_proc_kb(f"/proc/{p}/smaps_rollup", "Pss:") for p in pids)
+        self.samples.append([
+            round(time.perf_counter() - self._started, 2), self.level,
+            round(rss / 1024, 1), round(pss / 1024, 1) if pss else None, len(pids),
+        ])
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def summary(self, level=None) -> dict:
+        rows = [s for s in self.samples if level is None or s[1] == level]
+        if not rows:
+            return {}
+        rss = [s[2] for s in rows]
+        pss = [s[3] for s in rows if s[3] is not None]
+        out = {"rss_start_mb": rss[0], "rss_peak_mb": max(rss), "rss_end_mb": rss[-1]}
+        if pss:
+            out.update(pss_start_mb=pss[0], pss_peak_mb=max(pss), pss_end_mb=pss[-1])
+        return out
+
+# --- Local server ---
+
+def start_server(args):
+    """Starts serve.py on --port with the result cache off and waits for /ready."""
+    env = dict(os.environ, CACHE_ENABLED="0")
+    if args.stub_model:
+        stub_dir = tempfile.mkdtemp(prefix="stub_model_")
+        build_stub_model(stub_dir)
+        env["MODEL_LOCAL_DIR"] = stub_dir
+    log = open(args.server_log, "w")
+    cmd = [sys.executable, os.path.join(ROOT, "serve.py"), "--host", "127.0.0.1", "--port", str(args.port),
+           "--workers", str(args.workers)]
+    print(f"Starting {' '.join(cmd)} (log: {args.server_log})")
+    process = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + args.startup_timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with code {process.returncode}; see {args.server_log}")
+        try:
+            if httpx.get(f"{url}/ready", timeout=2).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    raise SystemExit(f"Server not ready after {args.startup_timeout_s}s; see {args.server_log}")
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+# --- Load ---
+
+async def send(client, endpoint, clip, records, window_start):
+    started = time.perf_counter()
+    try:
+        r = await client.post(endpoint, content=clip["body"],
+                              headers={"x-api-key": API_KEY_SECRET, "Content-Type": "application/json"})
+        outcome = "ok" if r.status_code == 200 else f"http_{r.status_code}"
+    except Exception as e:
+        outcome = "timeout" if isinstance(e, httpx.TimeoutException) else f"error_{type(e).__name__}"
+    finished = time.perf_counter()
+    if started >= window_start:
+        records.append((clip["name"], outcome, (finished - started) * 1000.0, finished))
+
+async def run_level(client, args, clips, level, rng):
+    """
+    One ramp step: `args.warmup_s` unrecorded, then `args.step_s` recorded.
+    Requests started inside the recorded window are waited for and counted.
+    """
+    records = []
+    started = time.perf_counter()
+    window_start = started + args.warmup_s
+    stop_at = window_start + args.step_s
+
+    if args.mode == "concurrency":
+        async def client_loop():
+            while time.perf_counter() < stop_at:
+                await send(client, args.endpoint, rng.choice(clips), records, window_start)
+        await asyncio.gather(*(client_loop() for _ in range(int(level))))
+        skipped = 0
+    else:
+        # Open loop: Poisson arrivals at `level` req/s, whatever the latency
+        tasks, skipped = set(), 0
+        next_at = started
+        while next_at < stop_at:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            if len(tasks) >= args.max_inflight:
+                skipped += next_at >= window_start
+            else:
+                task = asyncio.create_task(send(client, args.endpoint, rng.choice(clips), records, window_start))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            next_at += rng.expovariate(level)
+        await asyncio.gather(*tasks)
+
+    # Throughput over the recorded window (extended by the stragglers it started)
+    wall = max([r[3] for r in records] + [stop_at]) - window_start
+    ok = [r[2] for r in records if r[1] == "ok"]
+    outcomes = {}
+    for _, outcome, _, _ in records:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    sent = len(records)
+    by_clip = {}
+    for name, outcome, latency_ms, _ in records:
+        if outcome == "ok":
+            by_clip.setdefault(name, []).append(latency_ms)
+    return {
+        "level": level,
+        "sent": sent,
+        "throughput_rps": round(len(ok) / wall, 3),
+        "latency": percentiles(ok),
+        "error_rate": round(sum(n for o, n in outcomes.items() if o not in ("ok", "timeout")) / max(sent, 1), 4),
+        "timeout_rate": round(outcomes.get("timeout", 0) / max(sent, 1), 4),
+        "outcomes": outcomes,
+        # Open loop only: arrivals dropped because --max-inflight requests were already outstanding
+        "skipped": skipped,
+        "by_clip": {name: percentiles(v) for name, v in sorted(by_clip.items())},
+    }
+
+def find_knee(levels: list, min_gain: float, max_error_rate: float) -> dict:
+    """
+    Saturation point: the last level before throughput stopped growing by at
+    least `min_gain` over the best so far, or before errors + timeouts went
+    above `max_error_rate`. `saturated` is False if the ramp never got there.
+    """
+    best = None
+    for row in levels:
+        failing = row["error_rate"] + row["timeout_rate"] > max_error_rate
+        flat = best is not None and row["throughput_rps"] < best["throughput_rps"] * (1 + min_gain)
+        if failing or flat:
+            if best is None:
+                return {"saturated": True, "level": None, "reason": "errors at the first level", "at_level": row["level"]}
+            return {
+                "saturated": True, "level": best["level"], "throughput_rps": best["throughput_rps"],
+                "p95_ms": best["latency"].get("p95_ms"), "at_level": row["level"],
+                "reason": "errors/timeouts" if failing else "throughput flat",
+            }
+        best = row
+    return {"saturated": False, "level": best["level"], "throughput_rps": best["throughput_rps"],
+            "p95_ms": best["latency"].get("p95_ms")}
+
+async def run_load(args, url, clips, sampler):
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    levels = []
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout_s, limits=limits) as client:
+        unit = "clients" if args.mode == "concurrency" else "req/s"
+        print(f"\n{unit:>8}{'sent':>7}{'ok/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+              f"{'err %':>8}{'t/o %':>8}{'RSS MB':>9}")
+        for level in args.levels:
+            if sampler is not None:
+                sampler.level = level
+            row = await run_level(client, args, clips, level, rng)
+            if sampler is not None:
+                row["memory"] = sampler.summary(level)
+            levels.append(row)
+            lat = row["latency"] or {"p50_ms": float("nan"), "p95_ms": float("nan"), "p99_ms": float("nan")}
+            rss = row.get("memory", {}).get("rss_peak_mb", float("nan"))
+            print(f"{level:>8g}{row['sent']:>7}{row['throughput_rps']:>9.2f}{lat['p50_ms']:>10.1f}"
+                  f"{lat['p95_ms']:>10.1f}{lat['p99_ms']:>10.1f}{100 * row['error_rate']:>8.1f}"
+                  f"{100 * row['timeout_rate']:>8.1f}{rss:>9.0f}")
+
+        server_stats = None
+        try:
+            r = await client.get("/api/stats", headers={"x-api-key": API_KEY_SECRET})
+            server_stats = r.json() if r.status_code == 200 else None
+        except httpx.HTTPError:
+            pass
+    return levels, server_stats
+
+# --- Report ---
+
+def text_report(results: dict) -> str:
+    meta, knee = results["meta"], results["saturation"]
+    unit = "clients" if meta["mode"] == "concurrency" else "req/s"
+    lines = [
+        f"Load test {meta['timestamp']} against {meta['url']} ({meta['mode']}, "
+        f"{meta['step_s']:g}s per level after {meta['warmup_s']:g}s warm-up, timeout {meta['timeout_s']:g}s)",
+        f"Corpus: {len(results['corpus'])} clips, "
+        + ", ".join(f"{c['name']} ({c['bytes'] / 1e3:.0f} kB)" for c in results["corpus"]),
+        "",
+        f"{unit:>8}{'sent':>7}{'ok/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err %':>8}{'t/o %':>8}{'RSS MB':>9}{'PSS MB':>9}",
+    ]
+    for row in results["levels"]:
+        lat = row["latency"] or {"p50_ms": float("nan"), "p95_ms": float("nan"), "p99_ms": float("nan")}
+        memory = row.get("memory", {})
+        lines.append(
+            f"{row['level']:>8g}{row['sent']:>7}{row['throughput_rps']:>9.2f}{lat['p50_ms']:>10.1f}"
+            f"{lat['p95_ms']:>10.1f}{lat['p99_ms']:>10.1f}{100 * row['error_rate']:>8.1f}"
+            f"{100 * row['timeout_rate']:>8.1f}{memory.get('rss_peak_mb', float('nan')):>9.0f}"
+            f"{memory.get('pss_peak_mb', float('nan')):>9.0f}"
+        )
+    lines.append("")
+    if knee.get("level") is None:
+        lines.append(f"Saturation: {knee['reason']} ({unit} {knee['at_level']:g}); lower the first level")
+    elif knee["saturated"]:
+        lines.append(f"Saturation: {knee['throughput_rps']:.2f} req/s at {knee['level']:g} {unit} "
+                     f"(p95 {knee['p95_ms']:.0f} ms); {knee['reason']} at {knee['at_level']:g} {unit}")
+    else:
+        lines.append(f"Not saturated: {knee['throughput_rps']:.2f} req/s at {knee['level']:g} {unit} "
+                     f"(p95 {knee['p95_ms']:.0f} ms); extend --levels")
+    failures = {}
+    for row in results["levels"]:
+        for outcome, n in row["outcomes"].items():
+            if outcome != "ok":
+                failures[outcome] = failures.get(outcome, 0) + n
+    if failures:
+        lines.append("Failures: " + ", ".join(f"{o} x{n}" for o, n in sorted(failures.items())))
+    if results.get("memory"):
+        m = results["memory"]
+        lines.append(f"Server RSS: {m['rss_start_mb']:.0f} MB at start, {m['rss_peak_mb']:.0f} MB peak, "
+                     f"{m['rss_end_mb']:.0f} MB at end"
+                     + (f" (PSS {m['pss_start_mb']:.0f} / {m['pss_peak_mb']:.0f} / {m['pss_end_mb']:.0f} MB)"
+                        if "pss_peak_mb" in m else ""))
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server to load (ignored with --start)")
+    parser.add_argument("--endpoint", default="/api/voice-detection")
+    parser.add_argument("--start", action="store_true", help="Start serve.py locally for the run")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --start")
+    parser.add_argument("--workers", type=int, default=1, help="serve.py workers for --start")
+    parser.add_argument("--stub-model", action="store_true", help="With --start: tiny random model (no network)")
+    parser.add_argument("--server-log", default=os.path.join(tempfile.gettempdir(), "loadtest_server.log"))
+    parser.add_argument("--startup-timeout-s", type=float, default=300)
+    parser.add_argument("--server-pid", type=int, help="Server process to sample memory from (without --start)")
+    parser.add_argument("--rss-interval-s", type=float, default=1.0)
+
+    parser.add_argument("--corpus", nargs="*", default=[os.path.join(ROOT, "clip1.mp3"), os.path.join(ROOT, "clip2.mp3")],
+                        help="Audio files or directories to replay")
+    parser.add_argument("--durations", type=lambda s: [float(d) for d in s.split(",") if d],
+                        default=[2, 10, 30], help="Synthetic clip durations in seconds (comma-separated, may be empty)")
+    parser.add_argument("--encodings", type=lambda s: [e for e in s.split(",") if e], default=["wav", "flac", "mp3"],
+                        help=f"Encodings of the synthetic clips ({', '.join(ENCODINGS)})")
+
+    parser.add_argument("--mode", choices=["concurrency", "qps"], default="concurrency",
+                        help="concurrency: closed loop, N clients back to back; qps: open loop, Poisson arrivals")
+    parser.add_argument("--levels", type=lambda s: [float(x) for x in s.split(",") if x],
+                        default=[1, 2, 4, 8, 16, 32], help="Ramp: clients or req/s per step")
+    parser.add_argument("--step-s", type=float, default=15, help="Recorded seconds per level")
+    parser.add_argument("--warmup-s", type=float, default=3, help="Unrecorded seconds at the start of each level")
+    parser.add_argument("--timeout-s", type=float, default=30, help="Client timeout per request")
+    parser.add_argument("--max-inflight", type=int, default=1024, help="Open loop: cap on outstanding requests")
+    parser.add_argument("--knee-gain", type=float, default=0.05,
+                        help="Saturated once a level adds less than this fraction of throughput")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Saturated once errors + timeouts exceed this fraction")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--report", help="Write the text report to this file")
+    args = parser.parse_args()
+    args.encodings = [e for e in args.encodings if e in ENCODINGS]
+
+    clips = build_corpus(args)
+    process, url, pid = None, args.url, args.server_pid
+    if args.start:
+        process, url = start_server(args)
+        pid = process.pid
+    elif pid is None:
+        print("No --server-pid: server memory is not sampled")
+
+    sampler = MemorySampler(pid, args.rss_interval_s) if pid else None
+    try:
+        if sampler is not None:
+            sampler.start()
+        levels, server_stats = asyncio.run(run_load(args, url, clips, sampler))
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        if process is not None:
+            stop_server(process)
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "url": url, "endpoint": args.endpoint, "mode": args.mode,
+            "step_s": args.step_s, "warmup_s": args.warmup_s, "timeout_s": args.timeout_s,
+            "started_server": bool(args.start), "workers": args.workers if args.start else None,
+            "stub_model": bool(args.stub_model),
+        },
+        "corpus": [{k: c[k] for k in ("name", "seconds", "encoding", "bytes")} for c in clips],
+        "levels": levels,
+        "saturation": find_knee(levels, args.knee_gain, args.max_error_rate),
+        "memory": sampler.summary() if sampler is not None else None,
+        "memory_samples": {
+            "columns": ["t_s", "level", "rss_mb", "pss_mb", "processes"],
+            "rows": sampler.samples,
+        } if sampler is not None else None,
+        "server_stats": server_stats,
+    }
+
+    report = text_report(results)
+    print("\n" + report)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(report)
+        print(f"Report written to {args.report}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,71 @@
 import base64
+import io
+import shutil
+import subprocess
 import numpy as np
-import tempfile
-import os
 import librosa
+import soundfile as sf
 
-def decode_audio(base64_string: str) -> np.ndarray:
+from core.metrics import stage
+
+# Wav2Vec2 and deepfake detection models expect 16kHz mono
+TARGET_SR = 16000
+
+class AudioDecodeError(ValueError):
+    """Raised when the payload cannot be decoded into an audio signal."""
+
+def _read_soundfile(audio_bytes: bytes):
+    # libsndfile >= 1.1 reads MP3, WAV, OGG/Vorbis, FLAC straight from a buffer
+    return sf.read(io.BytesIO(audio_bytes), dtype="float32", always_2d=False)
+
+def _read_ffmpeg(audio_bytes: bytes, target_sr: int):
+    # Fallback for containers libsndfile can't parse; still fully in memory via pipes
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("Unsupported audio format and ffmpeg is not installed")
+    proc = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "f32le", "-ac", "1", "-ar", str(target_sr), "pipe:1"],
+        input=audio_bytes, capture_output=True, check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode(errors="replace").strip() or "ffmpeg failed")
+    return np.frombuffer(proc.stdout, dtype=np.float32), target_sr
+
+def decode_audio_bytes(audio_bytes: bytes, target_sr: int = TARGET_SR):
+    """
+    Decodes raw MP3/WAV/OGG bytes in memory to a mono float32 array at target_sr.
+    Resamples only when the source rate differs. Returns (audio_array, sr).
+    """
+    try:
+        with stage("decode"):
+            try:
+                y, sr = _read_soundfile(audio_bytes)
+            except (sf.LibsndfileError, RuntimeError, TypeError):
+                y, sr = _read_ffmpeg(audio_bytes, target_sr)
+
+        # Downmix (frames, channels) -> mono
+        if y.ndim > 1:
+            y = y.mean(axis=1, dtype=np.float32)
+
+        if y.size == 0:
+            raise RuntimeError("Decoded audio is empty")
+
+        if sr != target_sr:
+            with stage("resample"):
+                y = librosa.resample(y, orig_sr=sr, target_sr=target_sr)
+
+        return np.ascontiguousarray(y, dtype=np.float32), target_sr
+
+    except Exception as e:
+        raise AudioDecodeError(f"Failed to process audio: {type(e).__name__} - {str(e)}")
+
+def decode_audio(base64_string: str):
     """
     Decodes a Base64 string to a numpy array (audio series).
+    Prefer decode_audio_bytes() when the payload has already been base64-decoded.
     """
     try:
-        # Decode base64 string to bytes
         audio_bytes = base64.b64decode(base64_string)
-        
-        # Create a temporary file to save the audio
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_audio:
-            temp_audio.write(audio_bytes)
-            temp_path = temp_audio.name
-        
-        try:
-            # Load audio using librosa
-            # sr=16000 is crucial for Wav2Vec2 and deepfake detection models
-            y, sr = librosa.load(temp_path, sr=16000)
-            return y, sr
-        finally:
-            # Cleanup temp file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-                
     except Exception as e:
-        import traceback
-        traceback.print_exc() # Print stack trace to server logs
-        raise ValueError(f"Failed to process audio: {type(e).__name__} - {str(e)}")
+        raise AudioDecodeError(f"Failed to process audio: {type(e).__name__} - {str(e)}")
+    return decode_audio_bytes(audio_bytes)
@@ -0,0 +1,145 @@
+import os
+import logging
+
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoModelForAudioClassification
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch_int8", "onnx")
+
+class TorchBackend:
+    """Eager fp32 PyTorch, the original inference path."""
+    name = "torch"
+
+    def __init__(self, model, device):
+        self.model = model.to(device).eval()
+        self.device = device
+        self.config = model.config
+
+    def forward(self, input_values: np.ndarray, attention_mask: np.ndarray = None) -> np.ndarray:
+        # from_numpy shares the buffer: no copy on CPU, an async copy from pinned memory on GPU
+        inputs = {"input_values": torch.from_numpy(input_values).to(self.device, non_blocking=True)}
+        if attention_mask is not None:
+            inputs["attention_mask"] = torch.from_numpy(attention_mask).to(self.device, non_blocking=True)
+
+        with torch.no_grad():
+            logits = self.model(**inputs).logits
+
+        return logits.float().cpu().numpy()
+
+    def after_fork(self):
+        """Called in a freshly forked worker; torch re-creates its thread pools itself."""
+
+class QuantizedTorchBackend(TorchBackend):
+    """PyTorch with dynamically int8-quantized Linear layers (CPU only)."""
+    name = "torch_int8"
+
+    def __init__(self, model):
+        super().__init__(model, torch.device("cpu"))
+
+class OnnxBackend:
+    """Exported ONNX graph run by onnxruntime on CPU."""
+    name = "onnx"
+
+    def __init__(self, path, config):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("The 'onnx' backend needs onnxruntime: pip install onnx onnxruntime")
+
+        self._ort = ort
+        self.path = path
+        self.model = None
+        self.config = config
+        self._create_session()
+
+    def _create_session(self):
+        options = self._ort.SessionOptions()
+        options.intra_op_num_threads = torch.get_num_threads()
+        options.graph_optimization_level = self._ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = self._ort.InferenceSession(self.path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def after_fork(self):
+        """onnxruntime thread pools do not survive fork(); rebuild the session with this worker's thread budget."""
+        self._create_session()
+
+    def forward(self, input_values: np.ndarray, attention_mask: np.ndarray = None) -> np.ndarray:
+        feed = {"input_values": input_values.astype(np.float32, copy=False)}
+        if attention_mask is not None and "attention_mask" in self.input_names:
+            feed["attention_mask"] = attention_mask.astype(np.int64, copy=False)
+        return self.session.run(["logits"], feed)[0]
+
+# --- Artefacts ---
+
+def artifact_path(model_name: str, backend: str, artifact_dir: str) -> str:
+    safe_name = model_name.strip("/").replace("/", "--")
+    suffix = {"torch_int8": "int8.pt", "onnx": "onnx"}[backend]
+    return os.path.join(artifact_dir, f"{safe_name}.{suffix}")
+
+def _quantize(model):
+    return torch.ao.quantization.quantize_dynamic(model.cpu().eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+def export_artifact(backend: str, model_source: str, model_name: str, artifact_dir: str,
+                    use_attention_mask: bool = False, local_files_only: bool = False) -> str:
+    """
+    One-time conversion of the fp32 checkpoint into a cached on-disk artefact.
+    Returns the artefact path.
+    """
+    path = artifact_path(model_name, backend, artifact_dir)
+    os.makedirs(artifact_dir, exist_ok=True)
+    model = AutoModelForAudioClassification.from_pretrained(model_source, local_files_only=local_files_only).eval()
+
+    if backend == "torch_int8":
+        # Parametrized modules (weight norm) only serialise through state_dict()
+        torch.save(_quantize(model).state_dict(), path)
+
+    elif backend == "onnx":
+        dummy = torch.zeros(1, 16000, dtype=torch.float32)
+        input_names = ["input_values"]
+        args = (dummy,)
+        dynamic_axes = {"input_values": {0: "batch", 1: "samples"}, "logits": {0: "batch"}}
+        if use_attention_mask:
+            args = (dummy, torch.ones(1, 16000, dtype=torch.int64))
+            input_names.append("attention_mask")
+            dynamic_axes["attention_mask"] = {0: "batch", 1: "samples"}
+        torch.onnx.export(
+            model, args, path, input_names=input_names, output_names=["logits"],
+            dynamic_axes=dynamic_axes, opset_version=17, dynamo=False,
+        )
+
+    else:
+        raise ValueError(f"Backend '{backend}' has no exportable artefact")
+
+    logger.info(f"Exported {backend} artefact to {path}")
+    return path
+
+def load_backend(backend: str, model_source: str, model_name: str, device, artifact_dir: str,
+                 use_attention_mask: bool = False, local_files_only: bool = False):
+    """
+    Builds the configured inference backend. Missing artefacts are created
+    on first use and cached in artifact_dir (see export_model.py).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == "torch":
+        model = AutoModelForAudioClassification.from_pretrained(model_source, local_files_only=local_files_only)
+        return TorchBackend(model, device)
+
+    path = artifact_path(model_name, backend, artifact_dir)
+    if not os.path.exists(path):
+        logger.warning(f"No cached {backend} artefact at {path}; creating it now")
+        export_artifact(backend, model_source, model_name, artifact_dir, use_attention_mask, local_files_only)
+
+    config = AutoConfig.from_pretrained(model_source, local_files_only=local_files_only)
+
+    if backend == "torch_int8":
+        # Quantize an empty skeleton, then load the cached int8 weights into it
+        model = _quantize(AutoModelForAudioClassification.from_config(config))
+        model.load_state_dict(torch.load(path, map_location="cpu"))
+        return QuantizedTorchBackend(model)
+
+    return OnnxBackend(path, config)
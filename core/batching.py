@@ -0,0 +1,166 @@
+import threading
+import time
+import os
+import logging
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class _PendingItem:
+    __slots__ = ("audio_array", "future", "enqueued_at")
+
+    def __init__(self, audio_array, future, enqueued_at):
+        self.audio_array = audio_array
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+class BatchScheduler:
+    """
+    Dynamic micro-batching engine that sits in front of the model.
+
+    Callers submit one clip at a time and get a Future for its logits. A single
+    background thread groups queued clips of similar length (so padding waste
+    stays low) into batches of at most `max_batch_size`, waiting no longer than
+    `max_wait_ms` for the oldest clip, and runs each batch as one padded forward
+    pass through `run_batch(list_of_arrays) -> np.ndarray[n, num_labels]`.
+    """
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=10.0, bucket_ratio=1.5, stats_window=1000):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        # Clips are only batched together if longest / shortest <= bucket_ratio
+        self.bucket_ratio = max(1.0, float(bucket_ratio))
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+
+        # Stats
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._size_counts = {}
+        self._wait_times = deque(maxlen=stats_window)
+        self._real_samples = 0
+        self._padded_samples = 0
+
+    # --- Public API ---
+
+    def submit(self, audio_array: np.ndarray) -> Future:
+        """Queues one clip and returns a Future resolving to its 1-D logits."""
+        future = Future()
+        self._ensure_started()
+        with self._cond:
+            self._pending.append(_PendingItem(audio_array, future, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    def infer(self, audio_array: np.ndarray) -> np.ndarray:
+        """Blocking helper: submit a clip and wait for its logits."""
+        return self.submit(audio_array).result()
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            waits_ms = np.array(self._wait_times, dtype=np.float64) * 1000.0
+            padded = self._padded_samples
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": round(self._items / self._batches, 3) if self._batches else 0.0,
+                "batch_size_counts": dict(sorted(self._size_counts.items())),
+                "wait_ms": {
+                    "mean": round(float(waits_ms.mean()), 3) if waits_ms.size else 0.0,
+                    "p50": round(float(np.percentile(waits_ms, 50)), 3) if waits_ms.size else 0.0,
+                    "p95": round(float(np.percentile(waits_ms, 95)), 3) if waits_ms.size else 0.0,
+                    "max": round(float(waits_ms.max()), 3) if waits_ms.size else 0.0,
+                },
+                "padding_efficiency": round(self._real_samples / padded, 4) if padded else 1.0,
+                "queue_depth": self.queue_depth(),
+            }
+
+    # --- Internals ---
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so (re)start lazily in whichever process submits
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, name="batch-scheduler", daemon=True)
+            self._thread.start()
+
+    def _take_batch(self):
+        """Pops the oldest item plus up to max_batch_size-1 others of similar length."""
+        seed = self._pending[0]
+        seed_len = max(len(seed.audio_array), 1)
+        batch = [seed]
+        lo, hi = seed_len, seed_len
+
+        for item in self._pending[1:]:
+            if len(batch) >= self.max_batch_size:
+                break
+            n = max(len(item.audio_array), 1)
+            new_lo, new_hi = min(lo, n), max(hi, n)
+            if new_hi / new_lo <= self.bucket_ratio:
+                batch.append(item)
+                lo, hi = new_lo, new_hi
+
+        taken = set(map(id, batch))
+        self._pending = [item for item in self._pending if id(item) not in taken]
+        return batch
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+
+                # Wait for the batch to fill up, but never past the oldest item's deadline
+                deadline = self._pending[0].enqueued_at + self.max_wait
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._take_batch()
+
+            self._run(batch)
+
+    def _run(self, batch):
+        started = time.monotonic()
+        live = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not live:
+            return
+
+        try:
+            logits = self.run_batch([item.audio_array for item in live])
+        except Exception as e:
+            logger.error(f"Batched inference failed for {len(live)} item(s): {e}")
+            for item in live:
+                item.future.set_exception(e)
+            return
+
+        for item, row in zip(live, logits):
+            item.future.set_result(row)
+
+        lengths = [len(item.audio_array) for item in live]
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(live)
+            self._size_counts[len(live)] = self._size_counts.get(len(live), 0) + 1
+            self._wait_times.extend(started - item.enqueued_at for item in live)
+            self._real_samples += sum(lengths)
+            self._padded_samples += max(lengths) * len(lengths)
@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+from core.config import CACHE_ENABLED, CACHE_MAX_BYTES, CACHE_TTL_S, CACHE_DIR, CACHE_DISK_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Expired disk entries are swept at least this often, even while under the byte budget
+DISK_SWEEP_INTERVAL_S = 300.0
+
+class ResultCache:
+    """
+    Content-addressed cache for analysis results (JSON-serialisable dicts).
+
+    Entries are keyed by a hash of the audio bytes plus the model identity and
+    live in an in-memory LRU bounded by `max_bytes`, each expiring after `ttl_s`.
+    If `disk_dir` is set, entries are also written there so they survive
+    restarts; that tier is bounded by `disk_max_bytes` (oldest written first
+    out) and swept of expired files at startup and then periodically.
+    Concurrent get_or_compute() calls for the same key share a single computation.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl_s=3600.0, disk_dir=None, enabled=True,
+                 disk_max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = int(max_bytes)
+        self.ttl_s = float(ttl_s)
+        self.disk_dir = disk_dir or None
+        self.disk_max_bytes = int(disk_max_bytes)
+        self.enabled = enabled
+
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> asyncio.Task
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        # Disk tier size as of the last sweep plus what this process wrote since
+        self._disk_bytes = 0
+        self._next_sweep = 0.0
+        self._sweeping = False
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_sweep()
+
+    @staticmethod
+    def make_key(audio_bytes: bytes, model_identity: str) -> str:
+        h = hashlib.sha256()
+        h.update(model_identity.encode("utf-8"))
+        h.update(b"\0")
+        h.update(audio_bytes)
+        return h.hexdigest()
+
+    # --- Lookup / store ---
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, size, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return value
+                self._drop(key)
+
+        value = self._disk_get(key, now)
+        if value is not None:
+            # Promote to memory for the next hit
+            self._memory_put(key, value, now)
+        return value
+
+    def lookup(self, *keys: str):
+        """First value cached under `keys` (tried in order), counted as one hit or one miss."""
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: dict):
+        if not self.enabled:
+            return
+        now = time.time()
+        self._memory_put(key, value, now)
+        self._disk_put(key, value, now)
+
+    async def get_or_compute(self, key: str, compute, coalesce: bool = True, cacheable=None):
+        """
+        Returns the cached value for `key`, or awaits `compute()` (an async callable)
+        exactly once across all concurrent callers and caches its result.
+        With `coalesce=False` the caller runs its own computation instead of
+        joining one in flight, and the result is only stored when
+        `cacheable(result)` is true (if given).
+        """
+        if not self.enabled:
+            return await compute()
+
+        value = self.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        task = self._inflight.get(key) if coalesce else None
+        if task is not None:
+            with self._lock:
+                self.coalesced += 1
+        else:
+            with self._lock:
+                self.misses += 1
+            task = asyncio.ensure_future(compute())
+            if coalesce:
+                self._inflight[key] = task
+
+            def _done(t, key=key):
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+                if not t.cancelled() and t.exception() is None and (cacheable is None or cacheable(t.result())):
+                    self.put(key, t.result())
+
+            task.add_done_callback(_done)
+
+        # Shield so a disconnecting client doesn't cancel work other callers wait on
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "disk_bytes": self._disk_bytes,
+                "disk_evictions": self.disk_evictions,
+                "inflight": len(self._inflight),
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            }
+
+    # --- Memory tier ---
+
+    def _memory_put(self, key, value, now):
+        size = len(json.dumps(value)) + len(key)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (now + self.ttl_s, size, value)
+            self._size += size
+            # Evict least recently used entries until we're back under budget
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+    # --- Disk tier ---
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("expires_at", 0) <= now:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        return record["value"]
+
+    def _disk_put(self, key, value, now):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": now + self.ttl_s, "value": value}, f)
+                size = f.tell()
+            # Atomic so concurrent workers never see a half-written entry
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry to disk: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += size
+            due = not self._sweeping and (self._disk_bytes > self.disk_max_bytes or now >= self._next_sweep)
+            if due:
+                self._sweeping = True
+        if due:
+            # Walking the directory is slow on a big tier: keep it off the caller (often the event loop)
+            threading.Thread(target=self._disk_sweep, name="cache-sweep", daemon=True).start()
+
+    def _disk_sweep(self):
+        """
+        Deletes expired entry files, then the oldest ones until the tier is back
+        under 90% of `disk_max_bytes`. Entries are written once, so their mtime is
+        their write time; workers sharing the directory may sweep concurrently.
+        """
+        now = time.time()
+        files = []
+        try:
+            for root, _, names in os.walk(self.disk_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue  # Removed by another worker
+                    files.append((st.st_mtime, st.st_size, path))
+        except OSError as e:
+            logger.warning(f"Failed to sweep cache directory: {e}")
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = int(0.9 * self.disk_max_bytes)
+        evicted = 0
+        for mtime, size, path in files:
+            # Stale .tmp files of crashed writers age out the same way
+            if mtime + self.ttl_s > now and total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if mtime + self.ttl_s > now:
+                evicted += 1
+
+        with self._lock:
+            self._disk_bytes = total
+            self.disk_evictions += evicted
+            self._next_sweep = now + min(self.ttl_s, DISK_SWEEP_INTERVAL_S)
+            self._sweeping = False
+
+result_cache = ResultCache(
+    max_bytes=CACHE_MAX_BYTES, ttl_s=CACHE_TTL_S, disk_dir=CACHE_DIR, enabled=CACHE_ENABLED,
+    disk_max_bytes=CACHE_DISK_MAX_BYTES,
+)
@@ -0,0 +1,127 @@
+import hashlib
+import json
+
+import numpy as np
+
+# Signal features the pre-classifier sees, all from core.features.SignalFeatures.
+# No pyin pitch: it costs more than the forward pass the cascade is meant to skip.
+FEATURE_NAMES = ("zcr_std", "log_flatness", "rolloff_khz", "log_rms")
+
+def feature_vector(features) -> np.ndarray:
+    """Model inputs for one clip from its SignalFeatures (zero-crossing spread, flatness, rolloff, rms)."""
+    return np.array([
+        features.zcr_std,
+        np.log(features.flatness + 1e-10),
+        features.rolloff / 1000.0,
+        np.log(features.rms + 1e-8),
+    ], dtype=np.float64)
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -50, 50)))
+
+def choose_band(ai_probability: np.ndarray, is_ai: np.ndarray, agreement: float = 0.98):
+    """
+    Widest (low, high) thresholds such that clips with p <= low are HUMAN and
+    clips with p >= high are AI_GENERATED in at least `agreement` of cases.
+    Everything in between is escalated. Returns (0.0, 1.0) when nothing qualifies.
+    """
+    order = np.argsort(ai_probability)
+    p, y = ai_probability[order], is_ai[order].astype(np.float64)
+    n = np.arange(1, len(p) + 1)
+
+    human_rate = np.cumsum(1.0 - y) / n
+    ok = np.flatnonzero(human_rate >= agreement)
+    low = float(p[ok.max()]) if ok.size else 0.0
+
+    ai_rate = np.cumsum(y[::-1]) / n
+    ok = np.flatnonzero(ai_rate >= agreement)
+    high = float(p[::-1][ok.max()]) if ok.size else 1.0
+
+    if low >= high:
+        # Separable at this agreement: no band, split at the midpoint
+        low = high = (low + high) / 2
+    return low, high
+
+class CascadeModel:
+    """
+    Logistic regression on standardised signal features, used as a cheap first
+    stage: clips whose AI probability falls outside the (low, high) uncertainty
+    band are answered without running the transformer.
+    """
+    def __init__(self, mean, scale, weights, bias, low, high, meta=None):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.low, self.high = float(low), float(high)
+        self.meta = meta or {}
+
+    @classmethod
+    def fit(cls, X: np.ndarray, is_ai: np.ndarray, l2: float = 1e-2, agreement: float = 0.98, iterations: int = 50):
+        """Fits by Newton's method (IRLS) and picks the band for `agreement`."""
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(is_ai, dtype=np.float64)
+        mean, scale = X.mean(axis=0), X.std(axis=0)
+        scale[scale == 0] = 1.0
+        Xb = np.hstack([(X - mean) / scale, np.ones((len(X), 1))])
+
+        # The bias is not regularised
+        penalty = np.full(Xb.shape[1], l2)
+        penalty[-1] = 0.0
+        w = np.zeros(Xb.shape[1])
+        for _ in range(iterations):
+            p = _sigmoid(Xb @ w)
+            gradient = Xb.T @ (p - y) + penalty * w
+            hessian = (Xb * (p * (1 - p))[:, None]).T @ Xb + np.diag(penalty) + 1e-9 * np.eye(len(w))
+            step = np.linalg.solve(hessian, gradient)
+            w -= step
+            if np.abs(step).max() < 1e-8:
+                break
+
+        model = cls(mean, scale, w[:-1], w[-1], 0.0, 1.0)
+        model.low, model.high = choose_band(model.ai_probability(X), y > 0.5, agreement)
+        model.meta = {"features": list(FEATURE_NAMES), "samples": int(len(X)), "agreement": agreement}
+        return model
+
+    def ai_probability(self, X: np.ndarray) -> np.ndarray:
+        """P(AI_GENERATED) for feature rows X of shape (n, len(FEATURE_NAMES))."""
+        return _sigmoid(((np.atleast_2d(X) - self.mean) / self.scale) @ self.weights + self.bias)
+
+    def decide(self, ai_probability: float):
+        """The cascade's verdict, or None when the clip is in the uncertainty band."""
+        if ai_probability >= self.high:
+            return "AI_GENERATED"
+        if ai_probability <= self.low:
+            return "HUMAN"
+        return None
+
+    @property
+    def version(self) -> str:
+        """Short hash of the parameters and band; part of the classifier identity."""
+        return hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+    def to_dict(self) -> dict:
+        return {
+            "mean": self.mean.tolist(), "scale": self.scale.tolist(),
+            "weights": self.weights.tolist(), "bias": self.bias,
+            "low": self.low, "high": self.high, "meta": self.meta,
+        }
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str, low: float = None, high: float = None):
+        """Loads a saved model; `low` / `high` override the band chosen at training time."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if low is not None:
+            data["low"] = low
+        if high is not None:
+            data["high"] = high
+        features = data.get("meta", {}).get("features")
+        if features is not None and tuple(features) != FEATURE_NAMES:
+            raise ValueError(f"{path} was trained on {features}, expected {list(FEATURE_NAMES)}; "
+                             f"retrain it with `python calibrate.py cascade-train`")
+        return cls(**data)
@@ -1,10 +1,35 @@
 import torch
 import librosa
 import numpy as np
-from transformers import AutoModelForAudioClassification, AutoFeatureExtractor
+from transformers import AutoFeatureExtractor
+import itertools
 import logging
 import os
 import random
+import threading
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import List, Optional
+
+from core.backends import load_backend
+from core.batching import BatchScheduler
+from core.cascade import CascadeModel, feature_vector
+from core.deadline import DeadlineExceeded, cost_model
+from core.features import SignalFeatures
+from core.inference_server import InferenceClient
+from core.metrics import registry, stage, AUDIO_SECONDS, TRIMMED_SECONDS, DECISIONS
+from core.preprocess import Preprocessor
+from core.vad import trim_silence
+from core.config import (
+    BATCH_ENABLED, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, BATCH_BUCKET_RATIO,
+    CHUNK_WINDOW_S, CHUNK_HOP_S, MAX_ANALYSED_S, CHUNK_AGGREGATION,
+    CHUNK_EARLY_EXIT_CONFIDENCE, CHUNK_EARLY_EXIT_MIN_SEGMENTS,
+    MODEL_NAME, MODEL_LOCAL_DIR, INFERENCE_BACKEND, MODEL_ARTIFACT_DIR, WARMUP_DURATIONS_S,
+    VAD_ENABLED, VAD_FLOOR_DB, VAD_RELATIVE_DB, VAD_MAX_SILENCE_MS, FAST_PREPROCESS,
+    DEADLINE_MIN_ANALYSED_S, CASCADE_MODEL_PATH, CASCADE_LOW, CASCADE_HIGH,
+    INFERENCE_SERVER_SOCKET, INFERENCE_SERVER_TIMEOUT_S,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -45,27 +70,20 @@ class ForensicExplainer:
             ]
         }
 
-    def analyze_signal(self, audio_array, sr=16000):
+    def analyze_signal(self, audio_array, sr=16000, features=None):
         try:
-            # 1. Pitch Analysis
-            f0, _, _ = librosa.pyin(audio_array, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'), sr=sr)
-            f0 = f0[~np.isnan(f0)]
-            pitch_std = np.std(f0) if len(f0) > 0 else 0
-
-            # 2. Spectral Features
-            flatness = np.mean(librosa.feature.spectral_flatness(y=audio_array))
-            rolloff = np.mean(librosa.feature.spectral_rolloff(y=audio_array, sr=sr, roll_percent=0.95))
-            
-            return {"pitch_var": pitch_std, "flatness": flatness, "rolloff": rolloff}
+            # One shared STFT for flatness/rolloff plus a YIN pitch track (see core/features.py)
+            features = features if features is not None else SignalFeatures(audio_array, sr)
+            return features.as_dict()
         except Exception as e:
             logger.warning(f"Signal analysis failed: {e}")
             return {"pitch_var": 0, "flatness": 0, "rolloff": 0}
 
-    def get_explanation(self, classification, confidence, audio_array, sr=16000):
+    def get_explanation(self, classification, confidence, audio_array, sr=16000, features=None):
         if confidence < 0.60:
             return "Classification based on subtle spectral features, though signal ambiguity remains high."
 
-        features = self.analyze_signal(audio_array, sr)
+        features = self.analyze_signal(audio_array, sr, features=features)
 
         if classification == "AI_GENERATED":
             if features["pitch_var"] < 20: return random.choice(self.ai_reasons["monotone"])
@@ -76,64 +94,583 @@ class ForensicExplainer:
             if features["pitch_var"] > 40: return random.choice(self.human_reasons["dynamic"])
             else: return random.choice(self.human_reasons["natural"])
 
+    def template_explanation(self, classification):
+        """Explanation without signal analysis, for when the explainer is skipped to meet a deadline."""
+        if classification == "AI_GENERATED":
+            return "Model detected spectral patterns typical of synthetic speech (detailed signal analysis skipped to meet the deadline)."
+        return "Model detected spectral patterns typical of natural speech (detailed signal analysis skipped to meet the deadline)."
+
+@dataclass
+class Prediction:
+    classification: str
+    confidence: float
+    # None when the explanation was not requested (explanation mode "none" / "async")
+    explanation: Optional[str]
+    # Per-window scores when the clip was analysed in chunks, else None
+    segments: Optional[List[dict]] = None
+    # Seconds of silence removed by the VAD stage before inference
+    trimmed_seconds: float = 0.0
+    # Steps taken to meet the request's deadline ("skip_explainer", "cap_duration")
+    degradations: List[str] = field(default_factory=list)
+    # Stage that produced the verdict: "cascade" (signal-feature pre-classifier) or "model"
+    decided_by: str = "model"
+    # Duration of the decoded clip, charged against the tenant's audio quota (set by core.pipeline)
+    audio_seconds: float = 0.0
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    z = logits - logits.max(axis=-1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=-1, keepdims=True)
+
+def _aggregate(seg_probs: np.ndarray, method: str, ai_ids) -> np.ndarray:
+    """Combines per-segment class probabilities (n_segments, n_labels) into one vector."""
+    if method == "max":
+        # The most suspicious segment decides
+        return seg_probs[int(np.argmax(seg_probs[:, ai_ids].sum(axis=1)))]
+    if method == "weighted":
+        # Confident segments count more than ambiguous ones
+        weights = seg_probs.max(axis=1)
+        return (seg_probs * weights[:, None]).sum(axis=0) / weights.sum()
+    return seg_probs.mean(axis=0)
+
 class VoiceClassifier:
+    """
+    Wav2Vec2 deepfake classifier. Construction is cheap; weights are loaded by
+    start() (run from the app's lifespan hook) or lazily on first use.
+    """
     def __init__(self):
-        self.model_name = "MelodyMachine/Deepfake-audio-detection-V2"
+        self.model_name = MODEL_NAME
+        # Pinned local snapshot, if configured; never falls back to the hub
+        self.model_source = MODEL_LOCAL_DIR or MODEL_NAME
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.target_sr = 16000 
 
-        logger.info(f"Loading model {self.model_name} on {self.device}...")
+        self.feature_extractor = None
+        # In-place normaliser used instead of the extractor on the hot path (see core/preprocess.py)
+        self.preprocessor = None
+        self.backend = None
+        # Underlying torch module (None for non-torch backends) and its config
+        self.model = None
+        self.config = None
+        # Set when the model runs in a dedicated inference server (core/inference_server.py)
+        self.remote_socket = INFERENCE_SERVER_SOCKET
+        self.remote = None
+        self.explainer = ForensicExplainer()
+        # Drop long silences before the model and the explainer see the clip
+        self.vad_enabled = VAD_ENABLED
+        # Optional first stage answering clear-cut clips from signal features (a few floats, cheap to load)
+        self.cascade = CascadeModel.load(CASCADE_MODEL_PATH, CASCADE_LOW, CASCADE_HIGH) if CASCADE_MODEL_PATH else None
+
+        # Startup phase: not_loaded -> loading -> warming_up -> ready (or failed)
+        self.phase = "not_loaded"
+        self.startup_timings = {}
+        self.startup_error = None
+        self._load_lock = threading.Lock()
+
+        # Everything that changes the output for a given clip; part of result cache keys
+        self.identity = (
+            f"{self.model_name}|backend={INFERENCE_BACKEND}|window={CHUNK_WINDOW_S},hop={CHUNK_HOP_S},max={MAX_ANALYSED_S},"
+            f"agg={CHUNK_AGGREGATION},exit={CHUNK_EARLY_EXIT_CONFIDENCE}|"
+            f"vad={VAD_ENABLED},floor={VAD_FLOOR_DB},rel={VAD_RELATIVE_DB},gap={VAD_MAX_SILENCE_MS}|"
+            f"cascade={self.cascade.version if self.cascade is not None else 'off'}"
+        )
+
+        # Concurrent predict() calls are grouped into padded batches
+        self.batcher = BatchScheduler(
+            self.forward_batch,
+            max_batch_size=BATCH_MAX_SIZE,
+            max_wait_ms=BATCH_MAX_WAIT_MS,
+            bucket_ratio=BATCH_BUCKET_RATIO,
+        ) if BATCH_ENABLED else None
+
+    @property
+    def ready(self) -> bool:
+        return self.phase == "ready"
+
+    @property
+    def masks_padding(self) -> bool:
+        """
+        True when the model gets an attention mask, so zero padding in a batch
+        leaves each clip's output unchanged. Group-norm checkpoints (like the
+        default one) get none: their clips may only share a pass with clips of
+        the same length.
+        """
+        return self.feature_extractor is not None and bool(self.feature_extractor.return_attention_mask)
+
+    def batch_groups(self, indices, length_of, batch_size: int = BATCH_MAX_SIZE):
+        """
+        Splits `indices` into forward passes of at most `batch_size` clips,
+        sorted by length; without an attention mask only equal lengths share one.
+        """
+        indices = sorted(indices, key=length_of)
+        if self.masks_padding:
+            return [indices[g:g + batch_size] for g in range(0, len(indices), batch_size)]
+        groups = []
+        for _, same in itertools.groupby(indices, key=length_of):
+            same = list(same)
+            groups += [same[g:g + batch_size] for g in range(0, len(same), batch_size)]
+        return groups
+
+    def load(self):
+        """Loads the feature extractor and model weights once (thread-safe, idempotent)."""
+        if self.backend is not None or self.remote is not None:
+            return
+        with self._load_lock:
+            if self.backend is not None or self.remote is not None:
+                return
+            self.phase = "loading"
+            started = time.perf_counter()
+            if self.remote_socket:
+                self._connect_remote(started)
+                return
+            logger.info(f"Loading model {self.model_name} from {self.model_source} "
+                        f"({INFERENCE_BACKEND} backend) on {self.device}...")
+            try:
+                local_files_only = bool(MODEL_LOCAL_DIR)
+                self.feature_extractor = AutoFeatureExtractor.from_pretrained(
+                    self.model_source, local_files_only=local_files_only
+                )
+                backend = load_backend(
+                    INFERENCE_BACKEND, self.model_source, self.model_name, self.device, MODEL_ARTIFACT_DIR,
+                    use_attention_mask=bool(self.feature_extractor.return_attention_mask),
+                    local_files_only=local_files_only,
+                )
+                if FAST_PREPROCESS:
+                    self.preprocessor = Preprocessor.from_feature_extractor(
+                        self.feature_extractor, pin_memory=self.device.type == "cuda"
+                    )
+                if self.batcher is not None and not self.masks_padding:
+                    # Padding would change the other clips' outputs: equal lengths only
+                    self.batcher.bucket_ratio = 1.0
+                self.model = backend.model
+                self.config = backend.config
+                self.backend = backend
+            except Exception as e:
+                self.phase = "failed"
+                self.startup_error = str(e)
+                logger.error(f"Failed to load model: {e}")
+                raise e
+            self.startup_timings["weight_load_s"] = round(time.perf_counter() - started, 3)
+            logger.info(f"Model loaded successfully in {self.startup_timings['weight_load_s']}s.")
+
+    def _connect_remote(self, started):
+        """Uses the inference server's model instead of loading one (waits for the server to come up)."""
+        logger.info(f"Using inference server at {self.remote_socket}...")
         try:
-            self.feature_extractor = AutoFeatureExtractor.from_pretrained(self.model_name)
-            self.model = AutoModelForAudioClassification.from_pretrained(self.model_name).to(self.device)
-            self.model.eval()
-            logger.info("Model loaded successfully.")
+            remote = InferenceClient(self.remote_socket, INFERENCE_SERVER_TIMEOUT_S)
+            remote.connect(wait_s=INFERENCE_SERVER_TIMEOUT_S)
+            self.config = SimpleNamespace(id2label=remote.id2label)
+            self.remote = remote
         except Exception as e:
-            logger.error(f"Failed to load model: {e}")
+            self.phase = "failed"
+            self.startup_error = str(e)
+            logger.error(f"Failed to connect to inference server: {e}")
             raise e
+        self.startup_timings["connect_s"] = round(time.perf_counter() - started, 3)
 
-        self.explainer = ForensicExplainer()
+    def start(self, durations=WARMUP_DURATIONS_S):
+        """Loads the model and warms it up; marks the classifier ready."""
+        try:
+            self.load()
+            self.phase = "warming_up"
+            started = time.perf_counter()
+            self.warmup(durations)
+            self.startup_timings["warmup_s"] = round(time.perf_counter() - started, 3)
+        except Exception as e:
+            self.phase = "failed"
+            self.startup_error = str(e)
+            logger.error(f"Model startup failed: {e}")
+            raise
+        self.phase = "ready"
+        logger.info(f"Classifier ready: {self.startup_timings}")
+
+    def forward_batch(self, audio_arrays):
+        """
+        Runs a list of 16kHz clips through the model as one padded forward pass.
+        Returns a numpy array of logits with shape (len(audio_arrays), num_labels).
+        """
+        if self.remote is not None:
+            # Normalisation, padding and batching happen in the inference server
+            with stage("model_forward"):
+                return self.remote.infer(audio_arrays)
+
+        with stage("feature_extractor"):
+            if self.preprocessor is not None:
+                input_values, attention_mask = self.preprocessor(audio_arrays)
+            else:
+                # Ask for the mask so every clip is normalised over its own length only
+                inputs = self.feature_extractor(
+                    audio_arrays, sampling_rate=self.target_sr, return_tensors="np",
+                    padding=True, return_attention_mask=True
+                )
+                input_values = inputs["input_values"]
+                # Group-norm wav2vec2 checkpoints were trained without attention_mask
+                attention_mask = inputs["attention_mask"] if self.feature_extractor.return_attention_mask else None
+
+        with stage("model_forward"):
+            return self.backend.forward(input_values, attention_mask)
+
+    def warmup(self, durations=WARMUP_DURATIONS_S):
+        """
+        Runs the model and the explainer features once per clip duration (seconds)
+        so kernels, allocator pools and lazy imports are ready before traffic.
+        Long durations are warmed as a batch of chunk windows, the way they are served.
+        Calls forward_batch directly: no background threads are started, so
+        it is safe to run in a process that forks afterwards.
+        """
+        self.load()
+        rng = np.random.default_rng(0)
+        for i, seconds in enumerate(durations):
+            audio_array = (0.1 * rng.standard_normal(int(seconds * self.target_sr))).astype(np.float32)
+            started = time.perf_counter()
+            if self._is_chunked(audio_array):
+                window = int(CHUNK_WINDOW_S * self.target_sr)
+                n_windows = min(BATCH_MAX_SIZE, len(audio_array) // window)
+                self.forward_batch([audio_array[:window]] * n_windows)
+                analysed_s = n_windows * CHUNK_WINDOW_S
+            else:
+                self.forward_batch([audio_array])
+                analysed_s = seconds
+            inference_s = time.perf_counter() - started
+            started = time.perf_counter()
+            self.explainer.analyze_signal(audio_array, self.target_sr)
+            explainer_s = time.perf_counter() - started
+
+            # Seed the deadline cost model from the last (warmest) pass
+            if i == len(durations) - 1:
+                cost_model.observe("inference", inference_s, analysed_s, replace=True)
+                cost_model.observe("explainer", explainer_s, seconds, replace=True)
+                if self.cascade is not None:
+                    started = time.perf_counter()
+                    feature_vector(SignalFeatures(audio_array, sr=self.target_sr))
+                    cost_model.observe("cascade", time.perf_counter() - started, seconds, replace=True)
+
+    def label_for(self, class_id: int) -> str:
+        """Maps a model class id to the API's AI_GENERATED / HUMAN label."""
+        # Label Mapping (Production Logic)
+        # We map "fake", "spoof", or "label_0" to AI_GENERATED
+        raw_label = self.config.id2label[class_id].lower()
+
+        if "fake" in raw_label or "spoof" in raw_label or raw_label == "label_0":
+            return "AI_GENERATED"
+        return "HUMAN"
+
+    @property
+    def ai_class_ids(self):
+        """Model class ids that map to AI_GENERATED."""
+        return [i for i in range(len(self.config.id2label)) if self.label_for(i) == "AI_GENERATED"]
+
+    def score_windows(self, audio_arrays) -> np.ndarray:
+        """Class probabilities (n, num_labels) for a list of 16kHz windows."""
+        self.load()
+        # Includes the wait for a batch slot; the forward pass itself is "model_forward"
+        with stage("inference"):
+            return _softmax(self._infer_logits(audio_arrays))
+
+    def segment_score(self, probabilities: np.ndarray, start: float, end: float) -> dict:
+        """Per-segment entry as returned in the API's `segments` list (times in seconds)."""
+        class_id = int(np.argmax(probabilities))
+        return {
+            "start": round(start, 2),
+            "end": round(end, 2),
+            "classification": self.label_for(class_id),
+            "confidence": round(float(probabilities[class_id]), 2),
+            "aiProbability": round(float(probabilities[self.ai_class_ids].sum()), 4),
+        }
+
+    def aggregate(self, seg_probs, method: str = CHUNK_AGGREGATION) -> np.ndarray:
+        """Combines per-segment probabilities into one vector ("mean", "max" or "weighted")."""
+        return _aggregate(np.asarray(seg_probs), method, self.ai_class_ids)
+
+    def _infer_logits(self, audio_arrays):
+        """Logits for a list of clips, via the batch scheduler when enabled."""
+        if self.batcher is not None and self.remote is None:
+            futures = [self.batcher.submit(a) for a in audio_arrays]
+            return np.stack([f.result() for f in futures])
+        return self.forward_batch(audio_arrays)
+
+    def window_starts(self, total: int):
+        """Start offsets (samples) of the CHUNK_WINDOW_S windows covering a clip of `total` samples."""
+        window = int(CHUNK_WINDOW_S * self.target_sr)
+        hop = max(1, int(CHUNK_HOP_S * self.target_sr))
+
+        starts = list(range(0, total - window + 1, hop))
+        # Make sure the tail of the clip is covered by a final, end-aligned window
+        if starts[-1] + window < total:
+            starts.append(total - window)
+        return starts
+
+    def _predict_chunked(self, audio_array: np.ndarray):
+        """
+        Sliding-window inference for long clips.
+        Returns (aggregated probabilities, list of per-segment scores).
+        """
+        window = int(CHUNK_WINDOW_S * self.target_sr)
+        starts = self.window_starts(len(audio_array))
+
+        group_size = self.batcher.max_batch_size if self.batcher is not None else BATCH_MAX_SIZE
+
+        seg_probs = []
+        segments = []
+        for g in range(0, len(starts), group_size):
+            group = starts[g:g + group_size]
+            # Views into the clip, no copies
+            probs = self.score_windows([audio_array[s:s + window] for s in group])
+
+            for s, p in zip(group, probs):
+                seg_probs.append(p)
+                segments.append(self.segment_score(p, s / self.target_sr, (s + window) / self.target_sr))
+
+            aggregated = self.aggregate(seg_probs)
+
+            # Early exit once the running verdict is confident enough
+            if (CHUNK_EARLY_EXIT_CONFIDENCE > 0
+                    and len(seg_probs) >= CHUNK_EARLY_EXIT_MIN_SEGMENTS
+                    and aggregated.max() >= CHUNK_EARLY_EXIT_CONFIDENCE
+                    and g + group_size < len(starts)):
+                logger.info(f"Early exit after {len(seg_probs)}/{len(starts)} segments")
+                break
+
+        return aggregated, segments
 
     def predict(self, audio_array: np.ndarray, source_sr: int = None):
-        try:
-            # 1. Resample
-            if source_sr and source_sr != self.target_sr:
+        prediction = self.predict_detailed(audio_array, source_sr)
+        return prediction.classification, prediction.confidence, prediction.explanation
+
+    def _prepare(self, audio_array: np.ndarray, source_sr: int = None, record: bool = True):
+        """
+        Steps 1-3 of prediction. Returns (audio_array, features, trimmed_seconds),
+        or a final Prediction when the clip is too quiet to analyse.
+        `record=False` leaves the per-clip audio metrics alone (clip already counted).
+        """
+        self.load()
+
+        # No-op for the float32 buffers produced by core.audio
+        audio_array = np.asarray(audio_array, dtype=np.float32)
+
+        # 1. Resample
+        if source_sr and source_sr != self.target_sr:
+            with stage("resample"):
                 audio_array = librosa.resample(y=audio_array, orig_sr=source_sr, target_sr=self.target_sr)
-            
-            # 2. Silence Check
-            rms = np.mean(librosa.feature.rms(y=audio_array))
-            if rms < 0.005:
-                return "HUMAN", 0.0, "Audio signal too weak or silent to analyze."
-
-            # 3. Inference
-            inputs = self.feature_extractor(audio_array, sampling_rate=self.target_sr, return_tensors="pt", padding=True)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-            with torch.no_grad():
-                logits = self.model(**inputs).logits
-
-            probabilities = torch.softmax(logits, dim=-1)
-            predicted_class_id = torch.argmax(logits, dim=-1).item()
-            confidence = probabilities[0][predicted_class_id].item()
-            
-            # 4. Label Mapping (Production Logic)
-            # We map "fake", "spoof", or "label_0" to AI_GENERATED
-            raw_label = self.model.config.id2label[predicted_class_id].lower()
-            
-            if "fake" in raw_label or "spoof" in raw_label or raw_label == "label_0":
-                classification = "AI_GENERATED"
-            else:
-                classification = "HUMAN"
 
-            # 5. Explanation
+        # 2. Voice activity: compress long silences so only speech is analysed
+        trimmed_seconds = 0.0
+        if self.vad_enabled:
+            with stage("vad"):
+                audio_array, trimmed_seconds = trim_silence(audio_array, self.target_sr)
+            if record:
+                TRIMMED_SECONDS.inc(trimmed_seconds)
+
+        # Cap analysed duration (view, no copy)
+        max_samples = int(MAX_ANALYSED_S * self.target_sr)
+        if max_samples > 0 and len(audio_array) > max_samples:
+            audio_array = audio_array[:max_samples]
+
+        if record:
+            AUDIO_SECONDS.observe(len(audio_array) / self.target_sr)
+
+        # 3. Silence Check (its STFT is reused by the explainer)
+        features = SignalFeatures(audio_array, sr=self.target_sr)
+        with stage("silence_check"):
+            too_quiet = features.rms < 0.005
+        if too_quiet:
+            return Prediction("HUMAN", 0.0, "Audio signal too weak or silent to analyze.")
+
+        return audio_array, features, trimmed_seconds
+
+    def _is_chunked(self, audio_array: np.ndarray) -> bool:
+        return CHUNK_WINDOW_S > 0 and len(audio_array) > CHUNK_WINDOW_S * self.target_sr
+
+    def _fit_deadline(self, audio_array: np.ndarray, deadline, degradations: list) -> np.ndarray:
+        """
+        Degrades in steps until the expected work fits the time left before `deadline`:
+        skip the explainer, then cut the clip (not below DEADLINE_MIN_ANALYSED_S),
+        then give up with DeadlineExceeded. Appends the steps taken to `degradations`.
+        """
+        remaining = deadline.remaining()
+        seconds = len(audio_array) / self.target_sr
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Deadline passed {-remaining * 1000:.0f}ms before inference could start")
+        # The cascade's features are paid for before the model, whether or not it answers
+        stages = ("cascade", "inference") if self.cascade is not None else ("inference",)
+        inference = sum(cost_model.estimate(name, seconds) for name in stages)
+
+        if inference + cost_model.estimate("explainer", seconds) <= remaining:
+            return audio_array
+        degradations.append("skip_explainer")
+        if inference <= remaining:
+            return audio_array
+
+        affordable = cost_model.affordable_seconds(stages, remaining)
+        if affordable < min(DEADLINE_MIN_ANALYSED_S, seconds):
+            raise DeadlineExceeded(
+                f"Deadline cannot be met: {remaining * 1000:.0f}ms left, "
+                f"about {inference * 1000:.0f}ms needed for {seconds:.1f}s of audio"
+            )
+        degradations.append("cap_duration")
+        return audio_array[:int(affordable * self.target_sr)]
+
+    def _finish(self, audio_array, features, trimmed_seconds, probabilities, segments=None,
+                degradations=None, explain=True) -> "Prediction":
+        """Steps 5-6 of prediction: label mapping and (unless `explain` is False) explanation."""
+        degradations = degradations if degradations is not None else []
+        predicted_class_id = int(np.argmax(probabilities))
+        confidence = float(probabilities[predicted_class_id])
+
+        # 5. Label Mapping
+        classification = self.label_for(predicted_class_id)
+
+        # 6. Explanation
+        explanation = self._explanation(classification, confidence, audio_array, features, degradations, explain)
+
+        DECISIONS.inc(decided_by="model")
+        return Prediction(classification, round(confidence, 2), explanation, segments, round(trimmed_seconds, 2),
+                          degradations)
+
+    def _explanation(self, classification, confidence, audio_array, features, degradations, explain):
+        if not explain:
+            return None
+        if "skip_explainer" in degradations:
+            return self.explainer.template_explanation(classification)
+        started = time.perf_counter()
+        with stage("explainer"):
             explanation = self.explainer.get_explanation(
-                classification, round(confidence, 2), audio_array, sr=self.target_sr
+                classification, round(confidence, 2), audio_array, sr=self.target_sr, features=features
             )
+        cost_model.observe("explainer", time.perf_counter() - started, len(audio_array) / self.target_sr)
+        return explanation
+
+    def _cascade(self, audio_array, features, trimmed_seconds, explain=True, degradations=None):
+        """
+        First stage: the signal-feature model's Prediction when the clip is outside
+        its uncertainty band, else None (escalate to the transformer).
+        """
+        degradations = degradations if degradations is not None else []
+        started = time.perf_counter()
+        with stage("cascade"):
+            ai_probability = float(self.cascade.ai_probability(feature_vector(features))[0])
+            classification = self.cascade.decide(ai_probability)
+        cost_model.observe("cascade", time.perf_counter() - started, len(audio_array) / self.target_sr)
+        if classification is None:
+            return None
+        confidence = ai_probability if classification == "AI_GENERATED" else 1.0 - ai_probability
+        explanation = self._explanation(classification, confidence, audio_array, features, degradations, explain)
+        DECISIONS.inc(decided_by="cascade")
+        return Prediction(classification, round(confidence, 2), explanation, None, round(trimmed_seconds, 2),
+                          degradations, decided_by="cascade")
+
+    def predict_detailed(self, audio_array: np.ndarray, source_sr: int = None, deadline=None,
+                         explain: bool = True) -> "Prediction":
+        """
+        Full prediction for one clip. With a `deadline` (core.deadline.Deadline) the
+        work is cut down to fit the time left; see _fit_deadline. `explain=False`
+        returns the verdict without running the explainer.
+        """
+        try:
+            prepared = self._prepare(audio_array, source_sr)
+            if isinstance(prepared, Prediction):
+                return prepared
+            audio_array, features, trimmed_seconds = prepared
+
+            degradations = []
+            if deadline is not None:
+                audio_array = self._fit_deadline(audio_array, deadline, degradations)
+                if "cap_duration" in degradations:
+                    # Later stages only see (and pay for) the part that is analysed
+                    features = SignalFeatures(audio_array, sr=self.target_sr)
+
+            # Clear-cut clips are answered from signal features alone
+            if self.cascade is not None:
+                decided = self._cascade(audio_array, features, trimmed_seconds, explain, degradations)
+                if decided is not None:
+                    return decided
+
+            # 4. Inference
+            started = time.perf_counter()
+            segments = None
+            if self._is_chunked(audio_array):
+                probabilities, segments = self._predict_chunked(audio_array)
+            else:
+                probabilities = self.score_windows([audio_array])[0]
+            cost_model.observe("inference", time.perf_counter() - started, len(audio_array) / self.target_sr)
 
-            return classification, round(confidence, 2), explanation
+            # Inference may have run long (e.g. a full batch queue): re-check before explaining
+            if (explain and deadline is not None and "skip_explainer" not in degradations
+                    and deadline.remaining() < cost_model.estimate("explainer", len(audio_array) / self.target_sr)):
+                degradations.append("skip_explainer")
 
+            return self._finish(audio_array, features, trimmed_seconds, probabilities, segments, degradations, explain)
+
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Prediction error: {e}")
             raise e
 
-classifier = VoiceClassifier()
\ No newline at end of file
+    def explain(self, audio_array: np.ndarray, classification: str, confidence: float, source_sr: int = None) -> str:
+        """Explanation for a clip whose verdict is already known (steps 1-3 and 6 only)."""
+        prepared = self._prepare(audio_array, source_sr, record=False)
+        if isinstance(prepared, Prediction):
+            return prepared.explanation
+        audio_array, features, _ = prepared
+        with stage("explainer"):
+            return self.explainer.get_explanation(
+                classification, confidence, audio_array, sr=self.target_sr, features=features
+            )
+
+    def predict_batch(self, audio_arrays, source_srs=None):
+        """
+        Predicts many clips at once. Short clips share forward passes (see
+        batch_groups: equal lengths only unless the model masks padding, so a
+        clip's verdict never depends on its batch); long clips go through
+        chunked inference. Returns one Prediction or Exception per clip,
+        so a bad clip never fails the others.
+        """
+        source_srs = source_srs or [None] * len(audio_arrays)
+        results = [None] * len(audio_arrays)
+        prepared = {}
+
+        for i, (audio_array, sr) in enumerate(zip(audio_arrays, source_srs)):
+            try:
+                p = self._prepare(audio_array, sr)
+                if not isinstance(p, Prediction) and self.cascade is not None:
+                    p = self._cascade(*p) or p
+                if isinstance(p, Prediction):
+                    results[i] = p
+                else:
+                    prepared[i] = p
+            except Exception as e:
+                results[i] = e
+
+        # 4. Inference: short clips in batches...
+        short = [i for i, (a, _, _) in prepared.items() if not self._is_chunked(a)]
+        for group in self.batch_groups(short, lambda i: len(prepared[i][0])):
+            try:
+                probs = _softmax(self.forward_batch([prepared[i][0] for i in group]))
+            except Exception as e:
+                logger.error(f"Batch inference error: {e}")
+                for i in group:
+                    results[i] = e
+                continue
+            for i, p in zip(group, probs):
+                try:
+                    results[i] = self._finish(*prepared[i], p)
+                except Exception as e:
+                    results[i] = e
+
+        # ...long clips through sliding windows
+        for i, (audio_array, features, trimmed_seconds) in prepared.items():
+            if not self._is_chunked(audio_array):
+                continue
+            try:
+                probabilities, segments = self._predict_chunked(audio_array)
+                results[i] = self._finish(audio_array, features, trimmed_seconds, probabilities, segments)
+            except Exception as e:
+                results[i] = e
+
+        return results
+
+classifier = VoiceClassifier()
+
+if classifier.batcher is not None:
+    registry.gauge("voice_batch_queue_depth", "Clips waiting for a model batch", classifier.batcher.queue_depth)
\ No newline at end of file
@@ -3,3 +3,148 @@ import os
 # In a real app, use environment variables. 
 # For this challenge, we can default to a strict key or allow setting via ENV.
 API_KEY_SECRET = os.getenv("API_KEY_SECRET", "sk_test_123456789")
+
+# Dynamic micro-batching in front of the model (see core/batching.py)
+BATCH_ENABLED = os.getenv("BATCH_ENABLED", "1") == "1"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+# Only clips whose lengths are within this ratio of each other share a batch
+# (forced to 1.0, equal lengths only, for models without an attention mask, whose outputs change with padding)
+BATCH_BUCKET_RATIO = float(os.getenv("BATCH_BUCKET_RATIO", "1.5"))
+
+# Worker pool that runs decode + inference off the event loop (see core/executor.py)
+# "thread" shares one model; "process" loads one model per worker process.
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "8"))
+# Jobs allowed to wait for a worker before new requests are rejected with 503
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))
+
+# Sliding-window inference for long recordings
+# Clips longer than CHUNK_WINDOW_S are scored in windows (0, the default, scores every clip in one pass)
+CHUNK_WINDOW_S = float(os.getenv("CHUNK_WINDOW_S", "0"))
+CHUNK_HOP_S = float(os.getenv("CHUNK_HOP_S", "10"))
+# Audio past this point is ignored (0, the default, = no cap)
+MAX_ANALYSED_S = float(os.getenv("MAX_ANALYSED_S", "0"))
+# How segment scores are combined: "mean", "max" or "weighted"
+CHUNK_AGGREGATION = os.getenv("CHUNK_AGGREGATION", "mean")
+# Stop scoring further windows once the running verdict reaches this confidence (0 disables)
+CHUNK_EARLY_EXIT_CONFIDENCE = float(os.getenv("CHUNK_EARLY_EXIT_CONFIDENCE", "0"))
+CHUNK_EARLY_EXIT_MIN_SEGMENTS = int(os.getenv("CHUNK_EARLY_EXIT_MIN_SEGMENTS", "3"))
+
+# Content-addressed result cache (see core/cache.py)
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_S = float(os.getenv("CACHE_TTL_S", "3600"))
+# Optional directory for an on-disk tier that survives restarts (empty = memory only)
+CACHE_DIR = os.getenv("CACHE_DIR", "")
+# Byte budget of the on-disk tier; oldest entries are evicted first (expired ones are swept too)
+CACHE_DISK_MAX_BYTES = int(os.getenv("CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Raw upload endpoint (/api/voice-detection/upload)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+
+# WebSocket streaming analysis (/api/voice-detection/stream)
+STREAM_WINDOW_S = float(os.getenv("STREAM_WINDOW_S", "5"))
+STREAM_HOP_S = float(os.getenv("STREAM_HOP_S", "2.5"))
+# Shortest tail worth scoring when the stream ends
+STREAM_MIN_WINDOW_S = float(os.getenv("STREAM_MIN_WINDOW_S", "1"))
+STREAM_MAX_MESSAGE_BYTES = int(os.getenv("STREAM_MAX_MESSAGE_BYTES", str(1024 * 1024)))
+# Accept the key as ?api_key= for browser clients, which cannot set WebSocket headers.
+# Off by default: query strings end up in access logs, proxy logs and browser history.
+STREAM_QUERY_API_KEY = os.getenv("STREAM_QUERY_API_KEY", "0").lower() in ("1", "true", "yes")
+
+# Batch endpoint (/api/voice-detection/batch)
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "64"))
+# Cap on the total decoded (non-base64) audio bytes in one batch request
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(50 * 1024 * 1024)))
+BATCH_DECODE_WORKERS = int(os.getenv("BATCH_DECODE_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# Hugging Face model id of the classifier checkpoint
+MODEL_NAME = os.getenv("MODEL_NAME", "MelodyMachine/Deepfake-audio-detection-V2")
+# Pinned local snapshot of that checkpoint (see export_model.py --snapshot).
+# When set, weights are only read from this directory and the hub is never contacted.
+MODEL_LOCAL_DIR = os.getenv("MODEL_LOCAL_DIR", "")
+
+# Inference backend: "torch" (eager fp32), "torch_int8" (dynamic int8 Linear layers)
+# or "onnx" (onnxruntime). Converted artefacts are cached in MODEL_ARTIFACT_DIR.
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+MODEL_ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR", "artifacts")
+
+# Pre-fork serving (serve.py): worker processes sharing one copy of the model.
+# Threads per worker 0 = split the available cores evenly between workers.
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "2"))
+SERVE_THREADS_PER_WORKER = int(os.getenv("SERVE_THREADS_PER_WORKER", "0"))
+SERVE_PIN_CPUS = os.getenv("SERVE_PIN_CPUS", "0").lower() in ("1", "true", "yes")
+
+# Metrics: per-stage timing histograms on /metrics (cheap enough to leave on).
+# SERVER_TIMING controls the Server-Timing response header with the request's stage timings:
+# "request" (default) when the client asks for it (X-Debug-Timing: 1 header or ?timing=1),
+# "1" on every response, "0" never.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+SERVER_TIMING = {"1": "always", "true": "always", "yes": "always", "always": "always", "request": "request"}.get(
+    os.getenv("SERVER_TIMING", "request").lower(), "off"
+)
+
+# Voice activity trimming before inference. Frames quieter than VAD_FLOOR_DB dBFS or
+# VAD_RELATIVE_DB below the loudest frame are silence; silences longer than
+# VAD_MAX_SILENCE_MS are shortened to that length. VAD_PAD_MS of context is kept around speech.
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1").lower() in ("1", "true", "yes")
+VAD_FRAME_MS = float(os.getenv("VAD_FRAME_MS", "30"))
+VAD_FLOOR_DB = float(os.getenv("VAD_FLOOR_DB", "-60"))
+VAD_RELATIVE_DB = float(os.getenv("VAD_RELATIVE_DB", "45"))
+VAD_PAD_MS = float(os.getenv("VAD_PAD_MS", "150"))
+VAD_MAX_SILENCE_MS = float(os.getenv("VAD_MAX_SILENCE_MS", "400"))
+
+# Startup warm-up: clip durations (seconds) run through the model before /ready reports ready
+WARMUP_DURATIONS_S = [float(d) for d in os.getenv("WARMUP_DURATIONS_S", "1,10").split(",") if d.strip()]
+
+# Preprocessing: normalise clips in place in reusable (pinned on GPU) batch buffers and hand
+# them to the model without copies. 0 = call the Hugging Face feature extractor per batch.
+FAST_PREPROCESS = os.getenv("FAST_PREPROCESS", "1").lower() in ("1", "true", "yes")
+
+# Request deadlines: clients send X-Deadline-Ms (budget from arrival), else DEFAULT_DEADLINE_MS
+# applies (0 = none). To make the deadline the explainer's pitch analysis is skipped first, then
+# the analysed audio is cut (never below DEADLINE_MIN_ANALYSED_S); what still cannot fit is shed with 503.
+DEFAULT_DEADLINE_MS = float(os.getenv("DEFAULT_DEADLINE_MS", "0"))
+DEADLINE_MIN_ANALYSED_S = float(os.getenv("DEADLINE_MIN_ANALYSED_S", "2"))
+
+# Explanations: "sync" (in the response), "none" (verdict only) or "async" (verdict now, explanation
+# later from GET /api/explanations/{id} or a loopback callback). Clients pick per request with ?explanation=.
+EXPLANATION_MODE = os.getenv("EXPLANATION_MODE", "sync")
+EXPLANATION_WORKERS = int(os.getenv("EXPLANATION_WORKERS", "1"))
+# Jobs beyond this many pending are not accepted (the verdict is returned without an explanation)
+EXPLANATION_MAX_PENDING = int(os.getenv("EXPLANATION_MAX_PENDING", "256"))
+# Finished jobs can be fetched for this long
+EXPLANATION_JOB_TTL_S = float(os.getenv("EXPLANATION_JOB_TTL_S", "600"))
+EXPLANATION_CALLBACK_TIMEOUT_S = float(os.getenv("EXPLANATION_CALLBACK_TIMEOUT_S", "5"))
+
+# Two-stage cascade: a logistic model on signal features (trained with `calibrate.py cascade-train`)
+# answers clips it is sure about; only clips with an AI probability between CASCADE_LOW and
+# CASCADE_HIGH reach the transformer. Empty bounds use the band chosen at training time.
+CASCADE_MODEL_PATH = os.getenv("CASCADE_MODEL_PATH", "")
+CASCADE_LOW = float(os.getenv("CASCADE_LOW")) if os.getenv("CASCADE_LOW") else None
+CASCADE_HIGH = float(os.getenv("CASCADE_HIGH")) if os.getenv("CASCADE_HIGH") else None
+
+# Dedicated inference server (python -m core.inference_server). When INFERENCE_SERVER_SOCKET is set,
+# API processes only ingest and decode: PCM goes to the server through a shared-memory ring of
+# INFERENCE_SHM_MB per API process, with small control messages on this Unix socket. The server
+# owns the model and batches windows from all API processes together.
+INFERENCE_SERVER_SOCKET = os.getenv("INFERENCE_SERVER_SOCKET", "")
+INFERENCE_SHM_MB = int(os.getenv("INFERENCE_SHM_MB", "64"))
+INFERENCE_SERVER_THREADS = int(os.getenv("INFERENCE_SERVER_THREADS", "32"))
+# How long a request (and the initial connection at startup) may wait for the server
+INFERENCE_SERVER_TIMEOUT_S = float(os.getenv("INFERENCE_SERVER_TIMEOUT_S", "60"))
+
+# Tenants keyed on API key (see core/tenants.py). TENANTS is JSON, inline or the path of a JSON file:
+#   {"sk_live_web": {"name": "web", "priority": "interactive", "rate_per_s": 5, "burst": 10, "audio_s_per_min": 300}}
+# API_KEY_SECRET stays valid as tenant "default" with the TENANT_DEFAULT_* settings. Limits of 0 mean unlimited.
+TENANTS = os.getenv("TENANTS", "")
+TENANT_DEFAULT_PRIORITY = os.getenv("TENANT_DEFAULT_PRIORITY", "standard")
+TENANT_DEFAULT_RATE_PER_S = float(os.getenv("TENANT_DEFAULT_RATE_PER_S", "0"))
+TENANT_DEFAULT_BURST = float(os.getenv("TENANT_DEFAULT_BURST", "0"))
+TENANT_DEFAULT_AUDIO_S_PER_MIN = float(os.getenv("TENANT_DEFAULT_AUDIO_S_PER_MIN", "0"))
+# Relative share of the inference workers per priority class when tenants compete (weighted fair queuing)
+TENANT_PRIORITY_WEIGHTS = {
+    name.strip(): float(weight)
+    for name, weight in (p.split(":") for p in os.getenv("TENANT_PRIORITY_WEIGHTS", "interactive:8,standard:4,bulk:1").split(",") if p.strip())
+}
@@ -0,0 +1,56 @@
+import threading
+import time
+
+class DeadlineExceeded(Exception):
+    """Raised when a request cannot be answered within its deadline, even degraded."""
+
+class Deadline:
+    """
+    Point in time (time.monotonic) by which a request must be answered.
+    Plain attributes only, so it can be passed to process pool workers
+    (the monotonic clock is shared by all processes on a host).
+    """
+    def __init__(self, budget_s: float, started_at: float = None):
+        self.budget_s = budget_s
+        self.expires_at = (time.monotonic() if started_at is None else started_at) + budget_s
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def __repr__(self):
+        return f"Deadline(budget={self.budget_s * 1000:.0f}ms, remaining={self.remaining() * 1000:.0f}ms)"
+
+class CostModel:
+    """
+    Running estimate (EWMA) of the seconds of work per second of audio for the
+    stages a deadline can drop or shorten ("cascade", "inference", "explainer").
+    Seeded by the warm-up and refined by every analysed clip.
+    """
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self._rates = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, audio_seconds: float, replace: bool = False):
+        if audio_seconds <= 0:
+            return
+        rate = seconds / audio_seconds
+        with self._lock:
+            previous = self._rates.get(name)
+            self._rates[name] = rate if previous is None or replace else previous + self.alpha * (rate - previous)
+
+    def estimate(self, name: str, audio_seconds: float) -> float:
+        """Expected seconds for `name` on a clip of `audio_seconds` (0 until observed)."""
+        return self._rates.get(name, 0.0) * audio_seconds
+
+    def affordable_seconds(self, names, budget_s: float) -> float:
+        """Longest clip (seconds of audio) the stage(s) `names` are expected to finish within `budget_s`."""
+        names = (names,) if isinstance(names, str) else names
+        rate = sum(self._rates.get(name, 0.0) for name in names)
+        return budget_s / rate if rate > 0 else float("inf")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: round(rate, 5) for name, rate in self._rates.items()}
+
+cost_model = CostModel()
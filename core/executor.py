@@ -0,0 +1,260 @@
+import asyncio
+import contextvars
+import math
+import multiprocessing
+import os
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from core.config import INFERENCE_EXECUTOR, INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE
+from core.metrics import registry, record_stage, start_request_timings, TENANT_QUEUE_WAIT, TENANT_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    """Raised when the inference queue is at capacity and a job is rejected."""
+    def __init__(self, depth, retry_after):
+        super().__init__(f"Inference queue is full ({depth} jobs waiting)")
+        self.depth = depth
+        self.retry_after = retry_after
+
+class _Job:
+    __slots__ = ("fn", "args", "future", "enqueued_at", "context", "flow", "start", "finish")
+
+    def __init__(self, fn, args, future, flow):
+        self.fn = fn
+        self.args = args
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        # Carries the submitting request's context (e.g. its stage timings) into the worker
+        self.context = contextvars.copy_context()
+        # Tenant queue and virtual start / finish tags for weighted fair queuing
+        self.flow = flow
+        self.start = self.finish = 0.0
+
+def _run_in_child(fn, args):
+    """Process-mode job: runs fn(*args) and returns its stage timings too, since the child's metrics are never scraped."""
+    timings = start_request_timings()
+    return fn(*args), timings
+
+class _Flow:
+    """One tenant's queue in the pool, with its fair-queuing state and counters."""
+    def __init__(self, weight):
+        self.weight = weight
+        self.jobs = deque()
+        self.last_finish = 0.0
+        self.completed = 0
+        self.rejected = 0
+        self.evicted = 0
+        self.wait_s = 0.0
+
+class InferencePool:
+    """
+    Bounded worker pool that keeps decode and inference off the asyncio event loop.
+
+    Jobs are executed by `workers` dispatcher threads; at most `max_queue` jobs
+    wait beyond the workers that are free. In "thread" mode the dispatchers run
+    the job themselves; in "process" mode they hand it to a ProcessPoolExecutor
+    of the same size, started with "spawn" because forking a process that
+    already runs torch and other threads can deadlock (jobs must then be
+    picklable module-level functions, and each child loads its own model).
+    Stage timings recorded in a child are replayed in this process. When the
+    queue is full, submit() fails fast with QueueFullError instead of letting
+    latency pile up.
+
+    The queue is split per tenant and served by weighted fair queuing: each
+    job gets a virtual finish tag 1/weight past its tenant's previous one (or
+    past the current virtual time if the tenant was idle), and workers take the
+    smallest tag. Under contention a tenant gets weight / sum(weights) of the
+    workers, whatever the others submit. A full queue pushes out the newest job
+    of the tenant with the longest queue for its weight, so one bulk tenant
+    cannot fill the queue and lock the others out.
+    """
+    def __init__(self, mode="thread", workers=8, max_queue=32):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, int(workers))
+        # 0 allowed: no job waits, but every free worker still takes one
+        self.max_queue = max(0, int(max_queue))
+
+        self._flows = {}  # tenant name -> _Flow
+        self._queued = 0
+        self._virtual_time = 0.0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._pid = None
+        self._processes = None
+
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        # EWMA of job service time, used to suggest a Retry-After value
+        self._service_time = 1.0
+
+    # --- Public API ---
+
+    def submit(self, fn, *args, tenant=None) -> Future:
+        """Queues fn(*args) for `tenant` (a core.tenants.Tenant; None shares the "default" queue)."""
+        self._ensure_started()
+        name, weight = (tenant.name, tenant.weight) if tenant is not None else ("default", 1.0)
+        evicted = None
+        with self._cond:
+            flow = self._flows.get(name)
+            if flow is None:
+                flow = self._flows[name] = _Flow(weight)
+            if self._queued >= self.max_queue + max(0, self.workers - self._running):
+                evicted = self._push_out(flow)
+                if evicted is None:
+                    self._rejected += 1
+                    flow.rejected += 1
+                    TENANT_REJECTIONS.inc(tenant=name, reason="queue_full")
+                    raise QueueFullError(self._queued, self._retry_after())
+                error = QueueFullError(self._queued, self._retry_after())
+
+            job = _Job(fn, args, Future(), name)
+            job.start = max(self._virtual_time, flow.last_finish)
+            job.finish = flow.last_finish = job.start + 1.0 / flow.weight
+            flow.jobs.append(job)
+            self._queued += 1
+            self._cond.notify()
+
+        if evicted is not None:
+            # Outside the lock: completing a future runs its callbacks
+            evicted.future.set_exception(error)
+        return job.future
+
+    async def run(self, fn, *args, tenant=None):
+        """Submits a job and awaits its result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, tenant=tenant))
+
+    def expected_wait(self) -> float:
+        """Rough seconds a job submitted now waits before a worker picks it up."""
+        with self._cond:
+            backlog = self._queued + self._running
+            if backlog < self.workers:
+                return 0.0
+            return (backlog - self.workers + 1) * self._service_time / self.workers
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return self._queued
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "service_time_s": round(self._service_time, 4),
+                "tenants": {
+                    name: {
+                        "weight": flow.weight,
+                        "queued": len(flow.jobs),
+                        "completed": flow.completed,
+                        "rejected": flow.rejected,
+                        "evicted": flow.evicted,
+                        "mean_wait_ms": round(1000 * flow.wait_s / max(flow.completed, 1), 3),
+                    }
+                    for name, flow in self._flows.items()
+                },
+            }
+
+    # --- Internals ---
+
+    def _retry_after(self) -> int:
+        # Rough time for the current backlog to drain across all workers
+        backlog = self._queued + self._running
+        return max(1, math.ceil(backlog * self._service_time / self.workers))
+
+    def _push_out(self, arriving: _Flow):
+        """
+        Evicts the newest job of the tenant furthest over its fair share of the
+        queue, if that is not the arriving tenant. Returns the job, or None.
+        Caller holds the lock.
+        """
+        victim = max(self._flows.values(), key=lambda f: len(f.jobs) / f.weight)
+        if victim is arriving or len(victim.jobs) / victim.weight <= (len(arriving.jobs) + 1) / arriving.weight:
+            return None
+        job = victim.jobs.pop()
+        # Its tag slot is given back, so the tenant's next job is not pushed further back
+        victim.last_finish = victim.jobs[-1].finish if victim.jobs else job.start
+        victim.evicted += 1
+        self._queued -= 1
+        self._rejected += 1
+        TENANT_REJECTIONS.inc(tenant=job.flow, reason="evicted")
+        return job
+
+    def _next_job(self) -> _Job:
+        """The queued job with the smallest virtual finish tag. Caller holds the lock."""
+        flow = min((f for f in self._flows.values() if f.jobs), key=lambda f: f.jobs[0].finish)
+        job = flow.jobs.popleft()
+        self._queued -= 1
+        self._virtual_time = max(self._virtual_time, job.start)
+        return job
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so (re)start lazily in whichever process submits
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            if self.mode == "process":
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            self._threads = [
+                threading.Thread(target=self._loop, name=f"inference-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._queued:
+                    self._cond.wait()
+                job = self._next_job()
+                self._running += 1
+
+            started = time.monotonic()
+            waited = started - job.enqueued_at
+            try:
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                job.context.run(record_stage, "queue_wait", waited)
+                TENANT_QUEUE_WAIT.observe(waited, tenant=job.flow)
+                try:
+                    if self._processes is not None:
+                        result, timings = self._processes.submit(_run_in_child, job.fn, job.args).result()
+                        for name, seconds in timings.items():
+                            job.context.run(record_stage, name, seconds)
+                    else:
+                        result = job.context.run(job.fn, *job.args)
+                except BaseException as e:
+                    job.future.set_exception(e)
+                else:
+                    job.future.set_result(result)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._cond:
+                    self._running -= 1
+                    self._completed += 1
+                    flow = self._flows[job.flow]
+                    flow.completed += 1
+                    flow.wait_s += waited
+                    self._service_time = 0.9 * self._service_time + 0.1 * elapsed
+
+inference_pool = InferencePool(mode=INFERENCE_EXECUTOR, workers=INFERENCE_WORKERS, max_queue=INFERENCE_QUEUE_SIZE)
+
+registry.gauge("voice_inference_queue_depth", "Jobs waiting for an inference worker", inference_pool.queue_depth)
@@ -0,0 +1,162 @@
+import ipaddress
+import json
+import logging
+import re
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from core.audio import decode_audio_bytes
+from core.cache import result_cache
+from core.classifier import classifier
+from core.config import (
+    EXPLANATION_WORKERS, EXPLANATION_MAX_PENDING, EXPLANATION_JOB_TTL_S, EXPLANATION_CALLBACK_TIMEOUT_S,
+)
+from core.metrics import registry, record_error
+
+logger = logging.getLogger(__name__)
+
+EXPLANATION_MODES = ("sync", "none", "async")
+
+# Job ids are explanation cache keys (sha256 hex)
+JOB_ID = re.compile(r"[0-9a-f]{64}")
+
+def is_local_callback(url: str) -> bool:
+    """Callbacks may only target this host (http(s) on a loopback address)."""
+    try:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            return False
+        if parts.hostname == "localhost":
+            return True
+        return ipaddress.ip_address(parts.hostname).is_loopback
+    except ValueError:
+        return False
+
+def explain_audio(audio_bytes: bytes, classification: str, confidence: float) -> str:
+    """Decodes a clip again and runs only the explainer for an already known verdict."""
+    audio_array, sr = decode_audio_bytes(audio_bytes)
+    return classifier.explain(audio_array, classification, confidence, source_sr=sr)
+
+class ExplanationJobs:
+    """
+    Explanations computed in the background after the verdict has been returned.
+
+    Jobs run on a small thread pool of their own, so they never hold up
+    verdicts on the inference pool. A job's id is the clip's explanation cache
+    key, and the job record (pending, done or failed) is written to the result
+    cache under it. With CACHE_DIR set, every pre-fork worker can therefore
+    answer for a job started by another one. Records can be fetched for
+    EXPLANATION_JOB_TTL_S and are optionally POSTed to a loopback callback URL.
+    """
+    def __init__(self, workers=1, max_pending=256, ttl_s=600.0):
+        self.max_pending = max_pending
+        self.ttl_s = ttl_s
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="explainer")
+        self._jobs = {}  # job id -> {"id", "status", "explanation", "error", "started_at", "finished_at"}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(audio_bytes: bytes) -> str:
+        return result_cache.make_key(audio_bytes, classifier.identity + "|explanation")
+
+    def submit(self, audio_bytes: bytes, classification: str, confidence: float, callback_url: str = None):
+        """
+        Starts (or answers from cache) the explanation for a classified clip.
+        Returns the job dict, or None when too many jobs are already pending.
+        """
+        self._purge()
+        key = self.cache_key(audio_bytes)
+
+        job = self._find(key, result_cache.lookup)
+        if job is not None and job["status"] == "done":
+            # Restart the fetch window for the new caller
+            job["finished_at"] = time.time()
+            self._store(job)
+            if callback_url:
+                self._pool.submit(self._notify, callback_url, job)
+            return job
+        if job is not None and job["status"] == "pending":
+            return job
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return None
+            self._pending += 1
+        job = {"id": key, "status": "pending", "started_at": time.time()}
+        self._store(job)
+        self._pool.submit(self._run, job, audio_bytes, classification, confidence, callback_url)
+        return dict(job)
+
+    def get(self, job_id: str):
+        """The job's record from this worker or the shared cache; None if unknown, expired or lost."""
+        if not JOB_ID.fullmatch(job_id):
+            return None
+        self._purge()
+        return self._find(job_id, result_cache.get)
+
+    def _find(self, job_id: str, read):
+        """This worker's record of the job, else the shared one via `read` (a result cache lookup)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return dict(job)
+        job = read(job_id)
+        if job is None or "status" not in job:
+            return None
+        # Another worker's job; if still pending after the TTL, that worker went away
+        if job.get("finished_at", job.get("started_at", 0)) < time.time() - self.ttl_s:
+            return None
+        return job
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def _store(self, job: dict):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+        result_cache.put(job["id"], dict(job))
+
+    def _run(self, job, audio_bytes, classification, confidence, callback_url):
+        try:
+            explanation = explain_audio(audio_bytes, classification, confidence)
+            job = {"id": job["id"], "status": "done", "explanation": explanation}
+        except Exception as e:
+            logger.error(f"Explanation job {job['id']} failed: {e}")
+            record_error(type(e).__name__)
+            job = {"id": job["id"], "status": "failed", "error": str(e)}
+        job["finished_at"] = time.time()
+        self._store(job)
+        with self._lock:
+            self._pending -= 1
+        if callback_url:
+            self._notify(callback_url, job)
+
+    def _notify(self, callback_url: str, job: dict):
+        body = {"jobId": job["id"], "status": job["status"]}
+        body.update({k: job[k] for k in ("explanation", "error") if k in job})
+        request = urllib.request.Request(
+            callback_url, data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=EXPLANATION_CALLBACK_TIMEOUT_S):
+                pass
+        except Exception as e:
+            logger.warning(f"Explanation callback to {callback_url} failed: {e}")
+            record_error("callback_failed")
+
+    def _purge(self):
+        cutoff = time.time() - self.ttl_s
+        with self._lock:
+            expired = [i for i, job in self._jobs.items() if job.get("finished_at", float("inf")) < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+explanation_jobs = ExplanationJobs(EXPLANATION_WORKERS, EXPLANATION_MAX_PENDING, EXPLANATION_JOB_TTL_S)
+
+registry.gauge("voice_explanation_jobs_pending", "Explanation jobs waiting or running", explanation_jobs.pending)
@@ -0,0 +1,251 @@
+import numpy as np
+import librosa
+import scipy.stats
+from functools import cached_property, lru_cache
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Same framing librosa uses by default, so values match the old per-feature calls
+N_FFT = 2048
+HOP_LENGTH = 512
+# Frames per STFT block; bounds peak memory on long clips
+STFT_BLOCK_FRAMES = 256
+
+PITCH_FMIN = librosa.note_to_hz('C2')
+PITCH_FMAX = librosa.note_to_hz('C7')
+# librosa.pyin's defaults, which the explainer thresholds were tuned on
+PYIN_THRESHOLDS = np.linspace(0, 1, 101)
+PYIN_BETA = (2, 18)
+PYIN_BOLTZMANN = 2.0
+PYIN_NO_TROUGH_PROB = 0.01
+PYIN_BINS_PER_SEMITONE = 10
+PYIN_MAX_TRANSITION_RATE = 35.92  # octaves per second
+PYIN_SWITCH_PROB = 0.01
+# log(0) stand-in, as librosa.sequence.viterbi uses
+LOG_TINY = np.finfo(np.float64).tiny
+
+def spectral_frame_stats(audio_array: np.ndarray, sr: int = 16000, roll_percent: float = 0.95):
+    """
+    Single blocked STFT pass returning per-frame (rms, flatness, rolloff).
+    Equivalent to librosa.feature.rms / spectral_flatness / spectral_rolloff
+    with their default framing, without computing the STFT three times.
+    """
+    y = np.asarray(audio_array, dtype=np.float32)
+    y = np.pad(y, N_FFT // 2, mode="constant")
+    if len(y) < N_FFT:
+        y = np.pad(y, (0, N_FFT - len(y)), mode="constant")
+
+    frames = librosa.util.frame(y, frame_length=N_FFT, hop_length=HOP_LENGTH, axis=0)
+    window = librosa.filters.get_window("hann", N_FFT, fftbins=True).astype(np.float32)
+    freqs = librosa.fft_frequencies(sr=sr, n_fft=N_FFT)
+
+    rms, flatness, rolloff = [], [], []
+    for b in range(0, frames.shape[0], STFT_BLOCK_FRAMES):
+        block = frames[b:b + STFT_BLOCK_FRAMES]
+        # RMS of the unwindowed frames, exactly as librosa.feature.rms(y=...): the
+        # silence cut-off in VoiceClassifier._prepare was tuned on that value, and a
+        # Hann-windowed spectrum only matches it on average, not frame by frame
+        rms.append(np.sqrt(np.mean(np.square(block, dtype=np.float64), axis=-1)))
+
+        mag = np.abs(np.fft.rfft(block * window, axis=-1))
+        power = mag ** 2
+
+        # Spectral flatness: geometric / arithmetic mean of the power spectrum
+        p = np.maximum(1e-10, power)
+        flatness.append(np.exp(np.mean(np.log(p), axis=-1)) / np.mean(p, axis=-1))
+
+        # Spectral rolloff: lowest frequency holding roll_percent of the magnitude
+        cumulative = np.cumsum(mag, axis=-1)
+        reached = cumulative >= roll_percent * cumulative[:, -1:]
+        rolloff.append(freqs[np.argmax(reached, axis=-1)])
+
+    return np.concatenate(rms), np.concatenate(flatness), np.concatenate(rolloff)
+
+def _yin_frames(audio_array: np.ndarray, min_period: int, max_period: int) -> np.ndarray:
+    """Cumulative mean normalised difference (YIN) per centred frame, lags min_period..max_period."""
+    y = np.pad(np.asarray(audio_array, dtype=np.float32), N_FFT // 2, mode="constant")
+    if len(y) < N_FFT:
+        y = np.pad(y, (0, N_FFT - len(y)), mode="constant")
+    frames = librosa.util.frame(y, frame_length=N_FFT, hop_length=HOP_LENGTH, axis=0).astype(np.float64)
+
+    # Autocorrelation via FFT, then d(tau) = 2 (r(0) - r(tau)) - (energy of the first tau samples)
+    acf = np.fft.irfft(np.abs(np.fft.rfft(frames, 2 * N_FFT, axis=1)) ** 2, 2 * N_FFT, axis=1)[:, :max_period + 1]
+    energy = np.cumsum(frames ** 2, axis=1)
+    diff = 2.0 * (acf[:, :1] - acf[:, 1:]) - energy[:, :max_period]
+    cumulative_mean = np.cumsum(diff, axis=1) / np.arange(1, max_period + 1)
+    return diff[:, min_period - 1:] / (cumulative_mean[:, min_period - 1:] + LOG_TINY)
+
+def _parabolic_shifts(yin: np.ndarray) -> np.ndarray:
+    """Offset of the parabola through each lag and its neighbours (0 if it would leave the bin)."""
+    a = yin[:, 2:] + yin[:, :-2] - 2.0 * yin[:, 1:-1]
+    b = (yin[:, 2:] - yin[:, :-2]) / 2.0
+    shifts = np.zeros_like(yin)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shifts[:, 1:-1] = np.where(np.abs(b) >= np.abs(a), 0.0, -b / a)
+    return shifts
+
+def _trough_probs(yin: np.ndarray) -> np.ndarray:
+    """
+    pyin's probability that each lag is the period: every trough below a
+    threshold gets a Boltzmann prior on its rank, weighted by a beta
+    distribution over the thresholds; the deepest trough keeps a small share
+    when no trough is below the threshold.
+    """
+    beta_probs = np.diff(scipy.stats.beta.cdf(PYIN_THRESHOLDS, *PYIN_BETA))
+    troughs = np.zeros_like(yin, dtype=bool)
+    troughs[:, 1:-1] = (yin[:, 1:-1] < yin[:, :-2]) & (yin[:, 1:-1] <= yin[:, 2:])
+    troughs[:, -1] = yin[:, -1] < yin[:, -2]
+    troughs[:, 0] = yin[:, 0] < yin[:, 1]
+
+    probs = np.zeros_like(yin)
+    # Troughs at or above 1 are below no threshold; pack the rest per frame in lag order
+    frame, lag = np.nonzero(troughs & (yin < 1.0))
+    if len(frame):
+        rank = np.arange(len(frame)) - np.searchsorted(frame, np.arange(len(yin)))[frame]
+        heights = np.full((len(yin), rank.max() + 1), np.inf)
+        heights[frame, rank] = yin[frame, lag]
+        below = heights[:, :, None] < PYIN_THRESHOLDS[1:]
+        position = np.cumsum(below, axis=1) - 1
+        count = below.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            norm = (1 - np.exp(-PYIN_BOLTZMANN)) / (1 - np.exp(-PYIN_BOLTZMANN * count))
+            prior = norm * np.exp(-PYIN_BOLTZMANN * position)
+        probs[frame, lag] = (np.where(below, prior, 0.0) @ beta_probs)[frame, rank]
+
+    heights = np.where(troughs, yin, np.inf)
+    deepest = np.argmin(heights, axis=1)
+    rows = np.nonzero(troughs.any(axis=1))[0]
+    thresholds_above = (PYIN_THRESHOLDS[1:] <= heights[rows, deepest[rows]][:, None]).sum(axis=1)
+    probs[rows, deepest[rows]] += PYIN_NO_TROUGH_PROB * np.concatenate([[0.0], np.cumsum(beta_probs)])[thresholds_above]
+    return probs
+
+@lru_cache(maxsize=4)
+def _pitch_transitions(n_bins: int, width: int) -> np.ndarray:
+    """log P(bin j | bin i) for the 2 * (width // 2) + 1 source bins i around each target bin j."""
+    transition = librosa.sequence.transition_local(n_bins, width, window="triangle", wrap=False)
+    half = width // 2
+    target = np.arange(n_bins)[:, None]
+    source = target - half + np.arange(2 * half + 1)
+    in_range = (source >= 0) & (source < n_bins)
+    return np.where(in_range, np.log(transition[np.clip(source, 0, n_bins - 1), target] + LOG_TINY), -np.inf)
+
+def _viterbi(log_voiced: np.ndarray, log_unvoiced: np.ndarray, log_band: np.ndarray) -> np.ndarray:
+    """
+    Most likely state per frame (bin, or n_bins + bin when unvoiced) under
+    pyin's HMM. Pitch moves at most half a band per frame, so each state only
+    looks at that band of sources instead of all 2 x n_bins states; this is
+    what makes it fast, with the same path librosa.sequence.viterbi finds.
+    """
+    n_frames, n_bins = log_voiced.shape
+    half = log_band.shape[1] // 2
+    stay, switch = np.log(1 - PYIN_SWITCH_PROB), np.log(PYIN_SWITCH_PROB)
+
+    value = np.empty((2, n_bins))
+    value[0] = log_voiced[0] - np.log(2 * n_bins)
+    value[1] = log_unvoiced[0] - np.log(2 * n_bins)
+    pointers = np.zeros((n_frames, 2, n_bins), dtype=np.int32)
+
+    padded = np.full((2, n_bins + 2 * half), -np.inf)
+    windows = sliding_window_view(padded, 2 * half + 1, axis=1)
+    scores = np.empty(windows.shape)
+    flat_index = np.arange(n_bins)[None, :] * windows.shape[2] + np.arange(2)[:, None] * scores[0].size
+    offset = np.arange(n_bins) - half
+    for t in range(1, n_frames):
+        padded[:, half:half + n_bins] = value
+        np.add(windows, log_band, out=scores)
+        best = np.argmax(scores, axis=2)
+        from_voiced, from_unvoiced = scores.reshape(-1)[flat_index + best]
+        source_voiced, source_unvoiced = offset + best[0], offset + best[1] + n_bins
+
+        # Ties go to the voiced source, as librosa's argmax over states does
+        to_voiced = from_unvoiced + switch > from_voiced + stay
+        to_unvoiced = from_unvoiced + stay > from_voiced + switch
+        value[0] = np.where(to_voiced, from_unvoiced + switch, from_voiced + stay) + log_voiced[t]
+        value[1] = np.where(to_unvoiced, from_unvoiced + stay, from_voiced + switch) + log_unvoiced[t]
+        pointers[t, 0] = np.where(to_voiced, source_unvoiced, source_voiced)
+        pointers[t, 1] = np.where(to_unvoiced, source_unvoiced, source_voiced)
+
+    states = np.empty(n_frames, dtype=np.int64)
+    states[-1] = np.argmax(value.reshape(-1))
+    for t in range(n_frames - 1, 0, -1):
+        states[t - 1] = pointers[t, states[t] // n_bins, states[t] % n_bins]
+    return states
+
+def pyin_pitch(audio_array: np.ndarray, sr: int = 16000, fmin: float = PITCH_FMIN, fmax: float = PITCH_FMAX):
+    """
+    librosa.pyin with its default settings, vectorised and with a banded
+    Viterbi: the same f0 track (NaN for unvoiced frames) in a fraction of the time.
+    """
+    min_period = int(np.floor(sr / fmax))
+    max_period = min(int(np.ceil(sr / fmin)), N_FFT - 1)
+    yin = _yin_frames(audio_array, min_period, max_period)
+
+    probs = np.concatenate([_trough_probs(yin[b:b + STFT_BLOCK_FRAMES]) for b in range(0, len(yin), STFT_BLOCK_FRAMES)])
+    n_bins = int(np.floor(12 * PYIN_BINS_PER_SEMITONE * np.log2(fmax / fmin))) + 1
+    frame, lag = np.nonzero(probs)
+    period = min_period + lag + _parabolic_shifts(yin)[frame, lag]
+    pitch_bin = np.clip(np.round(12 * PYIN_BINS_PER_SEMITONE * np.log2(sr / period / fmin)), 0, n_bins).astype(int)
+
+    # Candidates landing past the top bin are dropped, as in pyin
+    observation = np.zeros((len(yin), n_bins + 1))
+    observation[frame, pitch_bin] = probs[frame, lag]
+    observation = observation[:, :n_bins]
+    voiced_prob = np.clip(observation.sum(axis=1), 0, 1)
+
+    width = round(PYIN_MAX_TRANSITION_RATE * 12 * HOP_LENGTH / sr) * PYIN_BINS_PER_SEMITONE + 1
+    states = _viterbi(np.log(observation + LOG_TINY), np.log((1 - voiced_prob) / n_bins + LOG_TINY),
+                      _pitch_transitions(n_bins, width))
+    f0 = fmin * 2 ** ((states % n_bins) / (12 * PYIN_BINS_PER_SEMITONE))
+    f0[states >= n_bins] = np.nan
+    return f0
+
+class SignalFeatures:
+    """
+    Lazily computed signal features for one clip.
+    RMS, flatness and rolloff share one STFT; pitch uses the fast pyin above.
+    """
+    def __init__(self, audio_array: np.ndarray, sr: int = 16000):
+        self.audio_array = audio_array
+        self.sr = sr
+
+    @cached_property
+    def _frame_stats(self):
+        return spectral_frame_stats(self.audio_array, self.sr)
+
+    @property
+    def rms(self) -> float:
+        return float(np.mean(self._frame_stats[0]))
+
+    @property
+    def flatness(self) -> float:
+        return float(np.mean(self._frame_stats[1]))
+
+    @property
+    def rolloff(self) -> float:
+        return float(np.mean(self._frame_stats[2]))
+
+    @cached_property
+    def zcr_std(self) -> float:
+        """Spread of the per-frame zero-crossing rate: a cheap stand-in for pitch variance (no pyin)."""
+        zcr = librosa.feature.zero_crossing_rate(self.audio_array, frame_length=N_FFT, hop_length=HOP_LENGTH)
+        return float(np.std(zcr))
+
+    @cached_property
+    def pitch_var(self) -> float:
+        f0 = pyin_pitch(self.audio_array, self.sr)
+        f0 = f0[~np.isnan(f0)]
+        return float(np.std(f0)) if len(f0) > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {"pitch_var": self.pitch_var, "flatness": self.flatness, "rolloff": self.rolloff}
+
+def legacy_signal_features(audio_array: np.ndarray, sr: int = 16000) -> dict:
+    """The original pyin + per-feature STFT path, kept for parity checks and benchmarks."""
+    f0, _, _ = librosa.pyin(audio_array, fmin=PITCH_FMIN, fmax=PITCH_FMAX, sr=sr)
+    f0 = f0[~np.isnan(f0)]
+    pitch_std = np.std(f0) if len(f0) > 0 else 0
+
+    flatness = np.mean(librosa.feature.spectral_flatness(y=audio_array))
+    rolloff = np.mean(librosa.feature.spectral_rolloff(y=audio_array, sr=sr, roll_percent=0.95))
+    rms = np.mean(librosa.feature.rms(y=audio_array))
+
+    return {"pitch_var": pitch_std, "flatness": flatness, "rolloff": rolloff, "rms": rms}
@@ -0,0 +1,410 @@
+"""
+Dedicated inference server: one long-lived process owns the model and serves
+every API process on the host.
+
+API processes (InferenceClient) write float32 PCM into a shared-memory ring the
+server creates for their connection, and send only offsets and lengths over a
+Unix socket as JSON lines; logits come back the same way. Windows from all
+clients go through the server's BatchScheduler, so they are batched together.
+A client that dies only loses its own ring: the server unlinks it on disconnect.
+
+Usage:
+    python -m core.inference_server --socket /tmp/voice-inference.sock
+    INFERENCE_SERVER_SOCKET=/tmp/voice-inference.sock python serve.py --workers 4
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+from core.config import (
+    INFERENCE_SERVER_SOCKET, INFERENCE_SHM_MB, INFERENCE_SERVER_THREADS, INFERENCE_SERVER_TIMEOUT_S,
+)
+from core.metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+def _send(sock, lock, message: dict):
+    data = (json.dumps(message) + "\n").encode("utf-8")
+    with lock:
+        sock.sendall(data)
+
+def _attach_shm(name: str):
+    """Attaches to the server's segment without letting this process's resource tracker unlink it at exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers every attached segment with the resource tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+class _Ring:
+    """
+    Ring allocator over the shared-memory segment. Slots are handed out in order
+    from the head and may be freed in any order; the tail only advances past
+    freed slots, so space is reused FIFO like a ring buffer.
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self._head = 0
+        self._live = deque()  # [offset, nbytes, freed]
+        self._cond = threading.Condition()
+
+    def _fit(self, nbytes):
+        if not self._live:
+            self._head = 0
+            return 0 if nbytes <= self.size else None
+        tail = self._live[0][0]
+        if self._live[-1][0] >= tail:
+            # Not wrapped: free space is [head, size) and [0, tail)
+            if self.size - self._head >= nbytes:
+                return self._head
+            return 0 if tail >= nbytes else None
+        # Wrapped: free space is [head, tail)
+        return self._head if tail - self._head >= nbytes else None
+
+    def alloc(self, nbytes: int, timeout: float):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                offset = self._fit(nbytes)
+                if offset is not None:
+                    slot = [offset, nbytes, False]
+                    self._live.append(slot)
+                    self._head = offset + nbytes
+                    return slot
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Shared-memory ring is full")
+                self._cond.wait(remaining)
+
+    def free(self, slot):
+        with self._cond:
+            slot[2] = True
+            while self._live and self._live[0][2]:
+                self._live.popleft()
+            self._cond.notify_all()
+
+class InferenceClient:
+    """
+    An API process's connection to the inference server. Connects lazily and
+    again after fork() or a lost connection, so it survives worker restarts on
+    either side. Thread-safe: concurrent infer() calls share the connection.
+    """
+    def __init__(self, socket_path: str, timeout_s: float = INFERENCE_SERVER_TIMEOUT_S):
+        self.socket_path = socket_path
+        self.timeout_s = timeout_s
+        self.id2label = None
+        self.server_info = {}
+
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._pid = None
+        self._sock = None
+        self._pending = {}
+        self._next_id = 0
+
+        # Transfer overhead: copy into shared memory + round trip minus server-side time
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._bytes = 0
+        self._copy_s = 0.0
+        self._overhead_s = 0.0
+
+    # --- Connection ---
+
+    def connect(self, wait_s: float = 0.0):
+        """Connects (retrying for up to `wait_s` while the server starts) and returns the server's hello."""
+        deadline = time.monotonic() + wait_s
+        while True:
+            try:
+                self._ensure_connected()
+                return self.server_info
+            except (FileNotFoundError, ConnectionError) as e:
+                if time.monotonic() >= deadline:
+                    raise ConnectionError(f"Inference server at {self.socket_path} is not reachable: {e}")
+                time.sleep(0.5)
+
+    def _ensure_connected(self):
+        if self._sock is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._sock is not None and self._pid == os.getpid():
+                return
+            # Drop whatever was inherited through fork() (the parent keeps its own connection)
+            self._samples = None
+            self._shm = None
+
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+            reader = sock.makefile("rb")
+            _send(sock, self._send_lock, {"op": "hello", "pid": os.getpid()})
+            hello = json.loads(reader.readline() or b"{}")
+            if "shm" not in hello:
+                sock.close()
+                raise ConnectionError(hello.get("error", "no hello from inference server"))
+
+            self._shm = _attach_shm(hello["shm"])
+            self._samples = np.ndarray((hello["size"] // 4,), dtype=np.float32, buffer=self._shm.buf)
+            self._ring = _Ring(hello["size"])
+            self._pending = {}
+            self.id2label = {int(k): v for k, v in hello["id2label"].items()}
+            self.server_info = hello
+            self._pid = os.getpid()
+            self._sock = sock
+            threading.Thread(
+                target=self._read_loop, args=(sock, reader, self._pending, self._ring),
+                name="inference-client", daemon=True,
+            ).start()
+            logger.info(f"Connected to inference server {self.socket_path} "
+                        f"({hello['size'] // 2**20} MB ring, server pid {hello.get('pid')})")
+
+    def _read_loop(self, sock, reader, pending, ring):
+        try:
+            for line in reader:
+                message = json.loads(line)
+                entry = pending.pop(message.get("id"), None)
+                if entry is None:
+                    continue
+                future, slot = entry
+                if slot is not None:
+                    ring.free(slot)
+                future.set_result(message)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Inference server connection failed: {e}")
+        finally:
+            with self._lock:
+                if self._sock is sock:
+                    self._sock = None
+            for future, _ in list(pending.values()):
+                future.set_exception(ConnectionError("Lost connection to the inference server"))
+            pending.clear()
+
+    def _connection(self):
+        """(socket, samples, ring, pending) of one live connection, so a request never mixes two."""
+        self.connect()
+        with self._lock:
+            if self._sock is None:
+                raise ConnectionError("Lost connection to the inference server")
+            return self._sock, self._samples, self._ring, self._pending
+
+    def _request(self, connection, message: dict, slot=None) -> dict:
+        """
+        Sends `message` and waits for its reply. Once sent, `slot` is freed when
+        the reply arrives; if sending fails it is freed here.
+        """
+        sock, _, ring, pending = connection
+        future = Future()
+        with self._send_lock:
+            self._next_id += 1
+            message["id"] = self._next_id
+        pending[message["id"]] = (future, slot)
+        try:
+            if self._sock is not sock:
+                raise ConnectionError("connection was reset")
+            _send(sock, self._send_lock, message)
+        except OSError as e:
+            pending.pop(message["id"], None)
+            if slot is not None:
+                ring.free(slot)
+            raise ConnectionError(f"Inference server connection failed: {e}")
+        try:
+            reply = future.result(self.timeout_s)
+        except FutureTimeout:
+            # The slot is freed when the late reply arrives (or the connection is reset)
+            raise TimeoutError(f"Inference server did not answer within {self.timeout_s}s")
+        if "error" in reply:
+            raise RuntimeError(f"Inference server error: {reply['error']}")
+        return reply
+
+    # --- Public API ---
+
+    def infer(self, audio_arrays) -> np.ndarray:
+        """Logits (n, num_labels) for a list of 16kHz float32 clips, computed by the server."""
+        connection = self._connection()
+        _, samples, ring, _ = connection
+        lengths = [len(a) for a in audio_arrays]
+        nbytes = 4 * sum(lengths)
+        if nbytes > ring.size:
+            raise ValueError(f"{nbytes} bytes of audio do not fit the {ring.size} byte ring (INFERENCE_SHM_MB)")
+
+        started = time.perf_counter()
+        slot = ring.alloc(nbytes, self.timeout_s)
+        try:
+            position = slot[0] // 4
+            for audio_array, length in zip(audio_arrays, lengths):
+                # The only copy: PCM into shared memory, where the server reads it in place
+                samples[position:position + length] = audio_array
+                position += length
+        except BaseException:
+            ring.free(slot)
+            raise
+        copy_s = time.perf_counter() - started
+
+        reply = self._request(connection, {"op": "infer", "offset": slot[0], "lengths": lengths}, slot)
+        overhead_s = time.perf_counter() - started - reply["server_s"]
+        record_stage("ipc_overhead", overhead_s)
+        with self._stats_lock:
+            self._requests += 1
+            self._bytes += nbytes
+            self._copy_s += copy_s
+            self._overhead_s += overhead_s
+        return np.asarray(reply["logits"], dtype=np.float32)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            n = max(self._requests, 1)
+            local = {
+                "requests": self._requests,
+                "mb_transferred": round(self._bytes / 2**20, 2),
+                "mean_copy_ms": round(1000 * self._copy_s / n, 3),
+                "mean_overhead_ms": round(1000 * self._overhead_s / n, 3),
+            }
+        try:
+            local["server"] = self._request(self._connection(), {"op": "stats"})["stats"]
+        except Exception as e:
+            local["server"] = {"error": str(e)}
+        return local
+
+class InferenceServer:
+    """Accepts API processes on a Unix socket and runs their windows through the local classifier."""
+    def __init__(self, socket_path: str, shm_bytes: int, threads: int):
+        from core.classifier import classifier
+
+        self.classifier = classifier
+        self.socket_path = socket_path
+        self.shm_bytes = shm_bytes
+        self._pool = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="inference-server")
+        self._lock = threading.Lock()
+        self._clients = 0
+        self._requests = 0
+        self._windows = 0
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # Left over from a previous run
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        listener.listen(128)
+        logger.info(f"Inference server listening on {self.socket_path}")
+        try:
+            while True:
+                conn, _ = listener.accept()
+                threading.Thread(target=self._handle, args=(conn,), name="inference-conn", daemon=True).start()
+        finally:
+            listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {"pid": os.getpid(), "clients": self._clients, "requests": self._requests, "windows": self._windows}
+        if self.classifier.batcher is not None:
+            stats["batching"] = self.classifier.batcher.stats()
+        return stats
+
+    def _handle(self, conn):
+        """One API process: its own ring, until it disconnects."""
+        send_lock = threading.Lock()
+        shm = shared_memory.SharedMemory(create=True, size=self.shm_bytes)
+        samples = np.ndarray((self.shm_bytes // 4,), dtype=np.float32, buffer=shm.buf)
+        inflight = []
+        client_pid = None
+        with self._lock:
+            self._clients += 1
+        try:
+            reader = conn.makefile("rb")
+            hello = json.loads(reader.readline() or b"{}")
+            client_pid = hello.get("pid")
+            _send(conn, send_lock, {
+                "op": "hello", "pid": os.getpid(), "shm": shm.name, "size": self.shm_bytes,
+                "id2label": {str(k): v for k, v in self.classifier.config.id2label.items()},
+                "identity": self.classifier.identity,
+            })
+            logger.info(f"API process {client_pid} connected")
+            for line in reader:
+                message = json.loads(line)
+                if message.get("op") == "infer":
+                    inflight.append(self._pool.submit(
+                        self._infer, conn, send_lock, samples, message, time.perf_counter()
+                    ))
+                    inflight = [f for f in inflight if not f.done()]
+                elif message.get("op") == "stats":
+                    _send(conn, send_lock, {"id": message.get("id"), "stats": self.stats()})
+        except (OSError, ValueError) as e:
+            logger.warning(f"API process {client_pid} connection error: {e}")
+        finally:
+            # Views into the segment must be gone before it can be closed
+            for future in inflight:
+                try:
+                    future.result(timeout=INFERENCE_SERVER_TIMEOUT_S)
+                except Exception:
+                    pass
+            del samples
+            try:
+                shm.close()
+            except BufferError:
+                pass
+            shm.unlink()
+            conn.close()
+            with self._lock:
+                self._clients -= 1
+            logger.info(f"API process {client_pid} disconnected")
+
+    def _infer(self, conn, send_lock, samples, message, received):
+        try:
+            position = message["offset"] // 4
+            windows = []
+            for length in message["lengths"]:
+                windows.append(samples[position:position + length])  # Views into shared memory
+                position += length
+            logits = self.classifier._infer_logits(windows)
+            del windows
+            reply = {"id": message["id"], "logits": logits.tolist(), "server_s": time.perf_counter() - received}
+            with self._lock:
+                self._requests += 1
+                self._windows += len(message["lengths"])
+        except Exception as e:
+            logger.error(f"Inference request failed: {e}")
+            reply = {"id": message.get("id"), "error": str(e)}
+        try:
+            _send(conn, send_lock, reply)
+        except OSError:
+            pass  # Client went away; its ring is released by _handle
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=INFERENCE_SERVER_SOCKET or "/tmp/voice-inference.sock")
+    parser.add_argument("--shm-mb", type=int, default=INFERENCE_SHM_MB, help="Shared-memory ring per API process")
+    parser.add_argument("--threads", type=int, default=INFERENCE_SERVER_THREADS,
+                        help="Requests handled concurrently (their windows are batched together)")
+    args = parser.parse_args()
+
+    from core.classifier import classifier
+    # This process is the server: run the model here instead of forwarding to a socket
+    classifier.remote_socket = ""
+    classifier.start()
+
+    # Clean shutdown (socket file and rings removed) on SIGTERM as on Ctrl+C
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        InferenceServer(args.socket, args.shm_mb * 2**20, args.threads).serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Inference server stopped")
+
+if __name__ == "__main__":
+    main()
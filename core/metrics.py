@@ -0,0 +1,181 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from core.config import METRICS_ENABLED
+
+# Latency buckets in seconds, from sub-millisecond stages up to long clips
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DURATION_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+SIZE_BUCKETS = (16e3, 64e3, 256e3, 1e6, 4e6, 16e6, 64e6)
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value:g}")
+        return lines
+
+class Gauge:
+    """Gauge read from a callback at scrape time (e.g. a queue's current depth)."""
+    def __init__(self, name, help, fn):
+        self.name, self.help, self.fn = name, help, fn
+
+    def render(self):
+        try:
+            value = float(self.fn())
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value:g}"]
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = 'le="%g"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+class Registry:
+    """Minimal in-process Prometheus registry (text exposition format 0.0.4)."""
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, fn):
+        return self._register(Gauge(name, help, fn))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "voice_stage_duration_seconds", "Time spent in each analysis stage", labels=("stage",)
+)
+REQUEST_SECONDS = registry.histogram(
+    "voice_http_request_duration_seconds", "HTTP request latency", labels=("method", "route", "status")
+)
+AUDIO_SECONDS = registry.histogram(
+    "voice_audio_duration_seconds", "Duration of analysed audio clips", buckets=DURATION_BUCKETS
+)
+PAYLOAD_BYTES = registry.histogram(
+    "voice_payload_bytes", "Size of received audio payloads (decoded, not base64)", buckets=SIZE_BUCKETS
+)
+TRIMMED_SECONDS = registry.counter(
+    "voice_vad_trimmed_seconds_total", "Seconds of silence removed before inference"
+)
+DECISIONS = registry.counter(
+    "voice_decisions_total", "Verdicts by the stage that decided them (cascade or model)", labels=("decided_by",)
+)
+ERRORS = registry.counter("voice_errors_total", "Failed analyses by error type", labels=("type",))
+DEGRADATIONS = registry.counter(
+    "voice_degradations_total", "Degradations applied to meet request deadlines", labels=("kind",)
+)
+TENANT_REQUESTS = registry.counter(
+    "voice_tenant_requests_total", "Analysis requests admitted per tenant", labels=("tenant",)
+)
+TENANT_AUDIO_SECONDS = registry.counter(
+    "voice_tenant_audio_seconds_total", "Seconds of audio analysed per tenant", labels=("tenant",)
+)
+TENANT_REJECTIONS = registry.counter(
+    "voice_tenant_rejections_total", "Requests rejected per tenant and reason "
+    "(rate_limited, audio_quota, queue_full, evicted)", labels=("tenant", "reason")
+)
+TENANT_QUEUE_WAIT = registry.histogram(
+    "voice_tenant_queue_wait_seconds", "Time jobs wait for an inference worker, per tenant", labels=("tenant",)
+)
+
+# Stage timings of the current request, when Server-Timing is requested
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+@contextmanager
+def stage(name: str):
+    """Times a block as analysis stage `name` (histogram + current request's Server-Timing)."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+def record_stage(name: str, seconds: float):
+    if not METRICS_ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+def record_error(kind: str):
+    ERRORS.inc(type=kind)
+
+def start_request_timings() -> dict:
+    """Starts collecting stage timings for the current request context; returns the live dict."""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+def server_timing_header(timings: dict, total: float = None) -> str:
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict
+
+import librosa
+
+from core.audio import decode_audio_bytes
+from core.cache import result_cache
+from core.classifier import classifier, Prediction
+from core.deadline import DeadlineExceeded
+from core.config import BATCH_MAX_SIZE, BATCH_DECODE_WORKERS
+from core.features import SignalFeatures
+from core.executor import inference_pool
+from core.metrics import PAYLOAD_BYTES, DEGRADATIONS
+
+def analyze_audio(audio_bytes: bytes, deadline=None, explain=True):
+    """
+    Full decode + classify pipeline for one clip (raw, already base64-decoded bytes).
+    Module-level so it can be shipped to a process pool worker.
+    """
+    # The queue may have eaten the whole budget
+    if deadline is not None and deadline.remaining() <= 0:
+        raise DeadlineExceeded(f"Deadline passed {-deadline.remaining() * 1000:.0f}ms before the request left the queue")
+    audio_array, sr = decode_audio_bytes(audio_bytes)
+    prediction = classifier.predict_detailed(audio_array, source_sr=sr, deadline=deadline, explain=explain)
+    prediction.audio_seconds = round(len(audio_array) / sr, 2)
+    return prediction
+
+# Decoding is mostly native code (libsndfile, soxr) that releases the GIL
+_decode_pool = ThreadPoolExecutor(max_workers=BATCH_DECODE_WORKERS, thread_name_prefix="batch-decode")
+
+def analyze_batch(audio_bytes_list, on_result=None):
+    """
+    Decodes many clips in parallel and classifies them in padded batches.
+    Returns one Prediction or Exception per clip. If `on_result(index, result)`
+    is given, it is called as soon as each clip's result is known.
+    Module-level so it can be shipped to a process pool worker.
+    """
+    results = [None] * len(audio_bytes_list)
+    ready = []
+
+    def deliver(i, result):
+        results[i] = result
+        if on_result is not None:
+            on_result(i, result)
+
+    def flush():
+        predictions = classifier.predict_batch([audio for _, audio in ready])
+        for (i, audio_array), result in zip(ready, predictions):
+            if isinstance(result, Prediction):
+                result.audio_seconds = round(len(audio_array) / classifier.target_sr, 2)
+            deliver(i, result)
+        ready.clear()
+
+    futures = {_decode_pool.submit(decode_audio_bytes, b): i for i, b in enumerate(audio_bytes_list)}
+    for future in as_completed(futures):
+        i = futures[future]
+        try:
+            audio_array, _ = future.result()
+        except Exception as e:
+            deliver(i, e)
+            continue
+        ready.append((i, audio_array))
+        # Start inference as soon as a full batch has been decoded
+        if len(ready) >= BATCH_MAX_SIZE:
+            flush()
+    if ready:
+        flush()
+
+    return results
+
+def score_window(audio_array, sr: int = 16000):
+    """
+    Class probabilities for one streaming window at `sr` (resampled here, off
+    the event loop), or None if it is silent.
+    Module-level so it can be shipped to a process pool worker.
+    """
+    if sr != classifier.target_sr:
+        audio_array = librosa.resample(audio_array, orig_sr=sr, target_sr=classifier.target_sr)
+    if SignalFeatures(audio_array, sr=classifier.target_sr).rms < 0.005:
+        return None
+    return classifier.score_windows([audio_array])[0]
+
+async def run_analysis(audio_bytes: bytes, deadline=None, explain=True, tenant=None) -> Prediction:
+    """
+    Analysis as used by the API: served from the result cache when possible,
+    otherwise run once on the inference pool (identical concurrent clips share it).
+    With a `deadline`, the answer may be degraded to make it (degraded answers
+    are not cached), or DeadlineExceeded is raised when it cannot be made at all.
+    `explain=False` returns the verdict only (cached separately from full answers).
+    `tenant` picks the queue the job waits in (see InferencePool).
+    """
+    PAYLOAD_BYTES.observe(len(audio_bytes))
+
+    async def compute():
+        # Shed up front rather than queue a job that cannot finish in time
+        if deadline is not None and inference_pool.expected_wait() >= deadline.remaining():
+            raise DeadlineExceeded(
+                f"Deadline cannot be met: about {inference_pool.expected_wait() * 1000:.0f}ms of queue ahead"
+            )
+        return asdict(await inference_pool.run(analyze_audio, audio_bytes, deadline, explain, tenant=tenant))
+
+    key = result_cache.make_key(audio_bytes, classifier.identity if explain else classifier.identity + "|verdict")
+    prediction = Prediction(**await result_cache.get_or_compute(
+        key, compute,
+        # How far a computation degrades depends on its own deadline, so a request
+        # with a deadline neither joins nor hands out a shared computation
+        coalesce=deadline is None,
+        cacheable=lambda result: not result["degradations"],
+    ))
+    for kind in prediction.degradations:
+        DEGRADATIONS.inc(kind=kind)
+    return prediction
@@ -0,0 +1,73 @@
+import threading
+
+import numpy as np
+import torch
+
+_TORCH_DTYPES = {np.float32: torch.float32, np.int32: torch.int32}
+
+class Preprocessor:
+    """
+    Lean stand-in for the Wav2Vec2 feature extractor on the inference path.
+
+    Each clip is copied once into a reusable (n, longest) float32 buffer and
+    normalised to zero mean / unit variance in place over its own length, with
+    the padding filled with `padding_value`, matching the extractor's output.
+    Buffers are per thread and only grow; the returned arrays are views into
+    them, valid until the same thread prepares the next batch. With
+    `pin_memory` the buffers are page-locked so host-to-GPU copies can be
+    asynchronous.
+    """
+    def __init__(self, do_normalize=True, padding_value=0.0, return_attention_mask=False, pin_memory=False):
+        self.do_normalize = do_normalize
+        self.padding_value = float(padding_value)
+        self.return_attention_mask = return_attention_mask
+        self.pin_memory = pin_memory
+        self._local = threading.local()
+
+    @classmethod
+    def from_feature_extractor(cls, feature_extractor, pin_memory=False):
+        return cls(
+            do_normalize=getattr(feature_extractor, "do_normalize", True),
+            padding_value=getattr(feature_extractor, "padding_value", 0.0),
+            return_attention_mask=bool(getattr(feature_extractor, "return_attention_mask", False)),
+            pin_memory=pin_memory,
+        )
+
+    def _buffer(self, name, rows, cols, dtype):
+        """(rows, cols) view of this thread's buffer `name`, reallocated only when too small."""
+        buf = getattr(self._local, name, None)
+        if buf is None or buf.shape[0] < rows or buf.shape[1] < cols:
+            if buf is not None:
+                rows, cols = max(rows, buf.shape[0]), max(cols, buf.shape[1])
+            if self.pin_memory:
+                buf = torch.empty((rows, cols), dtype=_TORCH_DTYPES[dtype], pin_memory=True).numpy()
+            else:
+                buf = np.empty((rows, cols), dtype=dtype)
+            setattr(self._local, name, buf)
+        return buf
+
+    def __call__(self, audio_arrays):
+        """Returns (input_values, attention_mask or None) as float32 / int32 arrays of shape (n, longest)."""
+        lengths = [len(a) for a in audio_arrays]
+        rows, cols = len(audio_arrays), max(lengths)
+
+        values = self._buffer("values", rows, cols, np.float32)[:rows, :cols]
+        for row, audio, length in zip(values, audio_arrays, lengths):
+            clip = row[:length]
+            # The only copy of the samples: decoded PCM (often a window view) into the batch row
+            clip[:] = audio
+            if self.do_normalize:
+                # Same maths as the extractor's zero_mean_unit_var_norm, without temporaries
+                clip -= np.float32(clip.mean(dtype=np.float64))
+                var = float(np.dot(clip, clip)) / max(length, 1)
+                clip *= np.float32(1.0 / np.sqrt(var + 1e-7))
+            row[length:] = self.padding_value
+
+        mask = None
+        if self.return_attention_mask:
+            mask = self._buffer("mask", rows, cols, np.int32)[:rows, :cols]
+            for row, length in zip(mask, lengths):
+                row[:length] = 1
+                row[length:] = 0
+
+        return values, mask
@@ -0,0 +1,81 @@
+import numpy as np
+
+from core.audio import TARGET_SR, AudioDecodeError, decode_audio_bytes
+
+# Frame formats accepted on the streaming endpoint
+PCM_DTYPES = {"pcm_s16le": np.dtype("<i2"), "pcm_f32le": np.dtype("<f4")}
+STREAM_FORMATS = tuple(PCM_DTYPES) + ("encoded",)
+
+def stream_rate(fmt: str, sample_rate: int) -> int:
+    """Sample rate of the PCM frame_to_pcm returns for a stream's format."""
+    return TARGET_SR if fmt == "encoded" else sample_rate
+
+def frame_to_pcm(data: bytes, fmt: str) -> np.ndarray:
+    """
+    Converts one binary stream message to mono float32 PCM at the stream's own
+    rate (see stream_rate). Resampling is left to whole windows, which is
+    cheaper than per frame and has no seams at frame edges.
+    "encoded" messages must each be a self-contained file (e.g. a short WAV/OGG chunk).
+    """
+    if fmt == "encoded":
+        audio_array, _ = decode_audio_bytes(data)
+        return audio_array
+
+    dtype = PCM_DTYPES[fmt]
+    if len(data) % dtype.itemsize:
+        raise AudioDecodeError(f"Frame length {len(data)} is not a multiple of {dtype.itemsize} bytes")
+    samples = np.frombuffer(data, dtype=dtype)
+    if fmt == "pcm_s16le":
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32)
+
+class StreamBuffer:
+    """
+    Bounded rolling PCM buffer for one stream.
+
+    Holds at most `window_samples` of audio. After the first full window,
+    a new window becomes ready every `hop_samples` of incoming audio, so
+    memory per stream stays constant however long the stream runs.
+    """
+    def __init__(self, window_samples: int, hop_samples: int):
+        self.window_samples = int(window_samples)
+        self.hop_samples = min(max(1, int(hop_samples)), self.window_samples)
+        self._buffer = np.zeros(self.window_samples, dtype=np.float32)
+        self._filled = 0
+        self.total_samples = 0
+        # Stream position at which the next window is complete
+        self._next_emit = self.window_samples
+        self._last_emitted = 0
+
+    def feed(self, samples: np.ndarray):
+        """
+        Appends samples and yields (window, start_sample, end_sample) for every
+        window that fills up along the way. Windows are copies, safe to hand off.
+        """
+        i = 0
+        while i < len(samples):
+            n = min(len(samples) - i, self._next_emit - self.total_samples)
+            self._append(samples[i:i + n])
+            i += n
+            if self.total_samples == self._next_emit:
+                self._next_emit += self.hop_samples
+                self._last_emitted = self.total_samples
+                yield self._buffer.copy(), self.total_samples - self.window_samples, self.total_samples
+
+    def flush(self, min_samples: int):
+        """
+        The most recent audio as a final (possibly short) window if some of it
+        has not been covered by an emitted window yet, else None.
+        """
+        if self.total_samples == self._last_emitted or self._filled < min_samples:
+            return None
+        self._last_emitted = self.total_samples
+        window = self._buffer[self.window_samples - self._filled:].copy()
+        return window, self.total_samples - self._filled, self.total_samples
+
+    def _append(self, piece: np.ndarray):
+        n = len(piece)
+        self._buffer[:-n] = self._buffer[n:]
+        self._buffer[-n:] = piece
+        self._filled = min(self.window_samples, self._filled + n)
+        self.total_samples += n
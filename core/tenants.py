@@ -0,0 +1,153 @@
+import json
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from core.config import (
+    API_KEY_SECRET, TENANTS, TENANT_DEFAULT_PRIORITY, TENANT_DEFAULT_RATE_PER_S, TENANT_DEFAULT_BURST,
+    TENANT_DEFAULT_AUDIO_S_PER_MIN, TENANT_PRIORITY_WEIGHTS,
+)
+from core.metrics import TENANT_AUDIO_SECONDS, TENANT_REJECTIONS, TENANT_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+class RateLimited(Exception):
+    """Raised when a tenant is over its request rate or audio quota."""
+    def __init__(self, tenant, reason, retry_after):
+        super().__init__(f"Tenant {tenant} is over its {'request rate' if reason == 'rate_limited' else 'audio quota'}")
+        self.tenant = tenant
+        self.reason = reason
+        self.retry_after = retry_after
+
+@dataclass
+class Tenant:
+    name: str
+    # Priority class; its weight in TENANT_PRIORITY_WEIGHTS is the tenant's share of the inference workers
+    priority: str = TENANT_DEFAULT_PRIORITY
+    # Analysis requests per second and bucket size (0 = unlimited; burst 0 = one second's worth)
+    rate_per_s: float = TENANT_DEFAULT_RATE_PER_S
+    burst: float = TENANT_DEFAULT_BURST
+    # Seconds of audio per minute, over a one-minute bucket (0 = unlimited)
+    audio_s_per_min: float = TENANT_DEFAULT_AUDIO_S_PER_MIN
+
+    @property
+    def weight(self) -> float:
+        return TENANT_PRIORITY_WEIGHTS.get(self.priority, 1.0)
+
+class TokenBucket:
+    """
+    Refills at `rate` tokens per second up to `capacity`. take() spends tokens
+    only if enough are left; charge() always spends and may drive the balance
+    negative, so a cost only known afterwards (seconds of decoded audio) is paid
+    back before the tenant is admitted again.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, amount: float) -> float:
+        """Takes `amount` tokens if available and returns 0, else the seconds until they will be."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def charge(self, amount: float):
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+
+    def level(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+def load_tenants(spec: str, default_key: str = API_KEY_SECRET) -> dict:
+    """
+    API key -> Tenant from TENANTS (inline JSON or a path), plus `default_key`
+    as "default". Tenant names key the rate limits, quotas and fair-queue flows,
+    so they must be unique: unnamed tenants get "tenant-<n>" and a name used
+    twice is a configuration error.
+    """
+    tenants = {}
+    if spec:
+        if spec.lstrip().startswith("{"):
+            entries = json.loads(spec)
+        else:
+            with open(spec, encoding="utf-8") as f:
+                entries = json.load(f)
+        for n, (api_key, settings) in enumerate(entries.items(), start=1):
+            tenants[api_key] = Tenant(**{"name": f"tenant-{n}", **settings})
+    if default_key and default_key not in tenants:
+        tenants[default_key] = Tenant("default")
+
+    names = [tenant.name for tenant in tenants.values()]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"TENANTS: tenant names must be unique, got duplicates {duplicates}")
+    for tenant in tenants.values():
+        if tenant.priority not in TENANT_PRIORITY_WEIGHTS:
+            logger.warning(f"Tenant {tenant.name}: unknown priority {tenant.priority!r}, weight 1")
+    return tenants
+
+class TenantRegistry:
+    """API keys, their tenants and each tenant's request-rate and audio-seconds buckets."""
+    def __init__(self, tenants: dict):
+        self._by_key = tenants
+        self._requests = {}
+        self._audio = {}
+        for tenant in tenants.values():
+            if tenant.rate_per_s > 0:
+                self._requests[tenant.name] = TokenBucket(tenant.rate_per_s, tenant.burst or max(1.0, tenant.rate_per_s))
+            if tenant.audio_s_per_min > 0:
+                self._audio[tenant.name] = TokenBucket(tenant.audio_s_per_min / 60.0, tenant.audio_s_per_min)
+
+    def get(self, api_key: Optional[str]) -> Optional[Tenant]:
+        return self._by_key.get(api_key) if api_key else None
+
+    def admit(self, tenant: Tenant):
+        """Counts an analysis request against the tenant's limits; raises RateLimited when over."""
+        audio = self._audio.get(tenant.name)
+        # Audio seconds are charged once the clip is decoded; admit while the balance is positive
+        if audio is not None and audio.level() <= 0:
+            TENANT_REJECTIONS.inc(tenant=tenant.name, reason="audio_quota")
+            raise RateLimited(tenant.name, "audio_quota", max(1, math.ceil(-audio.level() / audio.rate)))
+        requests = self._requests.get(tenant.name)
+        if requests is not None:
+            wait = requests.take(1.0)
+            if wait > 0:
+                TENANT_REJECTIONS.inc(tenant=tenant.name, reason="rate_limited")
+                raise RateLimited(tenant.name, "rate_limited", max(1, math.ceil(wait)))
+        TENANT_REQUESTS.inc(tenant=tenant.name)
+
+    def charge_audio(self, tenant: Tenant, seconds: float):
+        TENANT_AUDIO_SECONDS.inc(seconds, tenant=tenant.name)
+        audio = self._audio.get(tenant.name)
+        if audio is not None:
+            audio.charge(seconds)
+
+    def stats(self) -> dict:
+        stats = {}
+        for tenant in self._by_key.values():
+            entry = {"priority": tenant.priority, "weight": tenant.weight}
+            if tenant.name in self._requests:
+                entry["request_tokens"] = round(self._requests[tenant.name].level(), 2)
+            if tenant.name in self._audio:
+                entry["audio_seconds_left"] = round(self._audio[tenant.name].level(), 1)
+            stats[tenant.name] = entry
+        return stats
+
+tenants = TenantRegistry(load_tenants(TENANTS))
@@ -0,0 +1,64 @@
+import numpy as np
+
+from core.config import VAD_FRAME_MS, VAD_FLOOR_DB, VAD_RELATIVE_DB, VAD_PAD_MS, VAD_MAX_SILENCE_MS
+
+def frame_energy_db(audio_array: np.ndarray, frame: int) -> np.ndarray:
+    """Mean power per non-overlapping frame in dBFS (the ragged tail counts as one frame)."""
+    n_full = len(audio_array) // frame
+    power = np.mean(np.square(audio_array[:n_full * frame].reshape(n_full, frame), dtype=np.float32), axis=1)
+    if len(audio_array) > n_full * frame:
+        power = np.append(power, np.mean(np.square(audio_array[n_full * frame:], dtype=np.float32)))
+    return 10.0 * np.log10(power + 1e-12)
+
+def voiced_frames(audio_array: np.ndarray, sr: int = 16000, frame_ms: float = VAD_FRAME_MS,
+                  floor_db: float = VAD_FLOOR_DB, relative_db: float = VAD_RELATIVE_DB,
+                  pad_ms: float = VAD_PAD_MS) -> np.ndarray:
+    """
+    Energy VAD. A frame is voiced when it is louder than both `floor_db` dBFS and
+    `relative_db` below the loudest frame; voiced regions are then widened by
+    `pad_ms` on each side so onsets and decays are kept.
+    """
+    frame = max(1, int(sr * frame_ms / 1000))
+    db = frame_energy_db(audio_array, frame)
+    voiced = db > max(floor_db, db.max() - relative_db)
+
+    pad = int(round(pad_ms / frame_ms))
+    if pad > 0 and voiced.any():
+        voiced = np.convolve(voiced, np.ones(2 * pad + 1), mode="same") > 0
+    return voiced
+
+def trim_silence(audio_array: np.ndarray, sr: int = 16000, frame_ms: float = VAD_FRAME_MS,
+                 max_silence_ms: float = VAD_MAX_SILENCE_MS, **vad_kwargs):
+    """
+    Compresses every silence longer than `max_silence_ms` down to that length
+    (half kept on each side), so natural pauses survive but dead air does not.
+    Leading and trailing silence is dropped entirely. Returns (audio_array,
+    trimmed_seconds); the input is returned as-is when nothing is trimmed or
+    nothing is voiced.
+    """
+    frame = max(1, int(sr * frame_ms / 1000))
+    voiced = voiced_frames(audio_array, sr, frame_ms, **vad_kwargs)
+    if voiced.all() or not voiced.any():
+        return audio_array, 0.0
+
+    keep = voiced.copy()
+    keep_frames = max(0, int(max_silence_ms / frame_ms))
+
+    # Runs of unvoiced frames: [start, end) frame indices
+    edges = np.flatnonzero(np.diff(np.concatenate(([1], voiced.astype(np.int8), [1]))))
+    for start, end in zip(edges[::2], edges[1::2]):
+        if start == 0 or end == len(voiced):
+            continue
+        if end - start > keep_frames:
+            head = keep_frames // 2
+            keep[start:start + head] = True
+            keep[end - (keep_frames - head):end] = True
+        else:
+            keep[start:end] = True
+
+    if keep.all():
+        return audio_array, 0.0
+
+    sample_mask = np.repeat(keep, frame)[:len(audio_array)]
+    trimmed = audio_array[sample_mask]
+    return trimmed, (len(audio_array) - len(trimmed)) / sr
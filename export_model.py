@@ -0,0 +1,106 @@
+import argparse
+import time
+
+import numpy as np
+import torch
+from transformers import AutoFeatureExtractor
+
+from core.audio import decode_audio_bytes
+from core.backends import BACKENDS, export_artifact, load_backend
+from core.config import MODEL_NAME, MODEL_LOCAL_DIR, MODEL_ARTIFACT_DIR, CHUNK_WINDOW_S
+
+# Weights are read from the pinned snapshot when MODEL_LOCAL_DIR is set
+MODEL_SOURCE = MODEL_LOCAL_DIR or MODEL_NAME
+LOCAL_ONLY = bool(MODEL_LOCAL_DIR)
+
+# --- CONFIGURATION ---
+PARITY_CLIPS = ["clip1.mp3", "clip2.mp3"]
+# Windows per clip used for the parity check
+MAX_WINDOWS = 6
+
+def load_windows(extractor, clips):
+    """Model inputs for the first few CHUNK_WINDOW_S windows of each clip, as served."""
+    windows = []
+    for path in clips:
+        with open(path, "rb") as f:
+            audio, sr = decode_audio_bytes(f.read())
+        size = int(CHUNK_WINDOW_S * sr) if CHUNK_WINDOW_S > 0 else len(audio)
+        for start in range(0, max(len(audio) - size, 0) + 1, size)[:MAX_WINDOWS]:
+            inputs = extractor(audio[start:start + size], sampling_rate=sr, return_tensors="np")
+            windows.append((f"{path}@{start / sr:.0f}s", inputs["input_values"]))
+    return windows
+
+def run_backend(backend, windows, runs=3):
+    logits, timings = [], []
+    backend.forward(windows[0][1])  # warm-up
+    for _, input_values in windows:
+        best = float("inf")
+        for _ in range(runs):
+            start = time.perf_counter()
+            out = backend.forward(input_values)
+            best = min(best, time.perf_counter() - start)
+        logits.append(out[0])
+        timings.append(best * 1000.0)
+    return np.stack(logits), float(np.median(timings))
+
+def check_parity(backends, clips):
+    print(f"\n=== PARITY CHECK vs eager fp32 ({', '.join(clips)}) ===")
+    extractor = AutoFeatureExtractor.from_pretrained(MODEL_SOURCE, local_files_only=LOCAL_ONLY)
+    windows = load_windows(extractor, clips)
+    device = torch.device("cpu")
+
+    reference = load_backend("torch", MODEL_SOURCE, MODEL_NAME, device, MODEL_ARTIFACT_DIR,
+                             local_files_only=LOCAL_ONLY)
+    ref_logits, ref_ms = run_backend(reference, windows)
+    print(f"{'backend':<12}{'median ms':>11}{'speed-up':>10}{'max |dlogit|':>14}{'verdicts':>11}")
+    print(f"{'torch':<12}{ref_ms:>11.1f}{1.0:>10.2f}{0.0:>14.5f}{len(windows):>7}/{len(windows)}")
+
+    for name in backends:
+        if name == "torch":
+            continue
+        backend = load_backend(name, MODEL_SOURCE, MODEL_NAME, device, MODEL_ARTIFACT_DIR,
+                               local_files_only=LOCAL_ONLY)
+        logits, ms = run_backend(backend, windows)
+        drift = float(np.abs(logits - ref_logits).max())
+        same = int((logits.argmax(axis=1) == ref_logits.argmax(axis=1)).sum())
+        print(f"{name:<12}{ms:>11.1f}{ref_ms / ms:>10.2f}{drift:>14.5f}{same:>7}/{len(windows)}")
+        for (label, _), a, b in zip(windows, ref_logits, logits):
+            if a.argmax() != b.argmax():
+                print(f"   [ATTENTION] verdict flipped on {label}: {a.round(3)} -> {b.round(3)}")
+
+def save_snapshot(path):
+    """Pins the hub checkpoint (weights, config, extractor) to a local directory for MODEL_LOCAL_DIR."""
+    from transformers import AutoModelForAudioClassification
+    print(f"=== SNAPSHOT {MODEL_NAME} -> {path} ===")
+    AutoFeatureExtractor.from_pretrained(MODEL_NAME).save_pretrained(path)
+    AutoModelForAudioClassification.from_pretrained(MODEL_NAME).save_pretrained(path)
+    print(f"  Done. Serve it offline with MODEL_LOCAL_DIR={path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export/quantize the classifier for CPU inference backends.")
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "torch"] + ["all"], default="all")
+    parser.add_argument("--check", action="store_true", help="Compare latency and logits against eager fp32")
+    parser.add_argument("--clips", nargs="*", default=PARITY_CLIPS)
+    parser.add_argument("--snapshot", metavar="DIR", help="Only save a local snapshot of the hub checkpoint to DIR")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        save_snapshot(args.snapshot)
+        return
+
+    backends = [b for b in BACKENDS if b != "torch"] if args.backend == "all" else [args.backend]
+    extractor = AutoFeatureExtractor.from_pretrained(MODEL_SOURCE, local_files_only=LOCAL_ONLY)
+
+    print(f"=== EXPORTING {MODEL_NAME} ===")
+    for name in backends:
+        path = export_artifact(
+            name, MODEL_SOURCE, MODEL_NAME, MODEL_ARTIFACT_DIR,
+            use_attention_mask=bool(extractor.return_attention_mask), local_files_only=LOCAL_ONLY,
+        )
+        print(f"  {name:<12} -> {path}")
+
+    if args.check:
+        check_parity(backends, args.clips)
+
+if __name__ == "__main__":
+    main()
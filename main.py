@@ -1,18 +1,62 @@
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from api.middleware import MetricsMiddleware
 from api.routes import router
+from core.classifier import classifier
+from core.metrics import registry
 import uvicorn
 
+IMPORT_SECONDS = round(time.perf_counter() - _import_started, 3)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load and warm the model in the background so /ready can answer meanwhile.
+    # Already done when the app runs under serve.py (the master loads before forking).
+    task = None
+    if not classifier.ready:
+        logger.info(f"Imports took {IMPORT_SECONDS}s; loading model in the background")
+        task = asyncio.create_task(asyncio.to_thread(classifier.start))
+        # Retrieve the exception (already logged and reported by /ready)
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    yield
+
 app = FastAPI(
     title="AI Voice Detection API",
     description="API to detect AI-generated voices in Tamil, English, Hindi, Malayalam, and Telugu.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
+app.add_middleware(MetricsMiddleware)
 app.include_router(router, prefix="/api")
 
 @app.get("/")
 def read_root():
     return {"message": "AI Voice Detection API is running. Use /api/voice-detection to analyze audio."}
 
+@app.get("/ready")
+def readiness():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 before."""
+    body = {
+        "ready": classifier.ready,
+        "phase": classifier.phase,
+        "startup": {"imports_s": IMPORT_SECONDS, **classifier.startup_timings},
+    }
+    if classifier.startup_error:
+        body["error"] = classifier.startup_error
+    return JSONResponse(body, status_code=200 if classifier.ready else 503)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint. Metrics are per process; see serve.py --metrics-port."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
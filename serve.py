@@ -0,0 +1,165 @@
+"""
+Pre-fork server: loads and warms the model once in a master process, then forks
+worker processes that share its weights copy-on-write and accept connections on
+one listening socket. Torch threads are split between workers so they don't
+oversubscribe the cores.
+
+Usage:
+    python serve.py --workers 4 --port 8000
+    python serve.py --workers 4 --threads-per-worker 2 --pin-cpus
+    python serve.py --workers 4 --metrics-port 9100   # worker i also listens on 9100 + i
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import torch
+import uvicorn
+
+from core.config import SERVE_WORKERS, SERVE_THREADS_PER_WORKER, SERVE_PIN_CPUS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("serve")
+
+def plan_cpus(workers: int, threads_per_worker: int = 0):
+    """Returns (threads per worker, list of CPU ids per worker slot)."""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    threads = threads_per_worker or max(1, len(cpus) // workers)
+    slots = [[cpus[(i * threads + j) % len(cpus)] for j in range(threads)] for i in range(workers)]
+    return threads, slots
+
+def rss_mb(pid="self") -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return 0.0
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(slot: int, sockets, app, threads: int, cpus, pin: bool):
+    """Body of a forked worker; never returns."""
+    from core.classifier import classifier
+
+    # Let uvicorn install its own graceful-shutdown handlers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    if pin and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(threads)
+    try:
+        # Each worker runs one model call at a time (the batch scheduler thread)
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    if classifier.backend is not None:
+        classifier.backend.after_fork()
+
+    logger.info(f"Worker {slot} (pid {os.getpid()}) ready: {threads} threads"
+                + (f", pinned to CPUs {cpus}" if pin else ""))
+    code = 0
+    try:
+        uvicorn.Server(uvicorn.Config(app, log_level="info")).run(sockets=sockets)
+    except BaseException as e:
+        logger.error(f"Worker {slot} crashed: {e}")
+        code = 1
+    os._exit(code)
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork multi-worker server sharing one copy of the model.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--threads-per-worker", type=int, default=SERVE_THREADS_PER_WORKER,
+                        help="Torch intra-op threads per worker (0 = cores / workers)")
+    parser.add_argument("--pin-cpus", action="store_true", default=SERVE_PIN_CPUS,
+                        help="Pin each worker to its own set of CPUs")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="Worker i also listens on this port + i, so /metrics can be scraped per worker")
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    threads, cpu_slots = plan_cpus(workers, args.threads_per_worker)
+
+    # 1. Keep the master single-threaded: OpenMP thread pools don't survive fork()
+    torch.set_num_threads(1)
+
+    # 2. Load and warm the model once; the workers' lifespan hooks find it ready
+    started = time.perf_counter()
+    from main import app
+    from core.classifier import classifier
+    classifier.start()
+    logger.info(f"Model loaded and warmed in {time.perf_counter() - started:.1f}s, master RSS {rss_mb():.0f} MB")
+
+    # 3. One listening socket shared by every worker
+    sock = bind_socket(args.host, args.port)
+
+    # 4. Move everything allocated so far out of the GC's reach, so collections
+    #    in the workers don't write to (and so copy) the pages holding the model
+    gc.collect()
+    gc.freeze()
+
+    # 5. Fork the workers and keep them alive
+    children = {}  # pid -> slot
+    stopping = False
+
+    def spawn(slot):
+        pid = os.fork()
+        if pid == 0:
+            sockets = [sock]
+            if args.metrics_port:
+                sockets.append(bind_socket(args.host, args.metrics_port + slot))
+            run_worker(slot, sockets, app, threads, cpu_slots[slot], args.pin_cpus)
+        children[pid] = slot
+
+    def on_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+        # Ctrl-C already reaches the whole process group; forward explicit SIGTERMs
+        if signum == signal.SIGTERM:
+            for pid in list(children):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    for slot in range(workers):
+        spawn(slot)
+    logger.info(f"Serving on http://{args.host}:{args.port} with {workers} workers x {threads} threads")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        slot = children.pop(pid, None)
+        if slot is not None and not stopping:
+            logger.warning(f"Worker {slot} (pid {pid}) exited with status {status}; restarting")
+            time.sleep(1)
+            spawn(slot)
+
+    sock.close()
+    logger.info("All workers stopped")
+
+if __name__ == "__main__":
+    main()
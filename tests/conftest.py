@@ -0,0 +1,17 @@
+import os
+import sys
+import tempfile
+
+# Add project root (and benchmarks, for the stub model) to path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "benchmarks"))
+
+# Without a pinned local snapshot the tests run offline against the seeded tiny
+# Wav2Vec2 the benchmarks use (set before core.config is first imported)
+if not os.getenv("MODEL_LOCAL_DIR"):
+    from bench_suite import build_stub_model
+
+    stub_dir = tempfile.mkdtemp(prefix="stub_model_")
+    build_stub_model(stub_dir)
+    os.environ["MODEL_LOCAL_DIR"] = stub_dir
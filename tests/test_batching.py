@@ -0,0 +1,41 @@
+import numpy as np
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.classifier import classifier
+
+SR = 16000
+
+def clips(seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    return [(0.1 * rng.standard_normal(int(s * SR))).astype(np.float32) for s in seconds]
+
+def test_batch_verdicts_do_not_depend_on_batch_mates():
+    classifier.load()
+    audio = clips([1.0, 1.0, 2.5, 4.0, 9.0])
+    batched = classifier.predict_batch(audio)
+    for clip, prediction in zip(audio, batched):
+        alone = classifier.predict_detailed(clip)
+        assert (prediction.classification, prediction.confidence) == (alone.classification, alone.confidence)
+
+def test_groups_without_mask_hold_one_length():
+    classifier.load()
+    lengths = [16000, 8000, 16000, 24000, 8000]
+    groups = classifier.batch_groups(range(len(lengths)), lambda i: lengths[i])
+    if not classifier.masks_padding:
+        assert all(len({lengths[i] for i in group}) == 1 for group in groups)
+    assert sorted(i for group in groups for i in group) == list(range(len(lengths)))
+
+def test_scheduled_batches_match_unbatched_outputs():
+    classifier.load()
+    if classifier.batcher is None:
+        return
+    # Full chunk windows share batches; odd lengths within the bucket ratio must not be padded
+    audio = clips([1.0, 1.0, 1.0, 1.2, 1.4, 2.0, 2.0], seed=1)
+    futures = [classifier.batcher.submit(clip) for clip in audio]
+    batched = [f.result(timeout=30) for f in futures]
+    for clip, logits in zip(audio, batched):
+        np.testing.assert_allclose(logits, classifier.forward_batch([clip])[0], atol=1e-4)
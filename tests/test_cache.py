@@ -0,0 +1,84 @@
+import asyncio
+import sys
+import os
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.cache import ResultCache
+
+def test_lookup_counts_one_hit_or_miss_per_call():
+    cache = ResultCache()
+    cache.put("b", {"v": 2})
+    assert cache.lookup("a", "b") == {"v": 2}
+    assert cache.lookup("a", "c") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_concurrent_misses_share_one_computation():
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"v": len(calls)}
+
+    async def main():
+        first = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+        # Answered from the cache once the shared computation is stored
+        return first, await cache.get_or_compute("k", compute)
+
+    first, later = asyncio.run(main())
+    assert first == [{"v": 1}] * 5 and later == {"v": 1}
+    assert len(calls) == 1
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 4, 1)
+    assert cache.stats()["inflight"] == 0
+
+def test_lru_eviction_keeps_recently_used_entries():
+    value = {"payload": "x" * 100}
+    cache = ResultCache(max_bytes=3 * 120)
+    for key in ("a", "b", "c"):
+        cache.put(key, value)
+    cache.get("a")  # Now the most recently used
+    cache.put("d", value)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ("a", "c", "d"))
+    assert cache.evictions == 1 and cache.stats()["bytes"] <= cache.max_bytes
+
+def test_expired_entries_are_dropped_and_disk_survives_restart():
+    disk_dir = tempfile.mkdtemp()
+    cache = ResultCache(ttl_s=0.05, disk_dir=disk_dir)
+    cache.put("k", {"v": 1})
+    assert ResultCache(disk_dir=disk_dir).get("k") == {"v": 1}
+    time.sleep(0.1)
+    assert cache.get("k") is None
+
+def disk_files(disk_dir):
+    return sorted(name for _, _, names in os.walk(disk_dir) for name in names)
+
+def wait_for_sweep(cache):
+    deadline = time.time() + 10
+    while cache._sweeping and time.time() < deadline:
+        time.sleep(0.01)
+
+def test_disk_tier_evicts_oldest_first_within_its_budget():
+    disk_dir = tempfile.mkdtemp()
+    cache = ResultCache(disk_dir=disk_dir, disk_max_bytes=5 * 300)
+    for i in range(8):
+        cache.put(f"{i:02d}", {"v": "x" * 250})
+        # Distinct write times, so "oldest" is well defined
+        os.utime(cache._disk_path(f"{i:02d}"), (1e9 + i, time.time() - 100 + i))
+        wait_for_sweep(cache)
+    assert cache.stats()["disk_bytes"] <= cache.disk_max_bytes
+    remaining = disk_files(disk_dir)
+    assert remaining and "07.json" in remaining and "00.json" not in remaining
+    assert cache.disk_evictions == 8 - len(remaining)
+
+def test_expired_disk_files_are_swept_at_startup():
+    disk_dir = tempfile.mkdtemp()
+    ResultCache(ttl_s=0.05, disk_dir=disk_dir).put("old", {"v": 1})
+    time.sleep(0.1)
+    cache = ResultCache(ttl_s=0.05, disk_dir=disk_dir)
+    assert disk_files(disk_dir) == [] and cache.disk_evictions == 0
@@ -0,0 +1,82 @@
+import sys
+import os
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.cascade import CascadeModel, FEATURE_NAMES, choose_band
+from core.classifier import classifier
+
+P = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95])
+IS_AI = np.array([0, 0, 0, 1, 0, 1, 1, 0, 1, 1], dtype=bool)
+
+def test_choose_band():
+    # Only the three lowest are all HUMAN and the two highest all AI
+    assert choose_band(P, IS_AI, agreement=1.0) == (0.3, 0.9)
+    # 4 of the 5 lowest are HUMAN, 4 of the 5 highest are AI
+    assert choose_band(P, IS_AI, agreement=0.75) == (0.5, 0.6)
+    # Overlapping thresholds collapse to their midpoint
+    assert choose_band(P, IS_AI, agreement=0.5) == (0.525, 0.525)
+    # Input order does not matter
+    order = np.random.default_rng(0).permutation(len(P))
+    assert choose_band(P[order], IS_AI[order], agreement=1.0) == (0.3, 0.9)
+    # Nothing agrees at either end: everything escalates
+    assert choose_band(np.array([0.1, 0.9]), np.array([True, False]), agreement=1.0) == (0.0, 1.0)
+
+def noise(rms, seconds=1.0, seed=0):
+    return (rms * np.random.default_rng(seed).standard_normal(int(seconds * 16000))).astype(np.float32)
+
+def test_cascade_answers_clear_cut_clips_and_escalates_the_rest():
+    classifier.load()
+    saved = classifier.cascade
+    # P(AI) = sigmoid(10 * (log_rms + 2.3)): loud clips are AI, quiet ones HUMAN, rms ~0.1 in the band
+    weights = np.zeros(len(FEATURE_NAMES))
+    weights[FEATURE_NAMES.index("log_rms")] = 10.0
+    classifier.cascade = CascadeModel(np.zeros(len(FEATURE_NAMES)), np.ones(len(FEATURE_NAMES)),
+                                      weights, 23.0, low=0.1, high=0.9)
+    try:
+        loud = classifier.predict_detailed(noise(0.3), explain=False)
+        assert (loud.classification, loud.decided_by) == ("AI_GENERATED", "cascade")
+        assert loud.confidence == 1.0
+
+        quiet = classifier.predict_detailed(noise(0.03), explain=False)
+        assert (quiet.classification, quiet.decided_by) == ("HUMAN", "cascade")
+
+        escalated = classifier.predict_detailed(noise(0.1), explain=False)
+        assert escalated.decided_by == "model"
+
+        # The batch path takes the same decisions
+        batch = classifier.predict_batch([noise(0.3), noise(0.1), noise(0.03)])
+        assert [p.decided_by for p in batch] == ["cascade", "model", "cascade"]
+        assert batch[0].classification == "AI_GENERATED" and batch[2].classification == "HUMAN"
+    finally:
+        classifier.cascade = saved
+
+def test_cascade_runs_inside_the_deadline_budget():
+    from core.deadline import Deadline, cost_model
+
+    classifier.load()
+    saved, saved_rates = classifier.cascade, dict(cost_model._rates)
+    weights = np.zeros(len(FEATURE_NAMES))
+    weights[FEATURE_NAMES.index("log_rms")] = 10.0
+    classifier.cascade = CascadeModel(np.zeros(len(FEATURE_NAMES)), np.ones(len(FEATURE_NAMES)),
+                                      weights, 23.0, low=0.1, high=0.9)
+    try:
+        # Cascade + inference fit, the explainer does not: the cascade's answer uses the template
+        cost_model.observe("cascade", 0.1, 1.0, replace=True)
+        cost_model.observe("inference", 0.1, 1.0, replace=True)
+        cost_model.observe("explainer", 100.0, 1.0, replace=True)
+        loud = classifier.predict_detailed(noise(0.3), deadline=Deadline(30.0))
+        assert loud.decided_by == "cascade" and loud.degradations == ["skip_explainer"]
+        assert loud.explanation == classifier.explainer.template_explanation("AI_GENERATED")
+
+        # The cascade's own cost counts: inference alone would fit, cascade + inference does not
+        cost_model.observe("cascade", 1.0, 1.0, replace=True)
+        degradations = []
+        capped = classifier._fit_deadline(noise(0.3, seconds=10.0), Deadline(9.0), degradations)
+        assert degradations == ["skip_explainer", "cap_duration"] and len(capped) < 10 * 16000
+    finally:
+        classifier.cascade = saved
+        cost_model._rates = saved_rates
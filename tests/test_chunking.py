@@ -0,0 +1,54 @@
+import sys
+import os
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import core.classifier as classifier_module
+from core.classifier import _aggregate, classifier
+
+SR = 16000
+
+def windowed(window_s, hop_s):
+    """Turns chunking on for the duration of a test; returns a function restoring the settings."""
+    saved = classifier_module.CHUNK_WINDOW_S, classifier_module.CHUNK_HOP_S
+    classifier_module.CHUNK_WINDOW_S, classifier_module.CHUNK_HOP_S = window_s, hop_s
+
+    def restore():
+        classifier_module.CHUNK_WINDOW_S, classifier_module.CHUNK_HOP_S = saved
+    return restore
+
+def test_windows_cover_the_tail():
+    restore = windowed(2.0, 2.0)
+    try:
+        assert classifier.window_starts(5 * SR) == [0, 2 * SR, 3 * SR]
+        assert classifier.window_starts(4 * SR) == [0, 2 * SR]
+        assert not classifier._is_chunked(np.zeros(2 * SR, dtype=np.float32))
+    finally:
+        restore()
+
+def test_aggregation_methods():
+    # Columns: [AI, human]
+    seg_probs = np.array([[0.9, 0.1], [0.4, 0.6], [0.2, 0.8]])
+    assert np.allclose(_aggregate(seg_probs, "mean", [0]), [0.5, 0.5])
+    assert np.allclose(_aggregate(seg_probs, "max", [0]), [0.9, 0.1])
+    weights = np.array([0.9, 0.6, 0.8])
+    assert np.allclose(_aggregate(seg_probs, "weighted", [0]), (seg_probs * weights[:, None]).sum(axis=0) / weights.sum())
+
+def test_chunked_prediction_aggregates_its_windows():
+    classifier.load()
+    rng = np.random.default_rng(0)
+    audio = (0.1 * rng.standard_normal(5 * SR)).astype(np.float32)
+    restore = windowed(2.0, 2.0)
+    try:
+        prediction = classifier.predict_detailed(audio)
+        windows = [audio[s:s + 2 * SR] for s in classifier.window_starts(len(audio))]
+        expected = classifier.aggregate(classifier.score_windows(windows))
+    finally:
+        restore()
+    assert [(s["start"], s["end"]) for s in prediction.segments] == [(0, 2), (2, 4), (3, 5)]
+    class_id = int(np.argmax(expected))
+    assert prediction.classification == classifier.label_for(class_id)
+    assert prediction.confidence == round(float(expected[class_id]), 2)
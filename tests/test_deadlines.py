@@ -0,0 +1,100 @@
+import asyncio
+import sys
+import os
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.cache import ResultCache
+from core.classifier import classifier
+from core.deadline import Deadline, DeadlineExceeded, cost_model
+from core.executor import inference_pool
+from core.pipeline import run_analysis
+
+SR = 16000
+
+def with_costs(inference, explainer):
+    """Pins the cost model to seconds of work per second of audio; returns the rates to restore."""
+    saved = dict(cost_model._rates)
+    cost_model.observe("inference", inference, 1.0, replace=True)
+    cost_model.observe("explainer", explainer, 1.0, replace=True)
+    return saved
+
+def test_degrades_in_steps_then_sheds():
+    audio = np.zeros(10 * SR, dtype=np.float32)
+    saved = with_costs(inference=0.1, explainer=0.2)
+    try:
+        # 1s inference + 2s explainer for 10s of audio
+        degradations = []
+        assert len(classifier._fit_deadline(audio, Deadline(5.0), degradations)) == len(audio)
+        assert degradations == []
+
+        degradations = []
+        assert len(classifier._fit_deadline(audio, Deadline(2.0), degradations)) == len(audio)
+        assert degradations == ["skip_explainer"]
+
+        degradations = []
+        capped = classifier._fit_deadline(audio, Deadline(0.5), degradations)
+        assert degradations == ["skip_explainer", "cap_duration"]
+        assert 4 * SR <= len(capped) < 5 * SR
+
+        try:
+            classifier._fit_deadline(audio, Deadline(0.01), [])
+            assert False, "a deadline below the minimum analysed duration should be shed"
+        except DeadlineExceeded:
+            pass
+    finally:
+        cost_model._rates = saved
+
+def test_sheds_before_queueing_when_the_queue_is_too_long():
+    expected_wait = inference_pool.expected_wait
+    inference_pool.expected_wait = lambda: 10.0
+    try:
+        asyncio.run(run_analysis(b"not decoded when shed", deadline=Deadline(1.0)))
+        assert False, "request should be shed"
+    except DeadlineExceeded:
+        pass
+    finally:
+        inference_pool.expected_wait = expected_wait
+
+def test_deadline_requests_do_not_share_computations():
+    cache = ResultCache()
+    calls = []
+
+    async def compute(degradations):
+        calls.append(degradations)
+        await asyncio.sleep(0.05)
+        return {"degradations": degradations}
+
+    async def main():
+        # A tight deadline's degraded answer must not be handed to a looser one, and vice versa
+        return await asyncio.gather(
+            cache.get_or_compute("k", lambda: compute(["skip_explainer"]), coalesce=False,
+                                 cacheable=lambda r: not r["degradations"]),
+            cache.get_or_compute("k", lambda: compute([]), coalesce=False,
+                                 cacheable=lambda r: not r["degradations"]),
+        )
+
+    tight, loose = asyncio.run(main())
+    assert tight["degradations"] == ["skip_explainer"] and loose["degradations"] == []
+    assert len(calls) == 2 and cache.coalesced == 0
+    # Only the full answer was cached
+    assert cache.get("k") == {"degradations": []}
+
+def test_requests_without_deadline_share_one_computation():
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"degradations": []}
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1 and cache.coalesced == 2
+    assert all(r == {"degradations": []} for r in results)
@@ -0,0 +1,50 @@
+import io
+import sys
+import os
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import core.explanations as explanations
+from core.cache import ResultCache
+from core.classifier import classifier
+from core.explanations import ExplanationJobs
+
+def wav_bytes(seconds=2.0, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * 16000)) / 16000
+    y = 0.2 * np.sin(2 * np.pi * 150 * t) + 0.01 * rng.standard_normal(len(t))
+    buffer = io.BytesIO()
+    sf.write(buffer, y.astype(np.float32), 16000, format="WAV")
+    return buffer.getvalue()
+
+def test_any_worker_can_answer_for_a_job():
+    classifier.load()
+    shared_cache = explanations.result_cache
+    disk_dir = tempfile.mkdtemp()
+    try:
+        # Two pre-fork workers: their own job tables and memory caches, one CACHE_DIR
+        explanations.result_cache = ResultCache(disk_dir=disk_dir)
+        first = ExplanationJobs()
+        job = first.submit(wav_bytes(), "HUMAN", 0.9)
+        deadline = time.time() + 60
+        while first.get(job["id"])["status"] == "pending" and time.time() < deadline:
+            time.sleep(0.05)
+
+        explanations.result_cache = ResultCache(disk_dir=disk_dir)
+        second = ExplanationJobs()
+        answer = second.get(job["id"])
+        assert answer["status"] == "done" and answer["explanation"]
+        # The same clip is answered from the shared record without rerunning the explainer
+        assert second.submit(wav_bytes(), "HUMAN", 0.9)["status"] == "done"
+        assert second.pending() == 0
+
+        assert second.get("0" * 64) is None
+        assert second.get("../" + job["id"]) is None
+    finally:
+        explanations.result_cache = shared_cache
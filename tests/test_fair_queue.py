@@ -0,0 +1,93 @@
+import json
+import sys
+import os
+import threading
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.executor import InferencePool, QueueFullError
+from core.tenants import Tenant, TenantRegistry, TokenBucket, load_tenants
+
+INTERACTIVE = Tenant("web", priority="interactive")
+BULK = Tenant("batch-import", priority="bulk")
+
+def blocked_pool(max_queue):
+    """Single-worker pool whose worker is held until the returned event is set."""
+    pool = InferencePool("thread", workers=1, max_queue=max_queue)
+    gate = threading.Event()
+    pool.submit(gate.wait)
+    time.sleep(0.05)  # Let the worker pick the blocking job up
+    return pool, gate
+
+def test_interactive_jobs_overtake_bulk_backlog():
+    pool, gate = blocked_pool(max_queue=100)
+    order = []
+    futures = [pool.submit(order.append, "bulk", tenant=BULK) for _ in range(40)]
+    futures += [pool.submit(order.append, "web", tenant=INTERACTIVE) for _ in range(4)]
+    gate.set()
+    for f in futures:
+        f.result(timeout=5)
+    # Queued after 40 bulk jobs, yet served within the first few slots
+    assert max(i for i, who in enumerate(order) if who == "web") < 8
+
+def test_full_queue_pushes_out_the_heaviest_tenant():
+    pool, gate = blocked_pool(max_queue=4)
+    bulk = [pool.submit(time.sleep, 0, tenant=BULK) for _ in range(4)]
+    try:
+        pool.submit(time.sleep, 0, tenant=BULK)
+        assert False, "bulk tenant should not grow past a full queue"
+    except QueueFullError:
+        pass
+    web = pool.submit(time.sleep, 0, tenant=INTERACTIVE)
+    assert isinstance(bulk[-1].exception(timeout=1), QueueFullError)
+    gate.set()
+    web.result(timeout=5)
+    stats = pool.stats()["tenants"]
+    assert stats["batch-import"]["evicted"] == 1 and stats["batch-import"]["rejected"] == 1
+
+def test_token_bucket_debt_blocks_until_repaid():
+    bucket = TokenBucket(rate=10.0, capacity=1.0)
+    assert bucket.take(1.0) == 0.0
+    assert bucket.take(1.0) > 0.0
+    bucket.charge(2.0)
+    assert bucket.level() < -1.0
+
+def test_unnamed_tenants_stay_apart_and_names_are_unique():
+    spec = json.dumps({"sk_live_web": {"rate_per_s": 1}, "sk_live_batch": {"rate_per_s": 1}})
+    loaded = load_tenants(spec, default_key="sk_test")
+    assert len({tenant.name for tenant in loaded.values()}) == 3
+
+    registry = TenantRegistry(loaded)
+    registry.admit(registry.get("sk_live_web"))
+    # The other key's bucket is untouched by the first key's request
+    registry.admit(registry.get("sk_live_batch"))
+
+    try:
+        load_tenants(json.dumps({"a": {"name": "web"}, "b": {"name": "web"}}), default_key="sk_test")
+        assert False, "duplicate tenant names should be rejected"
+    except ValueError:
+        pass
+
+def test_queue_size_zero_still_uses_free_workers():
+    pool = InferencePool("thread", workers=1, max_queue=0)
+    assert pool.submit(sum, [1, 2]).result(timeout=5) == 3
+    gate = threading.Event()
+    pool.submit(gate.wait)
+    time.sleep(0.05)
+    try:
+        pool.submit(sum, [1, 2])
+        assert False, "no job may wait behind a busy worker"
+    except QueueFullError:
+        pass
+    gate.set()
+
+def test_process_mode_reports_child_stage_timings():
+    from core.metrics import record_stage, start_request_timings
+
+    pool = InferencePool("process", workers=1, max_queue=4)
+    timings = start_request_timings()
+    pool.submit(record_stage, "probe", 0.25).result(timeout=120)
+    assert timings["probe"] == 0.25
+    assert pool._processes._mp_context.get_start_method() == "spawn"
@@ -0,0 +1,50 @@
+import sys
+import os
+
+import numpy as np
+import librosa
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_features import heuristic_buckets, synthetic_voice
+from core.audio import decode_audio_bytes
+from core.features import PITCH_FMAX, PITCH_FMIN, SignalFeatures, legacy_signal_features, pyin_pitch
+from core.vad import trim_silence
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def test_pitch_track_matches_librosa_pyin():
+    for y in (synthetic_voice(150, 1, duration=2.0), synthetic_voice(220, 80, duration=2.0)):
+        expected = librosa.pyin(y, fmin=PITCH_FMIN, fmax=PITCH_FMAX, sr=16000)[0]
+        f0 = pyin_pitch(y, 16000)
+        assert np.array_equal(np.isnan(f0), np.isnan(expected))
+        assert np.allclose(f0[~np.isnan(f0)], expected[~np.isnan(expected)])
+
+def test_explainer_buckets_unchanged_on_repo_clips():
+    for clip in ("clip1.mp3", "clip2.mp3"):
+        with open(os.path.join(ROOT, clip), "rb") as f:
+            audio, sr = decode_audio_bytes(f.read())
+        # What the explainer sees after VoiceClassifier._prepare
+        audio, _ = trim_silence(audio, sr)
+        features = SignalFeatures(audio, sr)
+        fast = {**features.as_dict(), "rms": features.rms}
+        assert heuristic_buckets(fast) == heuristic_buckets(legacy_signal_features(audio, sr)), clip
+
+def test_rms_matches_librosa_on_repo_clips_and_near_the_silence_cutoff():
+    clips = []
+    for clip in ("clip1.mp3", "clip2.mp3"):
+        with open(os.path.join(ROOT, clip), "rb") as f:
+            clips.append(decode_audio_bytes(f.read())[0])
+    # Quiet clips around VoiceClassifier._prepare's 0.005 cut-off, with a burst so frames differ
+    rng = np.random.default_rng(0)
+    for level in (0.004, 0.005, 0.006):
+        quiet = level * rng.standard_normal(3 * 16000)
+        quiet[16000:20000] *= 4
+        clips.append(quiet.astype(np.float32))
+
+    for audio in clips:
+        expected = float(np.mean(librosa.feature.rms(y=audio)))
+        rms = SignalFeatures(audio, 16000).rms
+        assert abs(rms - expected) <= 1e-6 * expected, (rms, expected)
+        assert (rms < 0.005) == (expected < 0.005)
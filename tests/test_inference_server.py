@@ -0,0 +1,60 @@
+import sys
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import core.inference_server as inference_server
+from core.classifier import classifier
+from core.inference_server import InferenceClient, InferenceServer
+
+def start_server():
+    classifier.load()
+    path = os.path.join(tempfile.mkdtemp(), "inference.sock")
+    server = InferenceServer(path, 4 * 2**20, threads=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = InferenceClient(path, timeout_s=60)
+    client.connect(wait_s=10)
+    return client
+
+def test_round_trip_matches_local_inference():
+    client = start_server()
+    rng = np.random.default_rng(0)
+    clips = [(0.1 * rng.standard_normal(n)).astype(np.float32) for n in (16000, 24000, 8000)]
+
+    logits = client.infer(clips)
+    assert np.allclose(logits, classifier._infer_logits(clips), atol=1e-5)
+    assert client.stats()["server"]["windows"] == len(clips)
+    assert not client._ring._live, "every slot is freed once its reply arrives"
+
+def test_failed_send_frees_the_slot():
+    client = start_server()
+    send = inference_server._send
+
+    def broken_send(sock, lock, message):
+        raise BrokenPipeError("server went away")
+
+    inference_server._send = broken_send
+    try:
+        client.infer([np.zeros(16000, dtype=np.float32)])
+        assert False, "a failed send should raise"
+    except ConnectionError:
+        pass
+    finally:
+        inference_server._send = send
+    assert not client._ring._live and not client._pending
+
+    # A connection reset between allocating and sending surfaces as ConnectionError too
+    connection = client._connection()
+    client._sock = None
+    slot = client._ring.alloc(64, 1.0)
+    try:
+        client._request(connection, {"op": "infer", "offset": slot[0], "lengths": [16]}, slot)
+        assert False, "a reset connection should raise"
+    except ConnectionError:
+        pass
+    assert not client._ring._live
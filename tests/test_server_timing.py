@@ -0,0 +1,39 @@
+import io
+import sys
+import os
+import time
+
+import numpy as np
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from core.config import API_KEY_SECRET
+
+HEADERS = {"x-api-key": API_KEY_SECRET}
+URL = "/api/voice-detection/upload"
+
+def wav_bytes(seconds=1.0, seed=0):
+    buffer = io.BytesIO()
+    sf.write(buffer, (0.1 * np.random.default_rng(seed).standard_normal(int(seconds * 16000))).astype(np.float32),
+             16000, format="WAV")
+    return buffer.getvalue()
+
+def test_server_timing_is_opt_in_per_request():
+    with TestClient(main.app) as client:
+        while client.get("/ready").status_code != 200:
+            time.sleep(0.1)
+
+        # Different clips, so none of them is answered from the result cache
+        r = client.post(URL, files={"file": ("a.wav", wav_bytes(seed=1))}, headers=HEADERS)
+        assert r.status_code == 200 and "server-timing" not in r.headers
+
+        r = client.post(URL, files={"file": ("a.wav", wav_bytes(seed=2))},
+                        headers={**HEADERS, "X-Debug-Timing": "1"})
+        assert r.status_code == 200 and "inference;dur=" in r.headers["server-timing"]
+
+        r = client.post(URL + "?timing=1", files={"file": ("a.wav", wav_bytes(seed=3))}, headers=HEADERS)
+        assert "total;dur=" in r.headers["server-timing"]
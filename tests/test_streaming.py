@@ -0,0 +1,70 @@
+import sys
+import os
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from core.config import API_KEY_SECRET
+from core.streaming import StreamBuffer
+
+def test_buffer_emits_every_hop_and_flushes_the_tail():
+    buffer = StreamBuffer(window_samples=4, hop_samples=2)
+    windows = [(start, end) for frame in np.split(np.arange(9, dtype=np.float32), 3)
+               for _, start, end in buffer.feed(frame)]
+    assert windows == [(0, 4), (2, 6), (4, 8)]
+    window, start, end = buffer.flush(min_samples=1)
+    assert (start, end) == (5, 9) and list(window) == [5, 6, 7, 8]
+    assert buffer.flush(min_samples=1) is None
+
+def test_stream_at_8khz_reports_source_times():
+    sr = 8000
+    t = np.arange(6 * sr) / sr
+    pcm = (0.3 * np.sin(2 * np.pi * 180 * t) * 32767).astype("<i2").tobytes()
+    frame_bytes = sr // 10 * 2  # 100ms frames
+
+    with TestClient(main.app) as client:
+        while client.get("/ready").status_code != 200:
+            time.sleep(0.1)
+        with client.websocket_connect("/api/voice-detection/stream", headers={"x-api-key": API_KEY_SECRET}) as ws:
+            ws.send_json({"format": "pcm_s16le", "sampleRate": sr})
+            for i in range(0, len(pcm), frame_bytes):
+                ws.send_bytes(pcm[i:i + frame_bytes])
+            ws.send_json({"event": "end"})
+            events = []
+            while not events or events[-1]["event"] != "final":
+                events.append(ws.receive_json())
+
+    final = events[-1]
+    assert final["analysedSeconds"] == 6.0
+    assert [(s["start"], s["end"]) for s in final["segments"]] == [(0, 5), (1, 6)]
+    # One full window, then the unscored last second flushed as a final full-length window
+    assert sum(e["event"] == "update" for e in events) == 2
+
+def test_stream_rejects_query_keys_and_bad_sample_rates():
+    from starlette.websockets import WebSocketDisconnect
+
+    with TestClient(main.app) as client:
+        while client.get("/ready").status_code != 200:
+            time.sleep(0.1)
+        # ?api_key= is off unless STREAM_QUERY_API_KEY is set
+        try:
+            with client.websocket_connect(f"/api/voice-detection/stream?api_key={API_KEY_SECRET}") as ws:
+                ws.receive_json()
+            assert False, "query-string keys should be refused"
+        except WebSocketDisconnect as e:
+            assert e.code == 1008
+
+        for bad in ("fast", None, 0, -8000):
+            with client.websocket_connect("/api/voice-detection/stream", headers={"x-api-key": API_KEY_SECRET}) as ws:
+                ws.send_json({"sampleRate": bad})
+                assert ws.receive_json()["event"] == "error"
+                try:
+                    ws.receive_json()
+                    assert False, "a bad config should close the stream"
+                except WebSocketDisconnect as e:
+                    assert e.code == 1003
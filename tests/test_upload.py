@@ -0,0 +1,64 @@
+import asyncio
+import io
+import sys
+import os
+import time
+
+import numpy as np
+import soundfile as sf
+from fastapi import HTTPException, Request
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from api.routes import _read_multipart
+from core.config import API_KEY_SECRET, MAX_UPLOAD_BYTES
+
+HEADERS = {"x-api-key": API_KEY_SECRET}
+URL = "/api/voice-detection/upload"
+
+def wav_bytes(seconds=2.0):
+    buffer = io.BytesIO()
+    sf.write(buffer, (0.1 * np.random.default_rng(0).standard_normal(int(seconds * 16000))).astype(np.float32),
+             16000, format="WAV")
+    return buffer.getvalue()
+
+def ready_client():
+    client = TestClient(main.app)
+    client.__enter__()
+    while client.get("/ready").status_code != 200:
+        time.sleep(0.1)
+    return client
+
+def test_multipart_upload():
+    client = ready_client()
+    try:
+        r = client.post(URL, files={"file": ("clip.wav", wav_bytes(), "audio/wav")}, data={"language": "Tamil"},
+                        headers=HEADERS)
+        assert r.status_code == 200 and r.json()["language"] == "Tamil"
+
+        r = client.post(URL, files={"other": ("clip.wav", b"1")}, headers=HEADERS)
+        assert r.status_code == 400
+    finally:
+        client.__exit__(None, None, None)
+
+def test_multipart_reader_aborts_before_the_rest_of_the_body():
+    chunk = b"\0" * (1024 * 1024)
+    messages = [b'--XX\r\nContent-Disposition: form-data; name="file"; filename="a.wav"\r\n\r\n']
+    messages += [chunk] * (MAX_UPLOAD_BYTES // len(chunk) + 20) + [b"\r\n--XX--\r\n"]
+    received = []
+
+    async def receive():
+        received.append(1)
+        return {"type": "http.request", "body": messages[len(received) - 1], "more_body": len(received) < len(messages)}
+
+    request = Request({"type": "http", "method": "POST", "headers": [
+        (b"content-type", b"multipart/form-data; boundary=XX")]}, receive)
+    try:
+        asyncio.run(_read_multipart(request, MAX_UPLOAD_BYTES))
+        assert False, "oversized upload should be rejected"
+    except HTTPException as e:
+        assert e.status_code == 413
+    assert len(received) <= MAX_UPLOAD_BYTES // len(chunk) + 2
@@ -0,0 +1,87 @@
+import numpy as np
+import sys
+import os
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.audio import decode_audio_bytes
+from core.vad import trim_silence
+from core.classifier import classifier
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CLIPS = ["clip1.mp3", "clip2.mp3"]
+SR = 16000
+
+def load_clip(name):
+    with open(os.path.join(ROOT, name), "rb") as f:
+        audio, _ = decode_audio_bytes(f.read())
+    return audio
+
+def with_dead_air(audio, seconds=8.0):
+    """Clip with long silences before, in the middle of and after the speech."""
+    gap = np.zeros(int(seconds * SR), dtype=np.float32)
+    half = len(audio) // 2
+    return np.concatenate([gap, audio[:half], gap, audio[half:], gap])
+
+def timed_predict(audio, vad):
+    previous = classifier.vad_enabled
+    classifier.vad_enabled = vad
+    try:
+        start = time.perf_counter()
+        prediction = classifier.predict_detailed(audio)
+        return prediction, time.perf_counter() - start
+    finally:
+        classifier.vad_enabled = previous
+
+def test_trim_removes_dead_air_only():
+    t = np.arange(2 * SR) / SR
+    speech = (0.3 * np.sin(2 * np.pi * 180 * t)).astype(np.float32)
+    audio = with_dead_air(speech, seconds=5.0)
+
+    trimmed, trimmed_seconds = trim_silence(audio, SR)
+
+    # 15s of silence go, apart from the short pauses kept around speech
+    assert 13.5 < trimmed_seconds < 15.0, trimmed_seconds
+    assert len(trimmed) == len(audio) - round(trimmed_seconds * SR)
+    # All speech samples survive
+    assert np.count_nonzero(np.abs(trimmed) > 0.01) == np.count_nonzero(np.abs(audio) > 0.01)
+
+def test_trim_leaves_continuous_speech_alone():
+    rng = np.random.default_rng(0)
+    audio = (0.1 * rng.standard_normal(3 * SR)).astype(np.float32)
+    trimmed, trimmed_seconds = trim_silence(audio, SR)
+    assert trimmed is audio and trimmed_seconds == 0.0
+
+def test_verdicts_unchanged_on_repo_clips():
+    classifier.load()
+    for name in CLIPS:
+        audio = load_clip(name)
+        baseline, _ = timed_predict(audio, vad=False)
+        trimmed, _ = timed_predict(audio, vad=True)
+        print(f"{name}: {baseline.classification} ({baseline.confidence}) -> "
+              f"{trimmed.classification} ({trimmed.confidence}), trimmed {trimmed.trimmed_seconds}s")
+        assert trimmed.classification == baseline.classification
+
+def test_dead_air_costs_less_with_same_verdict():
+    classifier.load()
+    for name in CLIPS:
+        audio = load_clip(name)
+        reference, _ = timed_predict(audio, vad=False)
+        padded = with_dead_air(audio)
+        _, baseline_s = timed_predict(padded, vad=False)
+        trimmed, trimmed_s = timed_predict(padded, vad=True)
+        print(f"{name} + dead air: {baseline_s:.2f}s -> {trimmed_s:.2f}s, trimmed {trimmed.trimmed_seconds}s, "
+              f"verdict {trimmed.classification} (clean clip: {reference.classification})")
+        # Dead air no longer dilutes the verdict on the speech itself
+        assert trimmed.classification == reference.classification
+        assert trimmed.trimmed_seconds >= 20.0
+        assert trimmed_s < baseline_s
+
+if __name__ == "__main__":
+    test_trim_removes_dead_air_only()
+    test_trim_leaves_continuous_speech_alone()
+    test_verdicts_unchanged_on_repo_clips()
+    test_dead_air_costs_less_with_same_verdict()
+    print("All VAD tests passed.")